@@ -0,0 +1,131 @@
+"""
+Benchmark: ffmpeg subprocess audio extraction vs the pydub full decode.
+
+Both engines turn a video into Whisper-ready chunks exactly as
+ChunkedTranscriber does, without calling Whisper. Each run happens in a
+fresh child process so peak RSS is not polluted by earlier runs.
+
+Usage (from backend/):
+    python benchmarks/bench_audio_extraction.py                 # 30 min synthetic video
+    python benchmarks/bench_audio_extraction.py --minutes 90
+    python benchmarks/bench_audio_extraction.py --input lecture.mp4 --runs 3
+
+Requires ffmpeg/ffprobe on PATH and pydub installed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.transcription import ChunkedTranscriber, split_audio  # noqa: E402
+
+
+def make_synthetic_video(path: str, minutes: float):
+    """A low-res video whose audio alternates 10s of noise with 2s of silence"""
+    seconds = int(minutes * 60)
+    subprocess.run(
+        [
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", f"color=c=black:s=320x240:r=5:d={seconds}",
+            "-f", "lavfi", "-i", f"anoisesrc=d={seconds}:c=pink:r=44100:a=0.3",
+            "-af", "volume='if(lt(mod(t,12),10),1,0)':eval=frame",
+            "-ac", "2", "-c:v", "libx264", "-preset", "ultrafast",
+            "-c:a", "aac", "-b:a", "128k", "-shortest", path
+        ],
+        check=True
+    )
+
+
+def run_worker(engine: str, input_path: str, chunk_seconds: float, trim_silence: bool) -> dict:
+    """Split once with the given engine and report time, memory and output size"""
+    work_dir = tempfile.mkdtemp(prefix="bench_audio_")
+    try:
+        started = time.perf_counter()
+        if engine == "pydub":
+            chunk_paths = split_audio(input_path, work_dir, chunk_seconds, 5, 30, 400)
+        else:
+            transcriber = ChunkedTranscriber(
+                openai_client=None,
+                executor=None,
+                chunk_seconds=chunk_seconds,
+                trim_silence=trim_silence
+            )
+            chunk_paths = asyncio.run(transcriber._split_with_ffmpeg(input_path, work_dir))
+        elapsed = time.perf_counter() - started
+
+        # ru_maxrss is KiB on Linux
+        return {
+            "engine": engine,
+            "seconds": elapsed,
+            "python_peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            "ffmpeg_peak_rss_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+            "chunks": len(chunk_paths),
+            "upload_mb": sum(os.path.getsize(path) for path in chunk_paths) / (1024 * 1024),
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def run_in_child(engine: str, args) -> dict:
+    command = [
+        sys.executable, os.path.abspath(__file__),
+        "--worker", engine,
+        "--input", args.input,
+        "--chunk-seconds", str(args.chunk_seconds),
+    ]
+    if args.trim_silence:
+        command.append("--trim-silence")
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="Video/audio file to use instead of a synthetic one")
+    parser.add_argument("--minutes", type=float, default=30, help="Length of the synthetic video")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--chunk-seconds", type=float, default=600)
+    parser.add_argument("--trim-silence", action="store_true", help="Enable silence trimming for ffmpeg")
+    parser.add_argument("--worker", choices=["ffmpeg", "pydub"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.input, args.chunk_seconds, args.trim_silence)))
+        return
+
+    synthetic_dir = None
+    if not args.input:
+        synthetic_dir = tempfile.mkdtemp(prefix="bench_video_")
+        args.input = os.path.join(synthetic_dir, "synthetic.mp4")
+        print(f"Generating {args.minutes:g} min synthetic video...")
+        make_synthetic_video(args.input, args.minutes)
+
+    try:
+        print(f"Input: {args.input} ({os.path.getsize(args.input) / (1024 * 1024):.1f} MB)\n")
+        print(f"{'engine':<8} {'wall s':>8} {'python MB':>10} {'ffmpeg MB':>10} {'chunks':>7} {'upload MB':>10}")
+        for engine in ("pydub", "ffmpeg"):
+            results = [run_in_child(engine, args) for _ in range(args.runs)]
+            print(
+                f"{engine:<8} "
+                f"{statistics.median(r['seconds'] for r in results):>8.2f} "
+                f"{max(r['python_peak_rss_mb'] for r in results):>10.1f} "
+                f"{max(r['ffmpeg_peak_rss_mb'] for r in results):>10.1f} "
+                f"{results[0]['chunks']:>7} "
+                f"{results[0]['upload_mb']:>10.1f}"
+            )
+    finally:
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
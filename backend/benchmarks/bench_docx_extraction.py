@@ -0,0 +1,156 @@
+"""
+Benchmark: streaming DOCX extraction vs the original python-docx walk.
+
+A synthetic document of --pages pages is generated with python-docx
+(headings, body paragraphs, bullet lists and a table every few pages).
+Generation and each engine run happen in fresh child processes so peak RSS
+is not polluted by earlier work. Table coverage counts how many of the
+generated table cells show up in the output (the python-docx walk only
+visits doc.paragraphs).
+
+Usage (from backend/):
+    python benchmarks/bench_docx_extraction.py                  # 1000 page synthetic document
+    python benchmarks/bench_docx_extraction.py --pages 3000 --runs 3
+    python benchmarks/bench_docx_extraction.py --input report.docx
+"""
+import argparse
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.text_extraction import extract_docx_text  # noqa: E402
+
+_CELL = re.compile(r"\bT\d+R\d+C\d+\b")
+
+_WORDS = (
+    "cell membrane protein energy photosynthesis chlorophyll enzyme reaction molecule gradient "
+    "transport diffusion osmosis respiration glucose oxygen carbon structure function organism "
+    "evolution selection population genetic variation inheritance chromosome nucleus division"
+).split()
+
+
+def make_synthetic_docx(path: str, pages: int, seed: int = 7) -> int:
+    """Write a document of about `pages` pages; returns the number of table cells"""
+    from docx import Document
+
+    rng = random.Random(seed)
+    doc = Document()
+    cells = 0
+    for page in range(pages):
+        if page % 5 == 0:
+            doc.add_heading(f"Chapter {page // 5 + 1}", level=1)
+        doc.add_heading(f"Section {page + 1}", level=2)
+        for _ in range(5):
+            doc.add_paragraph(" ".join(rng.choice(_WORDS) for _ in range(70)).capitalize() + ".")
+        for _ in range(3):
+            doc.add_paragraph(" ".join(rng.choice(_WORDS) for _ in range(8)), style="List Bullet")
+        if page % 4 == 0:
+            table = doc.add_table(rows=6, cols=4)
+            for r, row in enumerate(table.rows):
+                for c, cell in enumerate(row.cells):
+                    cell.text = f"T{page}R{r}C{c} {rng.choice(_WORDS)}"
+                    cells += 1
+    doc.save(path)
+    return cells
+
+
+def extract_python_docx(path: str) -> str:
+    """The original extractor: paragraphs only, built with +="""
+    from docx import Document
+
+    doc = Document(path)
+    text = ""
+    for paragraph in doc.paragraphs:
+        text += paragraph.text + "\n"
+    return text.strip()
+
+
+ENGINES = {
+    "python-docx": extract_python_docx,
+    "streaming": extract_docx_text,
+}
+
+
+def run_worker(engine: str, input_path: str) -> dict:
+    """Extract once with the given engine and report time, memory and coverage"""
+    started = time.perf_counter()
+    text = ENGINES[engine](input_path)
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss is KiB on Linux
+    return {
+        "engine": engine,
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "chars": len(text),
+        "table_cells": len(set(_CELL.findall(text))),
+        "headings": sum(1 for line in text.splitlines() if line.startswith("#")),
+    }
+
+
+def run_in_child(engine: str, input_path: str) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--worker", engine, "--input", input_path]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", help="DOCX file to use instead of a synthetic one")
+    parser.add_argument("--pages", type=int, default=1000, help="Length of the synthetic document")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--worker", choices=list(ENGINES), help=argparse.SUPPRESS)
+    parser.add_argument("--generate", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.input)))
+        return
+    if args.generate:
+        print(json.dumps({"table_cells": make_synthetic_docx(args.input, args.pages)}))
+        return
+
+    synthetic_dir = None
+    table_cells = None
+    if not args.input:
+        synthetic_dir = tempfile.mkdtemp(prefix="bench_docx_")
+        args.input = os.path.join(synthetic_dir, "synthetic.docx")
+        print(f"Generating {args.pages} page synthetic document...")
+        command = [
+            sys.executable, os.path.abspath(__file__),
+            "--generate", "--input", args.input, "--pages", str(args.pages),
+        ]
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        table_cells = json.loads(output.strip().splitlines()[-1])["table_cells"]
+
+    try:
+        print(f"Input: {args.input} ({os.path.getsize(args.input) / (1024 * 1024):.1f} MB)\n")
+        cells_header = f"cells/{table_cells}" if table_cells else "cells"
+        print(f"{'engine':<12} {'wall s':>8} {'peak MB':>8} {'chars':>10} {cells_header:>12} {'headings':>9}")
+        for engine in ENGINES:
+            results = [run_in_child(engine, args.input) for _ in range(args.runs)]
+            print(
+                f"{engine:<12} "
+                f"{statistics.median(r['seconds'] for r in results):>8.2f} "
+                f"{max(r['peak_rss_mb'] for r in results):>8.1f} "
+                f"{results[0]['chars']:>10} "
+                f"{results[0]['table_cells']:>12} "
+                f"{results[0]['headings']:>9}"
+            )
+    finally:
+        if synthetic_dir:
+            shutil.rmtree(synthetic_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
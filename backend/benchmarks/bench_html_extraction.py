@@ -0,0 +1,131 @@
+"""
+Benchmark: HTML main-content extraction engines (lxml vs the original bs4).
+
+Every page in the corpus directory (NAME.html) has a hand-checked NAME.txt
+with the text a reader would consider the page's main content. Quality is
+word-level precision (how much of the output is main content) and recall
+(how much of the main content made it into the output); speed is the median
+extraction time over --runs runs. A large page is also synthesized by
+padding one corpus page with a long comment thread, to show scaling.
+
+Usage (from backend/):
+    python benchmarks/bench_html_extraction.py
+    python benchmarks/bench_html_extraction.py --runs 20 --large-mb 4
+    python benchmarks/bench_html_extraction.py --corpus ~/saved_pages
+"""
+import argparse
+import os
+import re
+import statistics
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.html_extraction import DEFAULT_MAX_PARSE_BYTES, HTML_ENGINES  # noqa: E402
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "html_corpus")
+
+_WORD = re.compile(r"\w+")
+
+
+def load_corpus(directory: str) -> List[Tuple[str, bytes, Optional[str]]]:
+    pages = []
+    for name in sorted(os.listdir(directory)):
+        if not name.endswith(".html"):
+            continue
+        stem = name[:-5]
+        with open(os.path.join(directory, name), "rb") as f:
+            html = f.read()
+        gold_path = os.path.join(directory, stem + ".txt")
+        gold = None
+        if os.path.exists(gold_path):
+            with open(gold_path, "r", encoding="utf-8") as f:
+                gold = f.read()
+        pages.append((stem, html, gold))
+    return pages
+
+
+def make_large_page(html: bytes, target_bytes: int) -> bytes:
+    """Pad a page with a long comment thread before </body> (gold text unchanged)"""
+    comment = (
+        '<li class="comment"><div class="comment-body"><b class="fn">Reader</b> says: '
+        '<p>Thanks for this, it was really helpful, I shared it with my whole team and we all '
+        'learned something new, looking forward to the next post!</p>'
+        '<a href="/reply">Reply</a></div></li>'
+    ).encode("utf-8")
+    repeats = max(0, (target_bytes - len(html)) // len(comment))
+    thread = b'<div id="comments-extra" class="comments-area"><ol class="comment-list">' + comment * repeats + b"</ol></div>"
+    return html.replace(b"</body>", thread + b"</body>", 1)
+
+
+def word_scores(extracted: str, gold: str) -> Dict[str, float]:
+    got = Counter(word.lower() for word in _WORD.findall(extracted))
+    want = Counter(word.lower() for word in _WORD.findall(gold))
+    overlap = sum((got & want).values())
+    precision = overlap / sum(got.values()) if got else 0.0
+    recall = overlap / sum(want.values()) if want else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {"precision": precision, "recall": recall, "f1": f1}
+
+
+def time_engine(engine: str, html: bytes, runs: int, max_bytes: int) -> Tuple[float, str]:
+    extract = HTML_ENGINES[engine]
+    timings = []
+    text = ""
+    for _ in range(runs):
+        started = time.perf_counter()
+        text = extract(html, max_bytes)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--large-mb", type=float, default=1.5, help="size of the synthesized large page (0 to skip)")
+    parser.add_argument("--max-bytes", type=int, default=DEFAULT_MAX_PARSE_BYTES)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        sys.exit(f"No .html pages in {args.corpus}")
+    if args.large_mb > 0:
+        name, html, gold = next((page for page in pages if page[0] == "blog_post"), pages[0])
+        pages.append((f"{name}_large", make_large_page(html, int(args.large_mb * 1024 * 1024)), gold))
+
+    engines = list(HTML_ENGINES)
+    header = f"{'page':<20} {'KB':>7}" + "".join(f" {e + ' ms':>10} {e + ' P':>7} {e + ' R':>7}" for e in engines)
+    print(header)
+    print("-" * len(header))
+
+    totals = {engine: {"ms": [], "precision": [], "recall": [], "f1": []} for engine in engines}
+    for name, html, gold in pages:
+        row = f"{name:<20} {len(html) / 1024:>7.0f}"
+        for engine in engines:
+            ms, text = time_engine(engine, html, args.runs, args.max_bytes)
+            totals[engine]["ms"].append(ms)
+            if gold is None:
+                row += f" {ms:>10.2f} {'-':>7} {'-':>7}"
+                continue
+            scores = word_scores(text, gold)
+            for key in ("precision", "recall", "f1"):
+                totals[engine][key].append(scores[key])
+            row += f" {ms:>10.2f} {scores['precision']:>7.2f} {scores['recall']:>7.2f}"
+        print(row)
+
+    print()
+    for engine in engines:
+        t = totals[engine]
+        print(
+            f"{engine:<6} total {sum(t['ms']):8.1f} ms | "
+            f"mean precision {statistics.mean(t['precision']):.3f} "
+            f"recall {statistics.mean(t['recall']):.3f} F1 {statistics.mean(t['f1']):.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
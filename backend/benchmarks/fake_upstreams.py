@@ -0,0 +1,274 @@
+"""
+Local stand-ins for every upstream the backend calls, for offline load tests.
+
+- POST /perplexity/chat/completions: quiz JSON, plain or streamed (SSE)
+- POST /openai/v1/chat/completions: educational-content classification
+- POST /openai/v1/audio/transcriptions: Whisper (response_format=text)
+- GET  /pages/{id}.html: article pages, with ETag revalidation
+- GET  /videos/{id}.html: an HTML5 video page with an English captions
+  track (/videos/{id}.vtt), which yt-dlp's generic extractor picks up
+- GET  /_stats: requests, errors and 429s served per upstream
+
+Each upstream has a log-normal latency (median and p95 seconds), an error
+rate (500s) and a rate-limit rate (429s with Retry-After), set by a JSON
+config. Content is generated deterministically from the id, so the same id
+always yields the same page, video or document.
+
+Usage (normally started by loadtest.py):
+    python benchmarks/fake_upstreams.py --port 8900
+    python benchmarks/fake_upstreams.py --port 8900 --config '{"perplexity": {"median": 2, "p95": 6}}'
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+UPSTREAMS = ("perplexity", "openai_chat", "whisper", "web")
+
+DEFAULT_CONFIG: Dict[str, Dict[str, float]] = {
+    "perplexity": {"median": 1.5, "p95": 4.0, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "openai_chat": {"median": 0.6, "p95": 1.5, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "whisper": {"median": 3.0, "p95": 8.0, "error_rate": 0.0, "rate_limit_rate": 0.0},
+    "web": {"median": 0.08, "p95": 0.4, "error_rate": 0.0, "rate_limit_rate": 0.0},
+}
+
+_TOPICS = [
+    ("photosynthesis", "Plants convert light energy into chemical energy stored in glucose, releasing oxygen."),
+    ("cell division", "Mitosis produces two genetically identical daughter cells, while meiosis produces gametes."),
+    ("plate tectonics", "The lithosphere is broken into plates whose movement causes earthquakes and mountains."),
+    ("supply and demand", "Prices rise when demand exceeds supply and fall when supply exceeds demand."),
+    ("the water cycle", "Water evaporates, condenses into clouds, and returns to the surface as precipitation."),
+    ("Newton's laws", "A net force on an object produces an acceleration proportional to the force."),
+    ("the French Revolution", "Beginning in 1789, it abolished feudal privileges and reshaped European politics."),
+    ("binary search", "Searching a sorted array by halving the interval takes logarithmic time."),
+]
+
+_FILLER = (
+    "Researchers describe how {topic} works step by step, defining each term before using it. "
+    "The key idea is that {fact} Students often confuse this with related ideas, so the chapter "
+    "compares them with worked examples, diagrams and review questions. In experiment {n}, measurements "
+    "were repeated to reduce error, and the results support the model described above. "
+)
+
+
+def educational_text(source_id: str, paragraphs: int = 12) -> str:
+    """Deterministic, moderately varied educational prose for an id"""
+    rng = random.Random(hashlib.sha256(source_id.encode()).hexdigest())
+    topic, fact = rng.choice(_TOPICS)
+    body = []
+    for index in range(paragraphs):
+        # Alternate the main topic with others so chunks are not identical
+        para_topic, para_fact = (topic, fact) if index % 2 == 0 else rng.choice(_TOPICS)
+        body.append(_FILLER.format(topic=para_topic, fact=para_fact, n=rng.randint(1, 999)))
+    return f"An introduction to {topic} ({source_id})\n\n" + "\n\n".join(body)
+
+
+_WORDS = (
+    "energy cell force price plate cloud array oxygen glucose gamete feudal interval membrane enzyme "
+    "magma orbit tariff estate sorting gradient vapor mass inertia market crust chromosome"
+).split()
+
+
+def quiz_json(seed: str, count: int = 5, tag_difficulty: bool = False) -> str:
+    rng = random.Random(seed)
+    questions = []
+    for number in range(1, count + 1):
+        topic, fact = rng.choice(_TOPICS)
+        # Distinct wording, so de-duplication keeps larger (question bank) sets
+        detail = " ".join(rng.sample(_WORDS, 3))
+        question = {
+            "id": number,
+            "question": f"Which statement about {topic} and its {detail} is correct?",
+            "options": [f"{fact} (see {detail})", f"It only affects {detail}.", "It was disproved in 1990.",
+                        "None of the above."],
+            "correctAnswer": 0,
+        }
+        if tag_difficulty:
+            question["difficulty"] = ("easy", "medium", "medium", "easy", "hard")[number % 5]
+        questions.append(question)
+    return json.dumps({"questions": questions})
+
+
+class Upstream:
+    """Latency / error / 429 behaviour of one upstream, plus counters"""
+
+    def __init__(self, name: str, config: Dict[str, float], rng: random.Random):
+        self.name = name
+        self.median = max(float(config.get("median", 0.0)), 0.0)
+        p95 = float(config.get("p95", self.median))
+        # Log-normal with the given median and 95th percentile
+        self.sigma = math.log(p95 / self.median) / 1.645 if self.median > 0 and p95 > self.median else 0.0
+        self.error_rate = float(config.get("error_rate", 0.0))
+        self.rate_limit_rate = float(config.get("rate_limit_rate", 0.0))
+        self.rng = rng
+        self.counters: Counter = Counter()
+
+    def latency(self) -> float:
+        if self.median <= 0:
+            return 0.0
+        return self.rng.lognormvariate(math.log(self.median), self.sigma)
+
+    async def respond(self) -> Optional[Response]:
+        """Sleep for a sampled latency; an error response if one is due"""
+        self.counters["requests"] += 1
+        await asyncio.sleep(self.latency())
+        roll = self.rng.random()
+        if roll < self.rate_limit_rate:
+            self.counters["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+                status_code=429,
+                headers={"retry-after": "1"}
+            )
+        if roll < self.rate_limit_rate + self.error_rate:
+            self.counters["errors"] += 1
+            return JSONResponse({"error": {"message": "Internal error", "type": "server_error"}}, status_code=500)
+        return None
+
+
+def create_app(config: Optional[Dict[str, Dict[str, float]]] = None, seed: int = 7) -> FastAPI:
+    rng = random.Random(seed)
+    merged = {name: {**DEFAULT_CONFIG[name], **((config or {}).get(name) or {})} for name in UPSTREAMS}
+    upstreams = {name: Upstream(name, merged[name], rng) for name in UPSTREAMS}
+    app = FastAPI()
+
+    @app.post("/perplexity/chat/completions")
+    async def perplexity(request: Request):
+        body = await request.json()
+        failure = await upstreams["perplexity"].respond()
+        if failure:
+            return failure
+        prompt = body.get("messages", [{}])[-1].get("content", "")
+        count = re.search(r"create exactly (\d+)", prompt)
+        content = quiz_json(
+            hashlib.sha256(json.dumps(body.get("messages", "")).encode()).hexdigest(),
+            count=int(count.group(1)) if count else 5,
+            tag_difficulty='"difficulty"' in prompt
+        )
+        if not body.get("stream"):
+            return {
+                "id": "fake", "model": body.get("model"), "object": "chat.completion", "created": int(time.time()),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 800, "completion_tokens": 400, "total_tokens": 1200},
+            }
+
+        async def events():
+            pieces = [content[i:i + 40] for i in range(0, len(content), 40)]
+            for piece in pieces:
+                chunk = {"choices": [{"index": 0, "delta": {"content": piece}}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+                await asyncio.sleep(0.005)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/openai/v1/chat/completions")
+    async def openai_chat(request: Request):
+        body = await request.json()
+        failure = await upstreams["openai_chat"].respond()
+        if failure:
+            return failure
+        analysis = {
+            "is_educational": True,
+            "confidence": 92,
+            "topics": ["science"],
+            "educational_indicators": ["explains concepts", "worked examples"],
+            "non_educational_flags": [],
+            "reasoning": "Structured explanatory material.",
+        }
+        return {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+            "model": body.get("model", "gpt-4o"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": json.dumps(analysis)},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 900, "completion_tokens": 120, "total_tokens": 1020},
+        }
+
+    @app.post("/openai/v1/audio/transcriptions")
+    async def whisper(request: Request):
+        await request.body()
+        failure = await upstreams["whisper"].respond()
+        if failure:
+            return failure
+        return PlainTextResponse(educational_text(f"audio-{rng.random()}", paragraphs=6))
+
+    @app.get("/pages/{page_id}.html")
+    async def page(page_id: str, request: Request):
+        failure = await upstreams["web"].respond()
+        if failure:
+            return failure
+        etag = f'"{hashlib.sha256(page_id.encode()).hexdigest()[:16]}"'
+        headers = {"etag": etag, "cache-control": "max-age=0"}
+        if request.headers.get("if-none-match") == etag:
+            upstreams["web"].counters["not_modified"] += 1
+            return Response(status_code=304, headers=headers)
+        paragraphs = "".join(f"<p>{p}</p>" for p in educational_text(page_id).split("\n\n"))
+        html = (
+            f"<html><head><title>Article {page_id}</title></head><body>"
+            f"<nav><a href='/'>Home</a> <a href='/about'>About</a></nav>"
+            f"<main><article><h1>Article {page_id}</h1>{paragraphs}</article></main>"
+            f"<aside class='sidebar'>Related links</aside><footer>Copyright</footer></body></html>"
+        )
+        return Response(html, media_type="text/html", headers=headers)
+
+    @app.get("/videos/{video_id}.html")
+    async def video_page(video_id: str):
+        failure = await upstreams["web"].respond()
+        if failure:
+            return failure
+        html = (
+            f"<html><head><title>Lecture {video_id}</title></head><body><h1>Lecture {video_id}</h1>"
+            f"<video controls><source src='/videos/{video_id}.mp4' type='video/mp4'>"
+            f"<track kind='captions' srclang='en' label='English' src='/videos/{video_id}.vtt'></video></body></html>"
+        )
+        return Response(html, media_type="text/html")
+
+    @app.get("/videos/{video_id}.vtt")
+    async def captions(video_id: str):
+        failure = await upstreams["web"].respond()
+        if failure:
+            return failure
+        cues = ["WEBVTT", ""]
+        for index, sentence in enumerate(educational_text(video_id, paragraphs=8).replace("\n\n", " ").split(". ")):
+            start, end = index * 4, index * 4 + 4
+            cues += [f"00:{start // 60:02d}:{start % 60:02d}.000 --> 00:{end // 60:02d}:{end % 60:02d}.000", sentence, ""]
+        return PlainTextResponse("\n".join(cues), media_type="text/vtt")
+
+    @app.get("/videos/{video_id}.mp4")
+    async def video_file(video_id: str):
+        return Response(b"\x00" * 1024, media_type="video/mp4")
+
+    @app.get("/_stats")
+    async def stats():
+        return {name: dict(upstream.counters) for name, upstream in upstreams.items()}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--config", default="{}", help="JSON: {upstream: {median, p95, error_rate, rate_limit_rate}}")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(json.loads(args.config), args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,519 @@
+"""
+Offline end-to-end load test.
+
+For each scenario, fake upstreams (fake_upstreams.py: Perplexity, OpenAI
+chat and Whisper, and a page/video host) and the real FastAPI app are
+started as local subprocesses. The app is pointed at the fakes through
+PERPLEXITY_API_URL and OPENAI_BASE_URL, and a mix of requests is driven
+through /api/generate-quiz and its streaming variant:
+- txt and docx uploads
+- web URLs
+- video URLs, which take the yt-dlp metadata + captions path
+
+The report covers throughput, p50/p95/p99 latency overall and per request
+kind, time to the first streamed question, and the peak RSS of the app
+(including its worker processes). It also shows how many calls reached
+each fake upstream. Nothing touches the network.
+
+Some requests reuse a small set of "hot" sources, as when a shared link
+is opened by a whole class. Upstream latency is log-normal (median/p95),
+with optional 500 and 429 rates; --time-scale shrinks all latencies for
+quick CI runs.
+
+To gate regressions, save a run with --json and compare later runs with
+--baseline. The exit status is 1 if any scenario's p95 rose, its
+throughput fell, or its error rate grew beyond --tolerance.
+
+Usage (from backend/):
+    python benchmarks/loadtest.py                                  # all scenarios
+    python benchmarks/loadtest.py --scenario mixed --scenario shared_link
+    python benchmarks/loadtest.py --time-scale 0.2 --json baseline.json
+    python benchmarks/loadtest.py --time-scale 0.2 --baseline baseline.json --tolerance 0.25
+    python benchmarks/loadtest.py --scenarios my_scenarios.json    # {name: scenario} overrides
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_upstreams import DEFAULT_CONFIG, educational_text  # noqa: E402
+
+SCENARIOS: Dict[str, Dict[str, Any]] = {
+    "mixed": {
+        "description": "Typical traffic: uploads, articles and videos, some shared",
+        "requests": 120,
+        "concurrency": 12,
+        "mix": {"txt": 0.25, "docx": 0.1, "web": 0.35, "video": 0.3},
+        "stream_ratio": 0.2,
+        "hot_ratio": 0.3,
+        "hot_sources": 4,
+    },
+    "shared_link": {
+        "description": "A class opens one shared video link at once",
+        "requests": 60,
+        "concurrency": 30,
+        "mix": {"video": 1.0},
+        "stream_ratio": 0.3,
+        "hot_ratio": 1.0,
+        "hot_sources": 1,
+    },
+    "cold": {
+        "description": "Every request is a new source and the result cache is off",
+        "requests": 80,
+        "concurrency": 12,
+        "mix": {"txt": 0.3, "web": 0.4, "video": 0.3},
+        "stream_ratio": 0.0,
+        "hot_ratio": 0.0,
+        "env": {"QUIZ_CACHE_BACKEND": "none"},
+    },
+    "flaky_llm": {
+        "description": "Perplexity fails 15% and throttles 5% of calls; OpenAI fails 5%",
+        "requests": 100,
+        "concurrency": 12,
+        "mix": {"txt": 0.4, "web": 0.4, "video": 0.2},
+        "stream_ratio": 0.2,
+        "hot_ratio": 0.2,
+        "hot_sources": 4,
+        "upstreams": {
+            "perplexity": {"error_rate": 0.15, "rate_limit_rate": 0.05},
+            "openai_chat": {"error_rate": 0.05},
+        },
+    },
+}
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def process_tree_rss_mb(pid: int) -> Optional[float]:
+    """Resident memory of a process and all its descendants (Linux /proc)"""
+    if not os.path.isdir("/proc"):
+        return None
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Field 4 is the parent pid; the command name (2) may contain spaces
+                parent = int(f.read().rsplit(")", 1)[1].split()[1])
+            children.setdefault(parent, []).append(int(entry))
+        except (OSError, ValueError, IndexError):
+            continue
+
+    total_kb = 0
+    pending = [pid]
+    while pending:
+        current = pending.pop()
+        pending.extend(children.get(current, []))
+        try:
+            with open(f"/proc/{current}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            continue
+    return total_kb / 1024
+
+
+class MemorySampler(threading.Thread):
+    """Polls the process tree's RSS in the background, keeping the peak"""
+
+    def __init__(self, pid: int, interval: float = 0.25):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak_mb = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            rss = process_tree_rss_mb(self.pid)
+            if rss is not None:
+                self.peak_mb = max(self.peak_mb, rss)
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> float:
+        self._stop_event.set()
+        self.join()
+        return self.peak_mb
+
+
+def wait_ready(url: str, process: subprocess.Popen, log_path: str, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    with open(log_path, "r", errors="replace") as f:
+        tail = f.read()[-3000:]
+    raise RuntimeError(f"{url} did not come up:\n{tail}")
+
+
+def start_process(command: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+
+def stop_process(process: subprocess.Popen):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def scaled_upstreams(overrides: Dict[str, Dict[str, float]], time_scale: float) -> Dict[str, Dict[str, float]]:
+    config = {}
+    for name, defaults in DEFAULT_CONFIG.items():
+        merged = {**defaults, **(overrides.get(name) or {})}
+        merged["median"] *= time_scale
+        merged["p95"] *= time_scale
+        config[name] = merged
+    return config
+
+
+def app_env(upstream_url: str, work_dir: str, overrides: Dict[str, str]) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "PYTHONUNBUFFERED": "1",
+        "PERPLEXITY_API_KEY": "fake-perplexity-key",
+        "PERPLEXITY_API_URL": f"{upstream_url}/perplexity/chat/completions",
+        "OPENAI_API_KEY": "sk-fake",
+        "OPENAI_BASE_URL": f"{upstream_url}/openai/v1",
+        # Measure the app, not the production rate limits
+        "PERPLEXITY_RPM": "100000",
+        "PERPLEXITY_TPM": "",
+        "OPENAI_RPM": "100000",
+        "OPENAI_TPM": "1000000000",
+        "WHISPER_RPM": "100000",
+        # Every fake page lives on one host; real traffic is spread over many
+        "HTTP_WEB_PER_HOST_LIMIT": "64",
+        "VERDICT_STORE_ENABLED": "false",
+        "LOCAL_CLASSIFIER_ENABLED": "false",
+        "QUIZ_CACHE_SQLITE_PATH": os.path.join(work_dir, "quiz_cache.sqlite3"),
+        "WEB_CACHE_PATH": os.path.join(work_dir, "web_cache.sqlite3"),
+        "QUESTION_BANK_PATH": os.path.join(work_dir, "question_bank.sqlite3"),
+        "JOB_STORAGE_DIR": os.path.join(work_dir, "jobs"),
+    }
+    env.update(overrides)
+    return env
+
+
+_docx_cache: Dict[str, bytes] = {}
+
+
+def docx_bytes(source_id: str) -> bytes:
+    if source_id not in _docx_cache:
+        from docx import Document
+
+        document = Document()
+        title, *paragraphs = educational_text(source_id).split("\n\n")
+        document.add_heading(title, level=1)
+        for paragraph in paragraphs:
+            document.add_paragraph(paragraph)
+        buffer = io.BytesIO()
+        document.save(buffer)
+        _docx_cache[source_id] = buffer.getvalue()
+    return _docx_cache[source_id]
+
+
+def plan_requests(scenario: Dict[str, Any], seed: int) -> List[Dict[str, Any]]:
+    """The scenario's requests: kind, source id and whether to stream"""
+    rng = random.Random(seed)
+    kinds = list(scenario["mix"])
+    weights = [scenario["mix"][kind] for kind in kinds]
+    hot_sources = max(1, scenario.get("hot_sources", 1))
+    planned = []
+    for index in range(scenario["requests"]):
+        kind = rng.choices(kinds, weights)[0]
+        hot = rng.random() < scenario.get("hot_ratio", 0.0)
+        source_id = f"{kind}-hot-{rng.randrange(hot_sources)}" if hot else f"{kind}-{seed}-{index}"
+        planned.append({
+            "kind": kind,
+            "source_id": source_id,
+            "stream": rng.random() < scenario.get("stream_ratio", 0.0),
+        })
+    return planned
+
+
+def request_payload(planned: Dict[str, Any], upstream_url: str) -> Dict[str, Any]:
+    kind, source_id = planned["kind"], planned["source_id"]
+    if kind == "txt":
+        return {"files": {"file": (f"{source_id}.txt", educational_text(source_id).encode(), "text/plain")}}
+    if kind == "docx":
+        return {"files": {"file": (f"{source_id}.docx", docx_bytes(source_id), "application/octet-stream")}}
+    if kind == "web":
+        return {"data": {"url": f"{upstream_url}/pages/{source_id}.html"}}
+    if kind == "video":
+        return {"data": {"video_url": f"{upstream_url}/videos/{source_id}.html"}}
+    raise ValueError(f"Unknown request kind: {kind}")
+
+
+async def send(client: httpx.AsyncClient, app_url: str, planned: Dict[str, Any], upstream_url: str) -> Dict[str, Any]:
+    payload = request_payload(planned, upstream_url)
+    started = time.perf_counter()
+    first_question = None
+    try:
+        if not planned["stream"]:
+            response = await client.post(f"{app_url}/api/generate-quiz", **payload)
+            status = response.status_code
+        else:
+            status = None
+            async with client.stream("POST", f"{app_url}/api/generate-quiz/stream", **payload) as response:
+                event = None
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        event = line[6:].strip()
+                    elif line.startswith("data:") and event == "question" and first_question is None:
+                        first_question = time.perf_counter() - started
+                    elif line.startswith("data:") and event == "error":
+                        status = json.loads(line[5:]).get("status_code", 500)
+                if status is None:
+                    status = response.status_code
+    except httpx.HTTPError as e:
+        status = f"client:{type(e).__name__}"
+    return {
+        **planned,
+        "status": status,
+        "seconds": time.perf_counter() - started,
+        "first_question_seconds": first_question,
+    }
+
+
+async def drive(app_url: str, upstream_url: str, planned: List[Dict[str, Any]], concurrency: int) -> List[Dict]:
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in planned:
+        queue.put_nowait(item)
+    results = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=600, limits=limits) as client:
+        async def worker():
+            while not queue.empty():
+                results.append(await send(client, app_url, queue.get_nowait(), upstream_url))
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results
+
+
+def percentile(values: List[float], fraction: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(results: List[Dict], elapsed: float) -> Dict[str, Any]:
+    ok = [r for r in results if r["status"] == 200]
+    latencies = [r["seconds"] for r in ok]
+    first_questions = [r["first_question_seconds"] for r in ok if r["first_question_seconds"] is not None]
+    statuses: Dict[str, int] = {}
+    for r in results:
+        statuses[str(r["status"])] = statuses.get(str(r["status"]), 0) + 1
+    return {
+        "requests": len(results),
+        "ok": len(ok),
+        "error_rate": round(1 - len(ok) / len(results), 4) if results else 0.0,
+        "statuses": statuses,
+        "throughput_rps": round(len(ok) / elapsed, 3) if elapsed else None,
+        "p50_seconds": _round(percentile(latencies, 0.50)),
+        "p95_seconds": _round(percentile(latencies, 0.95)),
+        "p99_seconds": _round(percentile(latencies, 0.99)),
+        "mean_seconds": _round(statistics.mean(latencies) if latencies else None),
+        "first_question_p50_seconds": _round(percentile(first_questions, 0.50)),
+    }
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+def run_scenario(name: str, scenario: Dict[str, Any], args) -> Dict[str, Any]:
+    work_dir = tempfile.mkdtemp(prefix=f"loadtest_{name}_")
+    upstream_port, app_port = free_port(), free_port()
+    upstream_url, app_url = f"http://127.0.0.1:{upstream_port}", f"http://127.0.0.1:{app_port}"
+    upstream_config = scaled_upstreams(scenario.get("upstreams") or {}, args.time_scale)
+
+    upstream_log = os.path.join(work_dir, "upstreams.log")
+    app_log = os.path.join(work_dir, "app.log")
+    upstreams = start_process(
+        [sys.executable, os.path.join(BENCH_DIR, "fake_upstreams.py"), "--port", str(upstream_port),
+         "--config", json.dumps(upstream_config), "--seed", str(args.seed)],
+        dict(os.environ),
+        upstream_log
+    )
+    app = None
+    try:
+        wait_ready(f"{upstream_url}/_stats", upstreams, upstream_log)
+        app = start_process(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(app_port),
+             "--log-level", "warning"],
+            app_env(upstream_url, work_dir, scenario.get("env") or {}),
+            app_log
+        )
+        wait_ready(f"{app_url}/health", app, app_log)
+        idle_mb = process_tree_rss_mb(app.pid)
+
+        planned = plan_requests(scenario, args.seed)
+        concurrency = args.concurrency or scenario["concurrency"]
+        sampler = MemorySampler(app.pid)
+        sampler.start()
+        started = time.perf_counter()
+        results = asyncio.run(drive(app_url, upstream_url, planned, concurrency))
+        elapsed = time.perf_counter() - started
+        peak_mb = sampler.stop()
+
+        summary = summarize(results, elapsed)
+        summary.update({
+            "concurrency": concurrency,
+            "elapsed_seconds": round(elapsed, 2),
+            "idle_rss_mb": _round(idle_mb),
+            "peak_rss_mb": _round(peak_mb) if peak_mb else None,
+            "kinds": {
+                kind: summarize([r for r in results if r["kind"] == kind], elapsed)
+                for kind in sorted({r["kind"] for r in results})
+            },
+            "upstream_calls": httpx.get(f"{upstream_url}/_stats").json(),
+            "coalesced": httpx.get(f"{app_url}/api/cache/stats").json().get("coalesced"),
+        })
+        if args.keep_logs:
+            summary["logs"] = work_dir
+        return summary
+    finally:
+        if app is not None:
+            stop_process(app)
+        stop_process(upstreams)
+        if not args.keep_logs:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def print_report(results: Dict[str, Dict[str, Any]]):
+    def fmt(value, spec=".2f"):
+        return format(value, spec) if value is not None else "-"
+
+    header = (
+        f"{'scenario':<14} {'kind':<7} {'reqs':>5} {'err%':>6} {'req/s':>7} {'p50 s':>7} {'p95 s':>7} "
+        f"{'p99 s':>7} {'1st q s':>8} {'peak MB':>8}"
+    )
+    print(header)
+    print("-" * len(header))
+    for name, summary in results.items():
+        rows = [("all", summary)] + list(summary["kinds"].items())
+        for kind, row in rows:
+            print(
+                f"{name if kind == 'all' else '':<14} {kind:<7} {row['requests']:>5} "
+                f"{row['error_rate'] * 100:>6.1f} {fmt(row['throughput_rps']):>7} {fmt(row['p50_seconds']):>7} "
+                f"{fmt(row['p95_seconds']):>7} {fmt(row['p99_seconds']):>7} "
+                f"{fmt(row['first_question_p50_seconds']):>8} "
+                f"{fmt(summary['peak_rss_mb'], '.0f') if kind == 'all' else '':>8}"
+            )
+        calls = ", ".join(
+            f"{upstream} {counters.get('requests', 0)}"
+            + (f" ({counters['errors']} 5xx)" if counters.get("errors") else "")
+            + (f" ({counters['rate_limited']} 429)" if counters.get("rate_limited") else "")
+            for upstream, counters in summary["upstream_calls"].items()
+        )
+        print(f"{'':<14} upstream calls: {calls}")
+        print(f"{'':<14} statuses: {summary['statuses']}")
+    print()
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], tolerance: float) -> List[str]:
+    """Regressions against a baseline run, as human-readable lines"""
+    regressions = []
+    for name, summary in results.items():
+        before = baseline.get(name)
+        if not before:
+            continue
+        if before.get("p95_seconds") and summary.get("p95_seconds") is not None:
+            if summary["p95_seconds"] > before["p95_seconds"] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {before['p95_seconds']:.3f}s -> {summary['p95_seconds']:.3f}s")
+        if before.get("throughput_rps") and summary.get("throughput_rps") is not None:
+            if summary["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+                regressions.append(
+                    f"{name}: throughput {before['throughput_rps']:.2f} -> {summary['throughput_rps']:.2f} req/s"
+                )
+        if summary["error_rate"] > before["error_rate"] + tolerance * max(before["error_rate"], 0.05):
+            regressions.append(f"{name}: error rate {before['error_rate']:.1%} -> {summary['error_rate']:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", help="scenario to run (repeatable; default: all)")
+    parser.add_argument("--scenarios", help="JSON file of extra/overriding scenarios")
+    parser.add_argument("--requests", type=int, help="override every scenario's request count")
+    parser.add_argument("--concurrency", type=int, help="override every scenario's concurrency")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="multiply all upstream latencies")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="write the results as JSON")
+    parser.add_argument("--baseline", metavar="PATH", help="fail on regressions against this JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--keep-logs", action="store_true", help="keep app/upstream logs and report where")
+    args = parser.parse_args()
+
+    scenarios = dict(SCENARIOS)
+    if args.scenarios:
+        with open(args.scenarios, "r", encoding="utf-8") as f:
+            scenarios.update(json.load(f))
+    names = args.scenario or list(scenarios)
+    unknown = [name for name in names if name not in scenarios]
+    if unknown:
+        sys.exit(f"Unknown scenario(s): {', '.join(unknown)} (available: {', '.join(scenarios)})")
+
+    results = {}
+    for name in names:
+        scenario = dict(scenarios[name])
+        if args.requests:
+            scenario["requests"] = args.requests
+        print(f"▶ {name}: {scenario.get('description', '')}")
+        results[name] = run_scenario(name, scenario, args)
+    print()
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("Regressions beyond tolerance:")
+            for line in regressions:
+                print(f"  - {line}")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,28 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import FastAPI, File, UploadFile, Form, HTTPException, Header, Depends, Request
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List
+import json
 import os
+import secrets
 from dotenv import load_dotenv
 
 from services.document_processor import DocumentProcessor
-from services.quiz_generator import QuizGenerator
+from services.quiz_generator import QuizGenerator, QUIZ_LENGTH
 from services.video_processor import VideoProcessor
 from services.verification_service import VerificationService
+from services.http_clients import get_http_clients
+from services.task_executor import get_task_executor
+from services.rate_limiter import get_rate_limiters, set_client_id, reset_client_id
+from services.result_cache import ResultCache
+from services.quiz_pipeline import QuizPipeline, StageLimiter, describe_error, error_headers
+from services.single_flight import SingleFlight
+from services.quiz_batch import BatchRunner
+from services.question_bank import QuestionBank, QuizAssembly
+from services import metrics
+from services.job_queue import JobQueue
 from models.quiz import QuizResponse
-from models.verification import VerificationStatus, SourceInfo
+from models.job import JobResponse
 
 load_dotenv()
 
@@ -35,14 +48,138 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def bind_client_id(request: Request, call_next):
+    """
+    Identify the caller for per-client fairness in the LLM rate limiters:
+    the X-Client-ID header (e.g. a classroom or user ID) or the client IP
+    """
+    client_id = request.headers.get("X-Client-ID") or (request.client.host if request.client else "anonymous")
+    token = set_client_id(client_id)
+    try:
+        return await call_next(request)
+    finally:
+        reset_client_id(token)
+
 # Initialize services
 openai_api_key = os.getenv("OPENAI_API_KEY")
-document_processor = DocumentProcessor(openai_api_key=openai_api_key)
-quiz_generator = QuizGenerator()
+task_executor = get_task_executor()
+http_clients = get_http_clients()
+rate_limiters = get_rate_limiters()
+document_processor = DocumentProcessor(
+    openai_api_key=openai_api_key,
+    executor=task_executor,
+    http_clients=http_clients
+)
+quiz_generator = QuizGenerator(http_clients=http_clients, executor=task_executor, rate_limiters=rate_limiters)
 
 # Initialize video and verification services if OpenAI key available
-video_processor = VideoProcessor(openai_api_key) if openai_api_key else None
-verification_service = VerificationService(openai_api_key) if openai_api_key else None
+video_processor = VideoProcessor(
+    openai_api_key,
+    executor=task_executor,
+    http_clients=http_clients
+) if openai_api_key else None
+verification_service = VerificationService(
+    openai_api_key,
+    http_clients=http_clients,
+    rate_limiters=rate_limiters,
+    executor=task_executor
+) if openai_api_key else None
+
+# Content-addressed cache for extraction, verification and quiz results
+result_cache = ResultCache.from_env(executor=task_executor)
+
+# Speculative mode: generate the quiz while verification is still running and
+# discard it if the content is rejected. Costs extra LLM spend on rejected
+# content in exchange for roughly halving latency on unwhitelisted sources.
+speculative_generation = os.getenv("SPECULATIVE_GENERATION", "false").lower() == "true"
+
+# Identical extraction/verification/generation work running at the same time
+# (many students opening one shared link) is done once and shared
+single_flight = SingleFlight()
+
+# Per-source pools of difficulty-tagged questions; from_bank requests get a
+# randomized quiz drawn from the pool instead of a fresh generation
+question_bank = QuestionBank.from_env()
+
+# Extract -> verify -> generate flow used by the synchronous endpoint
+pipeline = QuizPipeline(
+    document_processor=document_processor,
+    quiz_generator=quiz_generator,
+    video_processor=video_processor,
+    verification_service=verification_service,
+    result_cache=result_cache,
+    speculative_generation=speculative_generation,
+    single_flight=single_flight,
+    question_bank=question_bank
+)
+
+# Background jobs for long video/document processing, with their own
+# per-stage concurrency limits so a burst of jobs can't starve the sync API
+job_queue = JobQueue(
+    pipeline=QuizPipeline(
+        document_processor=document_processor,
+        quiz_generator=quiz_generator,
+        video_processor=video_processor,
+        verification_service=verification_service,
+        result_cache=result_cache,
+        speculative_generation=speculative_generation,
+        single_flight=single_flight,
+        stage_limiter=StageLimiter({
+            "extraction": int(os.getenv("JOB_EXTRACTION_CONCURRENCY", "2")),
+            "verification": int(os.getenv("JOB_VERIFICATION_CONCURRENCY", "4")),
+            "generation": int(os.getenv("JOB_GENERATION_CONCURRENCY", "4")),
+        })
+    ),
+    storage_dir=os.getenv("JOB_STORAGE_DIR", "jobs"),
+    workers=int(os.getenv("JOB_WORKERS", "4")),
+    retention_seconds=float(os.getenv("JOB_RETENTION_SECONDS", "86400"))
+)
+
+# Batch requests (many chapters or links at once) share one set of per-stage
+# limits across all batches, separate from the interactive API's
+batch_runner = BatchRunner(
+    pipeline=QuizPipeline(
+        document_processor=document_processor,
+        quiz_generator=quiz_generator,
+        video_processor=video_processor,
+        verification_service=verification_service,
+        result_cache=result_cache,
+        speculative_generation=speculative_generation,
+        single_flight=single_flight,
+        stage_limiter=StageLimiter({
+            "extraction": int(os.getenv("BATCH_EXTRACTION_CONCURRENCY", "4")),
+            "verification": int(os.getenv("BATCH_VERIFICATION_CONCURRENCY", "4")),
+            "generation": int(os.getenv("BATCH_GENERATION_CONCURRENCY", "4")),
+        })
+    ),
+    max_items=int(os.getenv("BATCH_MAX_ITEMS", "50")),
+    max_concurrent_items=int(os.getenv("BATCH_MAX_CONCURRENT_ITEMS", "8"))
+)
+
+
+# Admin endpoints are open unless ADMIN_API_TOKEN is set
+admin_api_token = os.getenv("ADMIN_API_TOKEN")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Check the X-Admin-Token header against ADMIN_API_TOKEN"""
+    if admin_api_token and not (x_admin_token and secrets.compare_digest(x_admin_token, admin_api_token)):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.on_event("startup")
+async def startup():
+    await http_clients.startup()
+    await job_queue.start()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await job_queue.stop()
+    await http_clients.shutdown()
+    task_executor.shutdown()
 
 
 @app.get("/")
@@ -54,7 +191,12 @@ async def root():
 async def generate_quiz(
     file: Optional[UploadFile] = File(None),
     url: Optional[str] = Form(None),
-    video_url: Optional[str] = Form(None)
+    video_url: Optional[str] = Form(None),
+    from_bank: bool = Form(False),
+    num_questions: int = Form(QUIZ_LENGTH),
+    difficulty: Optional[str] = Form(None),
+    seed: Optional[str] = Form(None),
+    shuffle_options: bool = Form(True)
 ):
     """
     Generate a quiz from:
@@ -62,7 +204,13 @@ async def generate_quiz(
     - Web URL
     - Video URL (YouTube, Vimeo, any platform)
 
-    Includes educational content verification and points calculation
+    Includes educational content verification and points calculation.
+
+    With `from_bank=true`, the quiz is drawn from the source's question bank
+    (a larger pool generated on first use) instead: `num_questions` questions,
+    optionally of one `difficulty` (easy, medium, hard), in random order with
+    shuffled options unless `shuffle_options=false`. The same `seed` (e.g. a
+    student ID) returns the same quiz.
     """
     if not file and not url and not video_url:
         raise HTTPException(
@@ -70,126 +218,228 @@ async def generate_quiz(
             detail="Please provide a file, URL, or video URL"
         )
 
-    content = None
-    source_info = None
+    assembly = None
+    if from_bank:
+        try:
+            assembly = QuizAssembly(num_questions, difficulty, seed, shuffle_options)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
     try:
-        # Route 1: Video URL
-        if video_url:
-            if not video_processor:
-                raise HTTPException(
-                    status_code=500,
-                    detail="Video processing unavailable. OpenAI API key not configured."
-                )
-
-            print(f"📹 Processing video URL: {video_url}")
-            result = await video_processor.process_video_url(video_url)
-            content = result.transcript
-            source_info = SourceInfo(
-                source_type="video_url",
-                source_identifier=video_url,
-                title=result.title,
-                duration=result.duration,
-                transcript_length=len(content)
-            )
-
-        # Route 2: File Upload (including video files)
-        elif file:
-            file_extension = file.filename.split('.')[-1].lower()
-            if file_extension in ['mp4', 'avi', 'mov', 'mkv', 'webm']:
-                print(f"📹 Processing video file: {file.filename}")
-                source_type = "video_file"
-            else:
-                print(f"📄 Processing document file: {file.filename}")
-                source_type = "document_file"
-
-            content = await document_processor.process_file(file)
-            source_info = SourceInfo(
-                source_type=source_type,
-                source_identifier=file.filename,
-                transcript_length=len(content) if source_type == "video_file" else None
-            )
-
-        # Route 3: Web URL
-        elif url:
-            print(f"🌐 Processing web URL: {url}")
-            content = await document_processor.process_url(url)
-            source_info = SourceInfo(
-                source_type="web_url",
-                source_identifier=url
-            )
-
-        # Validate content length
-        if not content or len(content.strip()) < 50:
-            raise HTTPException(
-                status_code=400,
-                detail="The provided content is too short to generate a quiz"
-            )
-
-        # Verify educational quality (if verification service available)
-        verification = None
-        if verification_service:
-            print(f"🔍 Verifying educational content...")
-            verification = await verification_service.verify_content(
-                content=content,
-                url=video_url or url,
-                metadata=source_info.dict() if source_info else None
-            )
-
-            # Reject if failed verification (but not if quota exceeded)
-            if verification.status == VerificationStatus.REJECTED:
-                # Check if rejection is due to API quota
-                if verification.rejection_reason and "quota" in verification.rejection_reason.lower():
-                    # Allow content to pass as unverified when quota exceeded
-                    print(f"⚠️ API quota exceeded - allowing content as unverified")
-                    from models.verification import VerificationMetadata
-                    from datetime import datetime
-                    verification = VerificationMetadata(
-                        status=VerificationStatus.PENDING,
-                        verification_method="api_unavailable",
-                        verified_at=datetime.now()
-                    )
-                else:
-                    # Reject for actual educational quality issues
-                    raise HTTPException(
-                        status_code=403,
-                        detail={
-                            "error": "Content Rejected",
-                            "reason": verification.rejection_reason,
-                            "confidence": verification.confidence_score
-                        }
-                    )
-
-        # Generate quiz
-        print(f"🎯 Generating quiz...")
-        quiz_data = await quiz_generator.generate_quiz(content)
-
-        # Calculate points based on verification status
-        if verification:
-            if verification.status == VerificationStatus.VERIFIED:
-                points_awarded = 150  # Verified platforms
-            elif verification.status == VerificationStatus.AI_VERIFIED:
-                points_awarded = 100  # AI-verified content
-            else:
-                points_awarded = 50   # Fallback
-        else:
-            points_awarded = 50  # No verification available
-
-        # Attach metadata to response
-        quiz_data.verification = verification
-        quiz_data.source_info = source_info
-        quiz_data.points_awarded = points_awarded
-
+        quiz_data = await pipeline.run(file=file, url=url, video_url=video_url, assembly=assembly)
         print(f"✅ Quiz generated successfully!")
         return quiz_data
 
     except HTTPException:
         raise
+    except Exception as e:
+        status_code, detail = describe_error(e)
+        if status_code == 500:
+            print(f"❌ Error: {str(e)}")
+        raise HTTPException(status_code=status_code, detail=detail, headers=error_headers(e))
+
+
+def _sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@app.post("/api/generate-quiz/stream")
+async def generate_quiz_stream(
+    file: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None),
+    video_url: Optional[str] = Form(None)
+):
+    """
+    Same as /api/generate-quiz, but streams Server-Sent Events:
+    - `stage`: extraction/verification/generation progress
+    - `question`: each question as soon as the model has produced it
+    - `done`: verification, source info and points once the quiz is complete
+    - `error`: status code and detail if the pipeline fails
+    """
+    if not file and not url and not video_url:
+        raise HTTPException(
+            status_code=400,
+            detail="Please provide a file, URL, or video URL"
+        )
+
+    # FastAPI closes form uploads when the endpoint returns, before the
+    # response body streams, so spool the upload to disk first
+    upload = None
+    if file and not video_url:
+        try:
+            upload = await pipeline.spool(file)
+        except Exception as e:
+            status_code, detail = describe_error(e)
+            raise HTTPException(status_code=status_code, detail=detail, headers=error_headers(e))
+
+    async def events():
+        try:
+            async for item in pipeline.stream(file=upload, url=url, video_url=video_url):
+                data = item["data"]
+                if item["event"] == "question":
+                    data = data.dict()
+                elif item["event"] == "done":
+                    data = {
+                        "verification": data["verification"].dict() if data["verification"] else None,
+                        "source_info": data["source_info"].dict(),
+                        "points_awarded": data["points_awarded"]
+                    }
+                yield _sse_event(item["event"], data)
+            print(f"✅ Quiz streamed successfully!")
+        except Exception as e:
+            status_code, detail = describe_error(e)
+            if status_code == 500:
+                print(f"❌ Error: {str(e)}")
+            yield _sse_event("error", {"status_code": status_code, "detail": detail})
+        finally:
+            if upload:
+                upload.cleanup()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/generate-quiz/batch")
+async def generate_quiz_batch(
+    files: Optional[List[UploadFile]] = File(None),
+    urls: Optional[List[str]] = Form(None),
+    video_urls: Optional[List[str]] = Form(None)
+):
+    """
+    Generate quizzes for many sources at once: any number of `files`, and
+    `urls` / `video_urls` as repeated form fields (or one newline-separated
+    field each). Streams Server-Sent Events:
+    - `batch`: the accepted sources and their indexes
+    - `stage`: per-item extraction/verification/generation progress
+    - `item`: each item's quiz, or its status code and detail, as it finishes
+    - `done`: completed/failed counts and the indexes of the failed items
+    - `error`: status code and detail if the batch itself fails
+    """
+    try:
+        items = await batch_runner.prepare(files=files, urls=urls, video_urls=video_urls)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+    async def events():
+        try:
+            async for item in batch_runner.run(items):
+                data = item["data"]
+                yield _sse_event(item["event"], data if isinstance(data, dict) else data.dict())
+            print(f"✅ Batch of {len(items)} finished!")
+        except Exception as e:
+            status_code, detail = describe_error(e)
+            print(f"❌ Batch error: {str(e)}")
+            yield _sse_event("error", {"status_code": status_code, "detail": detail})
+        finally:
+            for item in items:
+                item.cleanup()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/api/jobs", response_model=JobResponse, status_code=202)
+async def create_job(
+    file: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None),
+    video_url: Optional[str] = Form(None)
+):
+    """
+    Queue quiz generation as a background job and return its ID immediately.
+    Poll GET /api/jobs/{job_id} for progress and the result.
+    Submitting a source that is already being processed returns the existing job.
+    """
+    if not file and not url and not video_url:
+        raise HTTPException(
+            status_code=400,
+            detail="Please provide a file, URL, or video URL"
+        )
+
+    try:
+        job_id, deduplicated = await job_queue.submit(file=file, url=url, video_url=video_url)
     except Exception as e:
-        print(f"❌ Error: {str(e)}")
-        raise HTTPException(status_code=500, detail=str(e))
+        status_code, detail = describe_error(e)
+        if status_code == 500:
+            print(f"❌ Error: {str(e)}")
+        raise HTTPException(status_code=status_code, detail=detail, headers=error_headers(e))
+
+    job = await job_queue.get(job_id)
+    job.deduplicated = deduplicated
+    return job
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """Status, progress and result of a background job"""
+    job = await job_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Hit/miss counters for the extraction, verification and quiz caches, the
+    web page cache and the question bank, and how many requests joined
+    in-flight work per stage
+    """
+    # Backend sizes are SQLite queries, so read them on the I/O pool
+    web_cache = document_processor.web_cache
+    return {
+        **await task_executor.run_io(result_cache.stats),
+        "web_pages": await task_executor.run_io(web_cache.stats) if web_cache else None,
+        "question_bank": await task_executor.run_io(question_bank.stats) if question_bank else None,
+        "coalesced": single_flight.stats()
+    }
+
+
+@app.get("/api/executor/stats")
+async def executor_stats():
+    """Queue depth and throughput of the blocking-work pools"""
+    return task_executor.stats()
+
+
+@app.get("/api/rate-limits/stats")
+async def rate_limit_stats():
+    """Per-provider queue depth, queue wait vs provider latency, shed and throttled calls"""
+    return rate_limiters.stats()
+
+
+@app.get("/api/video/stats")
+async def video_stats():
+    """Per-stage fetch timings and upstream calls per video"""
+    return {"enabled": video_processor is not None, **(video_processor.stats() if video_processor else {})}
+
+
+@app.get("/api/admin/models", dependencies=[Depends(require_admin)])
+async def model_health():
+    """Live per-model health table used to route quiz generation"""
+    return {
+        "hedging_enabled": quiz_generator.hedge_enabled,
+        "models": quiz_generator.health.snapshot()
+    }
+
+
+@app.get("/api/admin/verdicts", dependencies=[Depends(require_admin)])
+async def verdict_stats():
+    """Size of the stored AI verification verdicts"""
+    verdicts = verification_service.verdicts if verification_service else None
+    return {"enabled": verdicts is not None, **(await task_executor.run_io(verdicts.stats) if verdicts else {})}
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus scrape endpoint: stage latency histograms, fallback counters, in-flight gauges"""
+    payload, content_type = metrics.render()
+    return Response(content=payload, media_type=content_type)
 
 
 @app.get("/health")
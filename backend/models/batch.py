@@ -0,0 +1,31 @@
+from pydantic import BaseModel
+from enum import Enum
+from typing import List, Optional
+from .job import JobError
+from .quiz import QuizResponse
+
+
+class BatchItemStatus(str, Enum):
+    """Outcome of one source in a batch"""
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class BatchItemResult(BaseModel):
+    """Result of one batch item, streamed as soon as it finishes"""
+    index: int                                # Position of the source in the batch
+    source_type: str                          # "document_file", "video_file", "web_url", "video_url"
+    source: str                               # File name or URL
+    status: BatchItemStatus
+    result: Optional[QuizResponse] = None
+    error: Optional[JobError] = None
+    elapsed_seconds: float
+
+
+class BatchSummary(BaseModel):
+    """Totals sent once every item in a batch has finished"""
+    total: int
+    completed: int
+    failed: int
+    failed_items: List[int]                   # Indexes of the failed items
+    elapsed_seconds: float
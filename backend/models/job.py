@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from enum import Enum
+from typing import Optional, Any
+from datetime import datetime
+from .quiz import QuizResponse
+
+
+class JobStatus(str, Enum):
+    """Lifecycle of a background quiz generation job"""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class JobError(BaseModel):
+    """Error a job failed with, in the same shape the synchronous API returns"""
+    status_code: int
+    detail: Any
+
+
+class JobResponse(BaseModel):
+    """Status, progress and (once completed) result of a job"""
+    job_id: str
+    status: JobStatus
+    stage: Optional[str] = None               # "extraction", "verification", "generation"
+    progress: float = 0.0                     # 0.0 - 1.0
+    deduplicated: bool = False                # True if an identical in-flight job was reused
+    result: Optional[QuizResponse] = None
+    error: Optional[JobError] = None
+    created_at: datetime
+    updated_at: datetime
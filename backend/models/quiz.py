@@ -8,6 +8,7 @@ class Question(BaseModel):
     question: str
     options: List[str]
     correctAnswer: int
+    difficulty: Optional[str] = None          # "easy", "medium", "hard" (question bank pools)
 
 
 class QuizResponse(BaseModel):
@@ -19,7 +19,7 @@ class VerificationMetadata(BaseModel):
     platform: Optional[str] = None            # YouTube, Coursera, etc.
     rejection_reason: Optional[str] = None    # Why it was rejected
     verified_at: datetime
-    verification_method: str                  # "whitelist" or "ai_analysis"
+    verification_method: str                  # "whitelist", "ai_analysis", "ai_analysis_failed", ...
 
 
 class EducationalAnalysis(BaseModel):
@@ -37,5 +37,6 @@ class SourceInfo(BaseModel):
     source_type: str                          # "video_url", "video_file", "pdf", "url", "document"
     source_identifier: str                    # URL or filename
     title: Optional[str] = None              # Extracted video/page title
+    channel: Optional[str] = None            # Video channel/uploader
     duration: Optional[int] = None           # For videos (seconds)
     transcript_length: Optional[int] = None  # Character count
@@ -0,0 +1,150 @@
+"""
+Train and evaluate the local educational content pre-classifier.
+
+Examples come from labelled JSONL fixtures ({"text": ..., "educational": bool})
+and/or the verdict store the AI tier fills in production (the sample it saw
+and whether it was accepted). The model is evaluated with k-fold
+cross-validation; approve/reject thresholds are chosen on the out-of-fold
+predictions so that local verdicts reach --target-precision, then the model
+is refit on everything and saved where LOCAL_CLASSIFIER_PATH points.
+
+Usage (from backend/):
+    python scripts/train_classifier.py                                  # fixtures only
+    python scripts/train_classifier.py --verdicts cache/verdicts.sqlite3 --output cache/classifier.json
+    python scripts/train_classifier.py --evaluate cache/classifier.json # report an existing model
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.content_classifier import LocalContentClassifier, choose_thresholds  # noqa: E402
+from services.verdict_store import VerdictStore  # noqa: E402
+
+DEFAULT_FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "labelled_content.jsonl")
+
+Example = Tuple[str, bool]
+
+
+def load_fixtures(path: str) -> List[Example]:
+    with open(path, "r", encoding="utf-8") as f:
+        rows = [json.loads(line) for line in f if line.strip()]
+    return [(row["text"], bool(row["educational"])) for row in rows]
+
+
+def load_verdicts(path: str) -> List[Example]:
+    return list(VerdictStore(path).labelled_samples())
+
+
+def out_of_fold_probabilities(examples: List[Example], folds: int, seed: int) -> List[float]:
+    """Probability for each example from a model that never saw it"""
+    order = list(range(len(examples)))
+    random.Random(seed).shuffle(order)
+    probabilities = [0.0] * len(examples)
+    for fold in range(folds):
+        held_out = set(order[fold::folds])
+        train = [examples[i] for i in order if i not in held_out]
+        model = LocalContentClassifier.train([text for text, _ in train], [label for _, label in train], seed=seed)
+        for i in held_out:
+            probabilities[i] = model.probability(examples[i][0])
+    return probabilities
+
+
+def _ratio(numerator: int, denominator: int) -> Optional[float]:
+    return round(numerator / denominator, 3) if denominator else None
+
+
+def class_metrics(probabilities: List[float], labels: List[bool], cutoff: float = 0.5) -> Dict[str, Dict]:
+    """Precision/recall/F1 per class when every example is decided at cutoff"""
+    report = {}
+    for name, positive in (("educational", True), ("non_educational", False)):
+        predicted = [(p >= cutoff) == positive for p in probabilities]
+        actual = [label == positive for label in labels]
+        tp = sum(pred and act for pred, act in zip(predicted, actual))
+        precision = _ratio(tp, sum(predicted))
+        recall = _ratio(tp, sum(actual))
+        f1 = round(2 * precision * recall / (precision + recall), 3) if precision and recall else None
+        report[name] = {"precision": precision, "recall": recall, "f1": f1, "support": sum(actual)}
+    return report
+
+
+def tier_metrics(probabilities: List[float], labels: List[bool], approve: float, reject: float) -> Dict:
+    """What the tier would decide locally with these thresholds, and how well"""
+    approved = [label for p, label in zip(probabilities, labels) if p >= approve]
+    rejected = [label for p, label in zip(probabilities, labels) if p <= reject]
+    educational = sum(labels)
+    return {
+        "approve_threshold": round(approve, 4),
+        "reject_threshold": round(reject, 4),
+        "coverage": _ratio(len(approved) + len(rejected), len(labels)),
+        "escalated": len(labels) - len(approved) - len(rejected),
+        "approve_precision": _ratio(sum(approved), len(approved)),
+        "approve_recall": _ratio(sum(approved), educational),
+        "reject_precision": _ratio(len(rejected) - sum(rejected), len(rejected)),
+        "reject_recall": _ratio(len(rejected) - sum(rejected), len(labels) - educational),
+    }
+
+
+def print_report(title: str, report: Dict):
+    print(f"\n{title}")
+    print(json.dumps(report, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="labelled JSONL ('' to skip)")
+    parser.add_argument("--verdicts", help="verdict store SQLite file to train from")
+    parser.add_argument("--output", default=os.getenv("LOCAL_CLASSIFIER_PATH", "cache/classifier.json"))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--target-precision", type=float, default=0.97)
+    parser.add_argument("--min-confidence", type=float, default=0.8, help="loosest allowed threshold")
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--evaluate", metavar="MODEL", help="only report an existing model on the examples")
+    args = parser.parse_args()
+
+    examples: List[Example] = []
+    if args.fixtures:
+        examples += load_fixtures(args.fixtures)
+    if args.verdicts:
+        examples += load_verdicts(args.verdicts)
+    if len(examples) < args.folds * 2:
+        sys.exit(f"Need at least {args.folds * 2} labelled examples, got {len(examples)}")
+    labels = [label for _, label in examples]
+    print(f"{len(examples)} examples ({sum(labels)} educational, {len(labels) - sum(labels)} not)")
+
+    if args.evaluate:
+        model = LocalContentClassifier.load(args.evaluate)
+        started = time.perf_counter()
+        probabilities = [model.probability(text) for text, _ in examples]
+        per_item_ms = (time.perf_counter() - started) / len(examples) * 1000
+        print_report("Class metrics (cutoff 0.5)", class_metrics(probabilities, labels))
+        print_report(
+            "Tier metrics",
+            tier_metrics(probabilities, labels, model.approve_threshold, model.reject_threshold)
+        )
+        print(f"\n{per_item_ms:.2f} ms per document")
+        return
+
+    probabilities = out_of_fold_probabilities(examples, args.folds, args.seed)
+    thresholds = choose_thresholds(probabilities, labels, args.target_precision, args.min_confidence)
+    print_report(f"Cross-validated class metrics ({args.folds} folds, cutoff 0.5)", class_metrics(probabilities, labels))
+    print_report(
+        f"Cross-validated tier metrics (target precision {args.target_precision})",
+        tier_metrics(probabilities, labels, thresholds["approve_threshold"], thresholds["reject_threshold"])
+    )
+
+    model = LocalContentClassifier.train([text for text, _ in examples], labels, seed=args.seed)
+    model.approve_threshold = thresholds["approve_threshold"]
+    model.reject_threshold = thresholds["reject_threshold"]
+    model.metadata.update({"target_precision": args.target_precision, "folds": args.folds})
+    model.save(args.output)
+    print(f"\n✓ Saved model to {args.output} ({len(model.weights)} non-zero weights)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Audio extraction with ffmpeg subprocesses.
+
+ffmpeg decodes and re-encodes in its own process and streams straight to
+disk, so the Python process never holds decoded PCM. Output is mono 16 kHz
+low-bitrate mp3, which is all Whisper needs for speech.
+"""
+import asyncio
+import re
+from typing import List, Optional, Tuple
+
+from services.task_executor import TaskTimeoutError
+
+
+SPEECH_SAMPLE_RATE = 16000
+SPEECH_BITRATE = "32k"
+
+# Drops pauses longer than a second anywhere in the track
+TRIM_SILENCE_FILTER = "silenceremove=start_periods=1:stop_periods=-1:stop_duration=1:stop_threshold=-40dB"
+
+_SILENCE_START = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+async def _run(args: List[str], timeout: float) -> Tuple[bytes, bytes]:
+    """Run an ffmpeg/ffprobe command, returning (stdout, stderr)"""
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE
+        )
+    except FileNotFoundError:
+        raise ValueError(f"{args[0]} is required for audio processing but was not found on PATH")
+
+    try:
+        stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        raise TaskTimeoutError(f"{args[0]} timed out after {timeout:.0f}s")
+    except asyncio.CancelledError:
+        process.kill()
+        await process.wait()
+        raise
+
+    if process.returncode != 0:
+        message = stderr.decode(errors="replace").strip().splitlines()
+        raise ValueError(f"{args[0]} failed: {message[-1] if message else f'exit code {process.returncode}'}")
+    return stdout, stderr
+
+
+async def probe_duration(path: str, timeout: float = 60) -> float:
+    """Duration of a media file in seconds, read from the container by ffprobe"""
+    stdout, _ = await _run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", path],
+        timeout
+    )
+    try:
+        return float(stdout.decode().strip())
+    except ValueError:
+        raise ValueError("Could not determine media duration")
+
+
+async def extract_speech_audio(
+    input_path: str,
+    output_path: str,
+    trim_silence: bool = False,
+    start: Optional[float] = None,
+    duration: Optional[float] = None,
+    timeout: float = 600
+) -> str:
+    """
+    Extract (a segment of) the audio track of any media file as mono 16 kHz
+    low-bitrate mp3, optionally with long pauses removed
+    """
+    args = ["ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y"]
+    if start is not None:
+        args += ["-ss", f"{start:.3f}"]
+    if duration is not None:
+        args += ["-t", f"{duration:.3f}"]
+    args += ["-i", input_path, "-vn", "-sn", "-dn", "-ac", "1", "-ar", str(SPEECH_SAMPLE_RATE)]
+    if trim_silence:
+        args += ["-af", TRIM_SILENCE_FILTER]
+    args += ["-c:a", "libmp3lame", "-b:a", SPEECH_BITRATE, output_path]
+
+    await _run(args, timeout)
+    return output_path
+
+
+async def cut_segment(input_path: str, output_path: str, start: float, duration: float, timeout: float = 120) -> str:
+    """Cut a segment out of an mp3 without re-encoding"""
+    await _run(
+        [
+            "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+            "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", input_path,
+            "-c", "copy", output_path
+        ],
+        timeout
+    )
+    return output_path
+
+
+async def detect_silences(
+    path: str,
+    noise_db: float = -35,
+    min_silence_seconds: float = 0.4,
+    timeout: float = 300
+) -> List[Tuple[float, float]]:
+    """(start, end) of every silent stretch, via ffmpeg's silencedetect filter"""
+    _, stderr = await _run(
+        [
+            "ffmpeg", "-nostdin", "-hide_banner", "-i", path,
+            "-af", f"silencedetect=noise={noise_db}dB:d={min_silence_seconds}",
+            "-f", "null", "-"
+        ],
+        timeout
+    )
+
+    silences = []
+    start = None
+    for line in stderr.decode(errors="replace").splitlines():
+        match = _SILENCE_START.search(line)
+        if match:
+            start = float(match.group(1))
+            continue
+        match = _SILENCE_END.search(line)
+        if match and start is not None:
+            silences.append((max(0.0, start), float(match.group(1))))
+            start = None
+    return silences
+
+
+def plan_chunks(
+    duration: float,
+    silences: List[Tuple[float, float]],
+    chunk_seconds: float,
+    overlap_seconds: float,
+    silence_search_seconds: float
+) -> List[Tuple[float, float]]:
+    """
+    (start, end) of overlapping chunks covering the track. Each boundary is
+    moved to the middle of the last silence within the search window before
+    it, when there is one.
+    """
+    chunks = []
+    position = 0.0
+    while position < duration:
+        cut = min(position + chunk_seconds, duration)
+
+        if cut < duration:
+            window_start = max(position + overlap_seconds, cut - silence_search_seconds)
+            midpoints = [
+                (silence_start + silence_end) / 2
+                for silence_start, silence_end in silences
+                if window_start <= (silence_start + silence_end) / 2 < cut
+            ]
+            if midpoints:
+                cut = midpoints[-1]
+
+        chunks.append((max(0.0, position - overlap_seconds), cut))
+        position = cut
+    return chunks
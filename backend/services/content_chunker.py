@@ -0,0 +1,214 @@
+"""
+Local (no network) chunking, ranking and de-duplication for long content.
+
+Long documents are split into topically coherent chunks, the chunks are
+ranked by TF-IDF information density, and only the best few are sent to the
+model, so the number of generation calls does not grow with document size.
+select_chunks is a module-level function so it can run in the process pool.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, List, Set
+
+
+STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have
+having he her here hers herself him himself his how i if in into is it its itself just let me more most
+my myself no nor not now of off on once only or other our ours ourselves out over own same she should
+so some such than that the their theirs them themselves then there these they this those through to
+too under until up very was we were what when where which while who whom why will with would you your
+yours yourself yourselves one two also may might must shall us like get got well really going know
+""".split())
+
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+_TOKEN = re.compile(r"[a-z][a-z0-9'-]+")
+# Heading marker emitted by document extraction ("## Section title")
+_HEADING = re.compile(r"^#{1,6} ")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased content words (stopwords and 1-letter tokens dropped)"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOPWORDS]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split on paragraph breaks and sentence punctuation"""
+    sentences = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            sentences.extend(s for s in _SENTENCE_BOUNDARY.split(paragraph) if s)
+    return sentences
+
+
+def _cosine(a: Counter, b: Counter) -> float:
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def split_into_chunks(
+    text: str,
+    target_chars: int = 2500,
+    window_sentences: int = 4,
+    topic_shift_threshold: float = 0.1
+) -> List[str]:
+    """
+    Pack sentences into chunks of at most target_chars. Once a chunk is at
+    least half full, it is closed early at a heading or a topic shift: a point
+    where the vocabulary of the sentences before and after has little overlap
+    (a lightweight TextTiling).
+    """
+    sentences = split_sentences(text)
+    if not sentences:
+        return []
+
+    token_counts = [Counter(tokenize(sentence)) for sentence in sentences]
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_length = 0
+    for index, sentence in enumerate(sentences):
+        # A single oversized sentence is hard-wrapped
+        while len(sentence) > target_chars:
+            if current:
+                chunks.append(" ".join(current))
+                current, current_length = [], 0
+            chunks.append(sentence[:target_chars])
+            sentence = sentence[target_chars:]
+
+        if current and current_length + len(sentence) + 1 > target_chars:
+            chunks.append(" ".join(current))
+            current, current_length = [], 0
+        elif current and current_length >= target_chars // 2 and _HEADING.match(sentence):
+            chunks.append(" ".join(current))
+            current, current_length = [], 0
+        elif current and current_length >= target_chars // 2:
+            before = sum(token_counts[max(0, index - window_sentences):index], Counter())
+            after = sum(token_counts[index:index + window_sentences], Counter())
+            if _cosine(before, after) < topic_shift_threshold:
+                chunks.append(" ".join(current))
+                current, current_length = [], 0
+
+        current.append(sentence)
+        current_length += len(sentence) + 1
+
+    if current:
+        chunks.append(" ".join(current))
+    return chunks
+
+
+def score_chunks(chunks: List[str]) -> List[float]:
+    """
+    Information density of each chunk: the summed TF-IDF weight of its
+    distinct terms, divided by its length in tokens. Chunks full of rare,
+    specific terms (names, definitions, figures) outrank boilerplate and
+    small talk.
+    """
+    tokenized = [tokenize(chunk) for chunk in chunks]
+    document_frequency: Counter = Counter()
+    for tokens in tokenized:
+        document_frequency.update(set(tokens))
+
+    total = len(chunks)
+    scores = []
+    for tokens in tokenized:
+        if len(tokens) < 20:
+            scores.append(0.0)
+            continue
+        counts = Counter(tokens)
+        weight = sum(
+            (1 + math.log(count)) * math.log((1 + total) / (1 + document_frequency[term]) + 1)
+            for term, count in counts.items()
+        )
+        scores.append(weight / len(tokens))
+    return scores
+
+
+def select_chunks(text: str, target_chars: int = 2500, max_chunks: int = 4) -> List[str]:
+    """
+    The max_chunks most information-dense chunks of text, in document order.
+    At most one chunk is taken from each of max_chunks equal slices of the
+    document, so questions cover the whole text and not just its densest part.
+    """
+    chunks = split_into_chunks(text, target_chars=target_chars)
+    if len(chunks) <= max_chunks:
+        return chunks
+
+    scores = score_chunks(chunks)
+    selected = []
+    for band in range(max_chunks):
+        start = band * len(chunks) // max_chunks
+        end = (band + 1) * len(chunks) // max_chunks
+        best = max(range(start, end), key=lambda i: scores[i])
+        selected.append(chunks[best])
+    return selected
+
+
+def _question_terms(question: Dict) -> Set[str]:
+    return set(tokenize(question.get("question", "")))
+
+
+def _correct_option(question: Dict) -> str:
+    options = question.get("options") or []
+    index = question.get("correctAnswer")
+    if isinstance(index, int) and 0 <= index < len(options):
+        return " ".join(str(options[index]).lower().split())
+    return ""
+
+
+def is_duplicate_question(a: Dict, b: Dict, threshold: float = 0.6) -> bool:
+    """
+    Two questions are duplicates when their wording mostly overlaps, or when
+    they share the correct answer and a fair part of the wording
+    """
+    terms_a, terms_b = _question_terms(a), _question_terms(b)
+    if not terms_a or not terms_b:
+        return False
+    overlap = len(terms_a & terms_b) / len(terms_a | terms_b)
+    if overlap >= threshold:
+        return True
+    answer = _correct_option(a)
+    return bool(answer) and answer == _correct_option(b) and overlap >= threshold / 2
+
+
+class QuestionSelector:
+    """
+    Reduce step of map-reduce generation: merges per-chunk question lists as
+    they arrive, dropping duplicates, and picks the final set.
+
+    offer() immediately releases up to an even share of the quiz from each
+    chunk (so results can be streamed); finish() tops up from the leftovers.
+    """
+
+    def __init__(self, num_questions: int, num_chunks: int):
+        self.num_questions = num_questions
+        self.per_chunk = max(1, math.ceil(num_questions / max(1, num_chunks)))
+        self.selected: List[Dict] = []
+        self._leftovers: List[Dict] = []
+
+    def _accept(self, question: Dict) -> bool:
+        if len(self.selected) >= self.num_questions:
+            return False
+        if any(is_duplicate_question(question, kept) for kept in self.selected):
+            return False
+        self.selected.append(question)
+        return True
+
+    def offer(self, questions: List[Dict]) -> List[Dict]:
+        """Take this chunk's share; returns the questions accepted now"""
+        accepted = []
+        for question in questions:
+            if len(accepted) < self.per_chunk and self._accept(question):
+                accepted.append(question)
+            else:
+                self._leftovers.append(question)
+        return accepted
+
+    def finish(self) -> List[Dict]:
+        """Fill any remaining slots from leftovers; returns the questions accepted now"""
+        return [question for question in self._leftovers if self._accept(question)]
@@ -0,0 +1,215 @@
+"""
+Local (CPU-only, no network) educational content pre-classifier.
+
+Text is turned into hashed word unigram and bigram features and scored by a
+logistic regression model, in pure Python: a few milliseconds per document.
+Only confident predictions (probability at or beyond the approve/reject
+thresholds) are used as verdicts; everything else is escalated to the LLM.
+
+Models are trained offline by scripts/train_classifier.py, from labelled
+fixtures and the verdicts the LLM tier has already produced, and saved as
+JSON. Without a model file the tier is simply skipped.
+"""
+import json
+import math
+import os
+import random
+import re
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence
+
+
+DEFAULT_DIMENSIONS = 1 << 18
+
+_WORD = re.compile(r"[a-z0-9]+(?:'[a-z]+)?")
+
+
+def extract_features(text: str, dimensions: int = DEFAULT_DIMENSIONS, max_chars: int = 5000) -> Dict[int, float]:
+    """
+    Hashed unigram + bigram features, log-scaled term frequencies, L2-normalized.
+    Hashing uses crc32 so features are stable across processes (unlike hash()).
+    """
+    words = _WORD.findall(text[:max_chars].lower())
+    grams = Counter(words)
+    grams.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+
+    features: Dict[int, float] = {}
+    for gram, count in grams.items():
+        index = zlib.crc32(gram.encode("utf-8")) % dimensions
+        features[index] = features.get(index, 0.0) + 1.0 + math.log(count)
+
+    norm = math.sqrt(sum(value * value for value in features.values()))
+    if norm:
+        for index in features:
+            features[index] /= norm
+    return features
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
+
+
+class LocalContentClassifier:
+    """Hashed n-gram logistic regression with approve/reject thresholds"""
+
+    def __init__(
+        self,
+        weights: Dict[int, float],
+        bias: float = 0.0,
+        dimensions: int = DEFAULT_DIMENSIONS,
+        approve_threshold: float = 0.95,
+        reject_threshold: float = 0.05,
+        min_chars: int = 200,
+        metadata: Optional[Dict] = None
+    ):
+        self.weights = weights
+        self.bias = bias
+        self.dimensions = dimensions
+        self.approve_threshold = approve_threshold
+        self.reject_threshold = reject_threshold
+        self.min_chars = min_chars
+        self.metadata = metadata or {}
+
+    @classmethod
+    def train(
+        cls,
+        texts: Sequence[str],
+        labels: Sequence[bool],
+        dimensions: int = DEFAULT_DIMENSIONS,
+        epochs: int = 40,
+        learning_rate: float = 2.0,
+        l2: float = 1e-5,
+        seed: int = 13
+    ) -> "LocalContentClassifier":
+        """
+        Fit by stochastic gradient descent on the log loss. L2 shrinkage is
+        applied lazily, only to the features present in each example.
+        """
+        examples = [(extract_features(text, dimensions), 1.0 if label else 0.0) for text, label in zip(texts, labels)]
+        weights: Dict[int, float] = {}
+        bias = 0.0
+        rng = random.Random(seed)
+
+        for epoch in range(epochs):
+            rng.shuffle(examples)
+            rate = learning_rate / (1 + epoch * 0.1)
+            for features, target in examples:
+                z = bias + sum(weights.get(index, 0.0) * value for index, value in features.items())
+                gradient = _sigmoid(z) - target
+                bias -= rate * gradient
+                for index, value in features.items():
+                    weight = weights.get(index, 0.0)
+                    weights[index] = weight - rate * (gradient * value + l2 * weight)
+
+        weights = {index: weight for index, weight in weights.items() if abs(weight) > 1e-6}
+        return cls(weights, bias, dimensions, metadata={"examples": len(examples), "trained_at": time.time()})
+
+    def probability(self, text: str) -> float:
+        """Probability that text is educational"""
+        features = extract_features(text, self.dimensions)
+        return _sigmoid(self.bias + sum(self.weights.get(index, 0.0) * value for index, value in features.items()))
+
+    def decide(self, text: str) -> Optional[float]:
+        """
+        Probability if it is confident either way, None when the content
+        should be escalated (uncertain, or too short to judge)
+        """
+        if len(text.strip()) < self.min_chars:
+            return None
+        probability = self.probability(text)
+        if probability >= self.approve_threshold or probability <= self.reject_threshold:
+            return probability
+        return None
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({
+                "dimensions": self.dimensions,
+                "bias": self.bias,
+                "approve_threshold": self.approve_threshold,
+                "reject_threshold": self.reject_threshold,
+                "min_chars": self.min_chars,
+                "metadata": self.metadata,
+                "weights": {str(index): round(weight, 6) for index, weight in self.weights.items()},
+            }, f)
+
+    @classmethod
+    def load(cls, path: str) -> "LocalContentClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            {int(index): weight for index, weight in data["weights"].items()},
+            bias=data["bias"],
+            dimensions=data["dimensions"],
+            approve_threshold=data["approve_threshold"],
+            reject_threshold=data["reject_threshold"],
+            min_chars=data.get("min_chars", 200),
+            metadata=data.get("metadata")
+        )
+
+    @classmethod
+    def from_env(cls) -> Optional["LocalContentClassifier"]:
+        """
+        Load the model at LOCAL_CLASSIFIER_PATH (None if disabled or not trained
+        yet). LOCAL_CLASSIFIER_APPROVE/REJECT_THRESHOLD override the thresholds
+        chosen at training time.
+        """
+        if os.getenv("LOCAL_CLASSIFIER_ENABLED", "true").lower() != "true":
+            return None
+        path = os.getenv("LOCAL_CLASSIFIER_PATH", "cache/classifier.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            classifier = cls.load(path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Failed to load local classifier from {path}: {e}")
+            return None
+
+        if os.getenv("LOCAL_CLASSIFIER_APPROVE_THRESHOLD"):
+            classifier.approve_threshold = float(os.getenv("LOCAL_CLASSIFIER_APPROVE_THRESHOLD"))
+        if os.getenv("LOCAL_CLASSIFIER_REJECT_THRESHOLD"):
+            classifier.reject_threshold = float(os.getenv("LOCAL_CLASSIFIER_REJECT_THRESHOLD"))
+        print(
+            f"✓ Loaded local classifier from {path} "
+            f"(approve >= {classifier.approve_threshold:.2f}, reject <= {classifier.reject_threshold:.2f})"
+        )
+        return classifier
+
+
+def choose_thresholds(
+    probabilities: List[float],
+    labels: List[bool],
+    target_precision: float = 0.97,
+    min_confidence: float = 0.8
+) -> Dict[str, float]:
+    """
+    Loosest approve/reject thresholds whose decisions on held-out predictions
+    still reach target_precision, but never looser than min_confidence
+    (small labelled sets overstate precision). A class that cannot reach it
+    gets a threshold that never fires (approve 1.01 / reject -0.01).
+    """
+    def loosest(pairs, correct_label: bool, default: float) -> float:
+        threshold = default
+        decided = right = 0
+        for probability, label in pairs:
+            decided += 1
+            right += label == correct_label
+            if right / decided >= target_precision:
+                threshold = probability
+        return threshold
+
+    pairs = list(zip(probabilities, labels))
+    approve = max(min_confidence, loosest(sorted(pairs, key=lambda pair: -pair[0]), True, 1.01))
+    reject = min(1 - min_confidence, loosest(sorted(pairs, key=lambda pair: pair[0]), False, -0.01))
+    # Keep the bands disjoint
+    if reject >= approve:
+        approve, reject = 1.01, -0.01
+    return {"approve_threshold": approve, "reject_threshold": reject}
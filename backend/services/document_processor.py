@@ -1,42 +1,96 @@
-from fastapi import UploadFile
-import PyPDF2
-from docx import Document
-from bs4 import BeautifulSoup
-import requests
-import io
 import os
-import tempfile
+import httpx
+from typing import Optional
 from openai import AsyncOpenAI
 
+from services.task_executor import TaskExecutor, TaskExecutorError, gather_or_cancel, get_task_executor
+from services.rate_limiter import RateLimitedError
+from services.http_clients import HTTPClientRegistry, get_http_clients
+from services.transcription import ChunkedTranscriber
+from services.upload_spool import VIDEO_FILE_EXTENSIONS
+from services.text_extraction import (
+    extract_pdf_text,
+    extract_docx_text,
+    pdf_page_count,
+    read_text_file,
+)
+from services.html_extraction import DEFAULT_MAX_PARSE_BYTES, extract_html_text, resolve_html_engine
+from services.http_cache import HTTPDocumentCache, fetch_streaming
+from services import metrics
+
 
 class DocumentProcessor:
     """
     Processes documents and URLs to extract text content
     """
 
-    def __init__(self, openai_api_key: str = None):
-        self.openai_client = AsyncOpenAI(api_key=openai_api_key) if openai_api_key else None
-
-    async def process_file(self, file: UploadFile) -> str:
+    def __init__(
+        self,
+        openai_api_key: str = None,
+        executor: Optional[TaskExecutor] = None,
+        http_clients: Optional[HTTPClientRegistry] = None
+    ):
+        self.http_clients = http_clients or get_http_clients()
+        self.openai_client = AsyncOpenAI(
+            api_key=openai_api_key,
+            http_client=self.http_clients.get("openai"),
+            timeout=self.http_clients.timeout("openai")
+        ) if openai_api_key else None
+        self.executor = executor or get_task_executor()
+        self.transcriber = ChunkedTranscriber.from_env(self.openai_client, self.executor) if self.openai_client else None
+        self.html_engine = resolve_html_engine(os.getenv("HTML_EXTRACTION_ENGINE", "lxml"))
+        self.html_max_parse_bytes = int(os.getenv("HTML_MAX_PARSE_BYTES", str(DEFAULT_MAX_PARSE_BYTES)))
+        # Pages are never downloaded past what would be parsed
+        self.web_cache = HTTPDocumentCache.from_env()
+        # PDF_MAX_CHARS=0 extracts whole documents (needed for long-content
+        # quizzes, which sample chunks from the entire text)
+        self.pdf_max_chars = int(os.getenv("PDF_MAX_CHARS", "0")) or None
+        self.pdf_parallel_min_pages = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "40"))
+
+    async def process_file(self, path: str, filename: str) -> str:
         """
-        Extract text from uploaded file (PDF, TXT, DOCX, video files)
+        Extract text from an uploaded file already spooled to disk
+        (PDF, TXT, DOCX, video files)
         """
-        content = await file.read()
-        file_extension = file.filename.split('.')[-1].lower()
+        file_extension = filename.split('.')[-1].lower()
 
         # Check if it's a video file
-        if file_extension in ['mp4', 'avi', 'mov', 'mkv', 'webm']:
-            return await self.process_video_file(file, content)
+        if file_extension in VIDEO_FILE_EXTENSIONS:
+            return await self.process_video_file(path, filename)
 
         if file_extension == 'pdf':
-            return self._extract_from_pdf(content)
+            return await self.process_pdf(path)
         elif file_extension == 'txt':
-            return content.decode('utf-8')
+            return await self.executor.run_io(read_text_file, path)
         elif file_extension in ['doc', 'docx']:
-            return self._extract_from_docx(content)
+            return await self.executor.run_cpu(extract_docx_text, path)
         else:
             raise ValueError(f"Unsupported file type: {file_extension}")
 
+    async def process_pdf(self, path: str) -> str:
+        """
+        Extract PDF text. With PDF_MAX_CHARS, pages are read in order and
+        extraction stops once enough text is gathered; otherwise large
+        documents are split into page ranges extracted in parallel by the
+        CPU workers (each memory-maps the file itself).
+        """
+        if self.pdf_max_chars:
+            return await self.executor.run_cpu(extract_pdf_text, path, self.pdf_max_chars)
+
+        page_count = await self.executor.run_cpu(pdf_page_count, path)
+        workers = self.executor.cpu_pool.workers
+        if page_count < self.pdf_parallel_min_pages or workers < 2:
+            return await self.executor.run_cpu(extract_pdf_text, path)
+
+        pages_per_range = -(-page_count // workers)
+        ranges = [(start, min(start + pages_per_range, page_count)) for start in range(0, page_count, pages_per_range)]
+        print(f"📄 Extracting {page_count} PDF pages in {len(ranges)} parallel ranges")
+        # Cancel the remaining ranges as soon as one fails
+        parts = await gather_or_cancel(*(
+            self.executor.run_cpu(extract_pdf_text, path, None, start, stop) for start, stop in ranges
+        ))
+        return "\n".join(part for part in parts if part).strip()
+
     async def process_url(self, url: str) -> str:
         """
         Extract text content from a URL
@@ -48,141 +102,98 @@ class DocumentProcessor:
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
                 'Accept-Language': 'en-US,en;q=0.9',
                 'Accept-Encoding': 'gzip, deflate',
-                'Connection': 'keep-alive',
             }
 
+            cached = await self.executor.run_io(self.web_cache.get, url) if self.web_cache else None
+            if cached and cached.is_fresh():
+                print(f"⚡ Using cached page for {url} (fresh)")
+                self.web_cache.record("fresh_hits")
+                return await self._cached_page_text(url, cached)
+            if cached:
+                headers.update(cached.validators())
+
             print(f"📡 Fetching URL: {url}")
-            response = requests.get(url, headers=headers, timeout=15, allow_redirects=True)
-            response.raise_for_status()
-            print(f"✓ Successfully fetched URL (status {response.status_code})")
-
-            soup = BeautifulSoup(response.content, 'html.parser')
-
-            # Remove unwanted elements
-            for element in soup(["script", "style", "nav", "footer", "header", "aside", "iframe", "noscript"]):
-                element.decompose()
-
-            # Try to extract main content with multiple strategies
-            main_content = (
-                soup.find('main') or
-                soup.find('article') or
-                soup.find(class_='content') or
-                soup.find(class_='article') or
-                soup.find(class_='post-content') or
-                soup.find(id='content') or
-                soup.find(id='main') or
-                soup.find('body') or
-                soup
+            async with self.http_clients.host_limit(url):
+                with metrics.FETCH_SECONDS.labels("web_url", "page").time():
+                    fetched = await fetch_streaming(
+                        self.http_clients.get("web"), url, headers, self.html_max_parse_bytes
+                    )
+
+            if fetched.status_code == 304 and cached:
+                print(f"✓ Page unchanged (304), using cached copy")
+                self.web_cache.record("revalidated")
+                return await self._cached_page_text(url, cached, fetched.headers)
+
+            print(f"✓ Successfully fetched URL (status {fetched.status_code})")
+            if self.web_cache:
+                self.web_cache.record("misses")
+            if fetched.truncated:
+                print(f"⚠️ Page larger than {self.html_max_parse_bytes} bytes, only the start was downloaded")
+
+            text = await self.executor.run_cpu(
+                extract_html_text, fetched.body, self.html_engine, self.html_max_parse_bytes
             )
 
-            text = main_content.get_text()
-
-            # Clean up the text
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-
-            # Remove extra whitespace
-            text = ' '.join(text.split())
-
             if len(text) < 100:
                 raise ValueError("Extracted text is too short. The page might not have loaded properly.")
 
             print(f"✓ Extracted {len(text)} characters from URL")
+            if self.web_cache:
+                await self.executor.run_io(
+                    self.web_cache.store, url, fetched.headers, fetched.body, text, self.html_engine
+                )
             return text
 
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             raise ValueError(f"Request timed out. The URL took too long to respond.")
-        except requests.exceptions.ConnectionError:
+        except httpx.ConnectError:
             raise ValueError(f"Could not connect to the URL. Please check your internet connection.")
-        except requests.exceptions.HTTPError as e:
-            raise ValueError(f"HTTP error {e.response.status_code}: {e.response.reason}")
+        except httpx.HTTPStatusError as e:
+            raise ValueError(f"HTTP error {e.response.status_code}: {e.response.reason_phrase}")
+        except (TaskExecutorError, RateLimitedError):
+            raise
         except Exception as e:
             raise ValueError(f"Failed to fetch content from URL: {str(e)}")
 
-    def _extract_from_pdf(self, content: bytes) -> str:
-        """
-        Extract text from PDF file
-        """
-        try:
-            pdf_file = io.BytesIO(content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-
-            text = ""
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-
-            return text.strip()
-        except Exception as e:
-            raise ValueError(f"Failed to extract text from PDF: {str(e)}")
-
-    def _extract_from_docx(self, content: bytes) -> str:
+    async def _cached_page_text(self, url: str, cached, revalidated_headers=None) -> str:
         """
-        Extract text from DOCX file
+        Text of a cached page, re-extracted from the stored body if it was
+        extracted with a different engine. Applies a 304's headers, if any.
         """
-        try:
-            doc_file = io.BytesIO(content)
-            doc = Document(doc_file)
-
-            text = ""
-            for paragraph in doc.paragraphs:
-                text += paragraph.text + "\n"
-
-            return text.strip()
-        except Exception as e:
-            raise ValueError(f"Failed to extract text from DOCX: {str(e)}")
+        text = None
+        if cached.engine != self.html_engine:
+            text = await self.executor.run_cpu(
+                extract_html_text, cached.body, self.html_engine, self.html_max_parse_bytes
+            )
+        if text is not None or revalidated_headers is not None:
+            await self.executor.run_io(
+                self.web_cache.refresh, url, revalidated_headers, text, self.html_engine if text else None
+            )
+        return text or cached.text
 
-    async def process_video_file(self, file: UploadFile, content: bytes) -> str:
+    async def process_video_file(self, path: str, filename: str) -> str:
         """
         Process uploaded video file:
-        1. Save to temporary location
-        2. Extract audio
-        3. Transcribe with Whisper API
-        4. Return transcript
+        1. Extract mono speech audio with ffmpeg and cut it into Whisper-sized chunks
+        2. Transcribe chunks in parallel with Whisper API
+        3. Return stitched transcript
         """
         if not self.openai_client:
             raise ValueError("OpenAI API key is required for video transcription")
 
-        temp_video_path = None
         try:
-            # Save video to temporary file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=f".{file.filename.split('.')[-1]}") as temp_video:
-                temp_video.write(content)
-                temp_video_path = temp_video.name
-
-            # Extract audio using pydub (requires ffmpeg)
-            from pydub import AudioSegment
-
-            print(f"🎬 Processing video file: {file.filename}")
-            audio = AudioSegment.from_file(temp_video_path)
-
-            # Export as mp3
-            temp_audio_path = temp_video_path.replace(temp_video_path.split('.')[-1], 'mp3')
-            audio.export(temp_audio_path, format='mp3')
-            print(f"🎵 Extracted audio to temporary file")
-
-            # Transcribe with Whisper
+            # Extract speech audio with ffmpeg and transcribe with Whisper
+            print(f"🎬 Processing video file: {filename}")
             print(f"🎤 Transcribing audio...")
-            with open(temp_audio_path, 'rb') as audio_file:
-                transcript = await self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="text"
-                )
-
-            transcript_text = transcript if isinstance(transcript, str) else transcript.text
+            with metrics.TRANSCRIPTION_SECONDS.labels("video_file").time():
+                transcript_text = await self.transcriber.transcribe(path)
             print(f"✓ Transcription complete ({len(transcript_text)} characters)")
 
-            # Cleanup
-            os.remove(temp_video_path)
-            os.remove(temp_audio_path)
-
             return transcript_text
 
         except ImportError:
-            raise ValueError("pydub library is required for video processing. Please install it: pip install pydub")
+            raise ValueError("pydub library is required for AUDIO_EXTRACTION_ENGINE=pydub. Please install it: pip install pydub")
+        except (TaskExecutorError, RateLimitedError):
+            raise
         except Exception as e:
-            # Cleanup on error
-            if temp_video_path and os.path.exists(temp_video_path):
-                os.remove(temp_video_path)
             raise ValueError(f"Failed to process video file: {str(e)}")
@@ -0,0 +1,203 @@
+"""
+Main-content extraction engines for web pages.
+
+- "lxml" (default): libxml2 parse, C-level removal of non-content tags, then
+  readability-style scoring: each paragraph adds points (length, commas) to
+  its parent and grandparent, containers are weighted by tag and class/id
+  hints and penalized by link density, and the best-scoring container wins.
+- "bs4": the original BeautifulSoup html.parser implementation, kept as a
+  fallback and as the benchmark baseline.
+
+Both take raw bytes and parse at most max_bytes of them. The functions are
+module-level so they can run in the task executor's process pool.
+"""
+import re
+from typing import Callable, Dict, Optional
+
+DEFAULT_MAX_PARSE_BYTES = 2 * 1024 * 1024
+
+NON_CONTENT_TAGS = ("script", "style", "nav", "footer", "header", "aside", "iframe", "noscript")
+
+# Extra tags the lxml engine also drops (never main content)
+_LXML_DROP_TAGS = NON_CONTENT_TAGS + ("form", "svg", "button", "select", "template", "object", "embed")
+
+_BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "dl", "dt", "dd", "br", "tr", "td", "th",
+    "table", "blockquote", "pre", "h1", "h2", "h3", "h4", "h5", "h6", "figcaption",
+}
+
+_PARAGRAPH_TAGS = ("p", "pre", "td", "blockquote")
+
+_UNLIKELY = re.compile(
+    r"comment|sidebar|footer|menu|share|social|related|promo|banner|cookie|popup|subscribe|newsletter"
+    r"|advert|sponsor|breadcrumb|pagination|skip|masthead|disqus|widget",
+    re.IGNORECASE
+)
+_LIKELY = re.compile(r"article|content|main|post|body|entry|text|story|blog|column", re.IGNORECASE)
+
+_WHITESPACE = re.compile(r"\s+")
+
+_MIN_CANDIDATE_CHARS = 200
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse all whitespace runs to single spaces in one pass"""
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def extract_html_bs4(html: bytes, max_bytes: int = DEFAULT_MAX_PARSE_BYTES) -> str:
+    """
+    Extract the main readable text from an HTML page (BeautifulSoup engine)
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html[:max_bytes], 'html.parser')
+
+    # Remove unwanted elements
+    for element in soup(list(NON_CONTENT_TAGS)):
+        element.decompose()
+
+    # Try to extract main content with multiple strategies
+    main_content = (
+        soup.find('main') or
+        soup.find('article') or
+        soup.find(class_='content') or
+        soup.find(class_='article') or
+        soup.find(class_='post-content') or
+        soup.find(id='content') or
+        soup.find(id='main') or
+        soup.find('body') or
+        soup
+    )
+
+    text = main_content.get_text()
+
+    # Clean up the text
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+
+    # Remove extra whitespace
+    return ' '.join(text.split())
+
+
+def _class_weight(element) -> int:
+    weight = 0
+    for hint in (element.get("class"), element.get("id")):
+        if hint:
+            if _UNLIKELY.search(hint):
+                weight -= 25
+            if _LIKELY.search(hint):
+                weight += 25
+    return weight
+
+
+def _tag_weight(tag: str) -> int:
+    if tag in ("article", "main"):
+        return 10
+    if tag in ("div", "section"):
+        return 5
+    if tag in ("pre", "td", "blockquote"):
+        return 3
+    if tag in ("ol", "ul", "dl", "form", "th") or tag.startswith("h"):
+        return -3
+    return 0
+
+
+def _link_density(element, text_length: int) -> float:
+    if not text_length:
+        return 1.0
+    link_chars = sum(len(link.text_content()) for link in element.iter("a"))
+    return min(1.0, link_chars / text_length)
+
+
+def _best_candidate(root):
+    """Highest-scoring container, readability style (None if nothing scores)"""
+    scores: Dict = {}
+    for paragraph in root.iter(*_PARAGRAPH_TAGS):
+        text = paragraph.text_content()
+        length = len(text.strip())
+        if length < 25:
+            continue
+        points = 1 + text.count(",") + min(length // 100, 3)
+
+        parent = paragraph.getparent()
+        for ancestor, share in ((parent, 1.0), (parent.getparent() if parent is not None else None, 0.5)):
+            if ancestor is None or not isinstance(ancestor.tag, str):
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = _tag_weight(ancestor.tag) + _class_weight(ancestor)
+            scores[ancestor] += points * share
+
+    best, best_score = None, 0.0
+    for candidate, score in scores.items():
+        text_length = len(candidate.text_content())
+        score *= 1 - _link_density(candidate, text_length)
+        if score > best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def extract_html_lxml(html: bytes, max_bytes: int = DEFAULT_MAX_PARSE_BYTES) -> str:
+    """
+    Extract the main readable text from an HTML page (lxml engine)
+    """
+    import lxml.html
+    from lxml import etree
+
+    parser = lxml.html.HTMLParser(remove_comments=True, remove_pis=True, no_network=True)
+    try:
+        root = lxml.html.document_fromstring(html[:max_bytes], parser=parser)
+    except (etree.ParserError, ValueError):
+        return ""
+
+    etree.strip_elements(root, *_LXML_DROP_TAGS, with_tail=False)
+
+    # Drop boilerplate containers (sidebars, comment threads, share bars...),
+    # unless their class/id also looks like content
+    for element in list(root.iter("div", "section", "ul", "ol", "table", "span", "p")):
+        hints = " ".join(filter(None, (element.get("class"), element.get("id"))))
+        if hints and _UNLIKELY.search(hints) and not _LIKELY.search(hints):
+            if element.getparent() is not None:
+                element.drop_tree()
+
+    main_content = _best_candidate(root)
+    if main_content is None or len(main_content.text_content().strip()) < _MIN_CANDIDATE_CHARS:
+        main_content = next(root.iter("main", "article"), None)
+        if main_content is None:
+            main_content = root.find("body")
+        if main_content is None:
+            main_content = root
+
+    # Separate block elements so adjacent paragraphs don't run together
+    for element in main_content.iter(*_BLOCK_TAGS):
+        element.tail = " " + element.tail if element.tail else " "
+
+    return normalize_whitespace(main_content.text_content())
+
+
+HTML_ENGINES: Dict[str, Callable[[bytes, int], str]] = {
+    "lxml": extract_html_lxml,
+    "bs4": extract_html_bs4,
+}
+
+
+def resolve_html_engine(name: Optional[str]) -> str:
+    """Engine to use for name, falling back to bs4 when lxml is not installed"""
+    name = (name or "lxml").lower()
+    if name not in HTML_ENGINES:
+        raise ValueError(f"Unknown HTML extraction engine: {name} (expected one of {', '.join(HTML_ENGINES)})")
+    if name == "lxml":
+        try:
+            import lxml.html  # noqa: F401
+        except ImportError:
+            print("⚠️ lxml not installed, falling back to the bs4 HTML extraction engine")
+            return "bs4"
+    return name
+
+
+def extract_html_text(html: bytes, engine: str = "lxml", max_bytes: int = DEFAULT_MAX_PARSE_BYTES) -> str:
+    """
+    Extract the main readable text from an HTML page with the given engine
+    """
+    return HTML_ENGINES[engine](html, max_bytes)
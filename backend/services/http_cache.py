@@ -0,0 +1,257 @@
+"""
+On-disk conditional HTTP cache for fetched web pages.
+
+Each entry keeps the (compressed) body, the text extracted from it, and the
+response's validators (ETag / Last-Modified) and freshness. A fresh entry is
+served without touching the network; a stale one is revalidated with
+If-None-Match / If-Modified-Since, so an unchanged page costs a 304 round
+trip instead of a full download and re-parse.
+
+Cache-Control is respected as a private cache (the server never sends
+cookies or credentials, so "private" responses are stored too): no-store
+and Vary: * responses are not stored, no-cache always revalidates, and
+max-age (else Expires) sets how long an entry is fresh.
+"""
+import email.utils
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Dict, Mapping, Optional
+
+import httpx
+
+from services.result_cache import normalize_url
+
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*max-age\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def _directives(cache_control: Optional[str]) -> set:
+    return {
+        part.split("=", 1)[0].strip().lower()
+        for part in (cache_control or "").split(",")
+        if part.strip()
+    }
+
+
+def is_storable(headers: Mapping[str, str]) -> bool:
+    return "no-store" not in _directives(headers.get("cache-control")) and headers.get("vary", "").strip() != "*"
+
+
+def fresh_until(headers: Mapping[str, str], now: float, min_fresh_seconds: float = 0) -> float:
+    """Time until which a response may be reused without revalidation"""
+    cache_control = headers.get("cache-control")
+    if "no-cache" in _directives(cache_control):
+        return now
+
+    lifetime = None
+    match = _MAX_AGE.search(cache_control or "")
+    if match:
+        lifetime = float(match.group(1)) - float(headers.get("age", "0") or 0)
+    elif headers.get("expires"):
+        try:
+            expires = email.utils.parsedate_to_datetime(headers["expires"]).timestamp()
+            date = headers.get("date")
+            served_at = email.utils.parsedate_to_datetime(date).timestamp() if date else now
+            lifetime = expires - served_at
+        except (TypeError, ValueError):
+            lifetime = 0  # Invalid Expires means already expired
+
+    return now + max(lifetime or 0, min_fresh_seconds)
+
+
+class FetchResult:
+    """Status, headers and (possibly truncated) body of a streamed GET"""
+
+    def __init__(self, response: httpx.Response, body: bytes, truncated: bool):
+        self.response = response
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.body = body
+        self.truncated = truncated
+
+
+async def fetch_streaming(
+    client: httpx.AsyncClient,
+    url: str,
+    headers: Dict[str, str],
+    max_bytes: int
+) -> FetchResult:
+    """
+    GET url, reading at most max_bytes of the body; the rest is never
+    downloaded. Raises httpx.HTTPStatusError for error statuses (304 is not
+    an error).
+    """
+    async with client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+        if response.status_code == 304:
+            return FetchResult(response, b"", False)
+        response.raise_for_status()
+
+        chunks = []
+        received = 0
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            received += len(chunk)
+            if received > max_bytes:
+                truncated = True
+                break
+        return FetchResult(response, b"".join(chunks)[:max_bytes], truncated)
+
+
+class CachedDocument:
+    def __init__(self, row: sqlite3.Row):
+        self.url = row["url"]
+        self.etag = row["etag"]
+        self.last_modified = row["last_modified"]
+        self.fresh_until = row["fresh_until"]
+        self.engine = row["engine"]
+        self.text = row["text"]
+        self._body = row["body"]
+
+    @property
+    def body(self) -> bytes:
+        return zlib.decompress(self._body)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) < self.fresh_until
+
+    def validators(self) -> Dict[str, str]:
+        """Conditional request headers for revalidating this entry"""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class HTTPDocumentCache:
+    """SQLite-backed page cache keyed by normalized URL, least recently used evicted first"""
+
+    def __init__(self, path: str, max_entries: int = 2000, min_fresh_seconds: float = 0):
+        self.path = path
+        self.max_entries = max_entries
+        self.min_fresh_seconds = min_fresh_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, fresh_until REAL NOT NULL, "
+            "engine TEXT NOT NULL, text TEXT NOT NULL, body BLOB NOT NULL, size INTEGER NOT NULL, "
+            "last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS documents_last_used ON documents (last_used)")
+        self._conn.commit()
+
+        self._counters = {"fresh_hits": 0, "revalidated": 0, "misses": 0, "not_stored": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["HTTPDocumentCache"]:
+        """Build the cache from WEB_CACHE_* environment variables (None if disabled)"""
+        if os.getenv("WEB_CACHE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            os.getenv("WEB_CACHE_PATH", "cache/web_cache.sqlite3"),
+            max_entries=int(os.getenv("WEB_CACHE_MAX_ENTRIES", "2000")),
+            min_fresh_seconds=float(os.getenv("WEB_CACHE_MIN_FRESH_SECONDS", "0"))
+        )
+
+    def get(self, url: str) -> Optional[CachedDocument]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM documents WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE documents SET last_used = ? WHERE url = ?", (time.time(), row["url"])
+            )
+            self._conn.commit()
+        return CachedDocument(row)
+
+    def store(self, url: str, headers: Mapping[str, str], body: bytes, text: str, engine: str):
+        """
+        Store a 200 response and its extracted text. Skipped if the response
+        forbids it, or if it could never be reused (no validators, not fresh).
+        """
+        now = time.time()
+        fresh = fresh_until(headers, now, self.min_fresh_seconds)
+        reusable = fresh > now or headers.get("etag") or headers.get("last-modified")
+        if not is_storable(headers) or not reusable:
+            self.record("not_stored")
+            return
+        compressed = zlib.compress(body, 6)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO documents "
+                "(url, etag, last_modified, fresh_until, engine, text, body, size, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    normalize_url(url),
+                    headers.get("etag"),
+                    headers.get("last-modified"),
+                    fresh,
+                    engine,
+                    text,
+                    compressed,
+                    len(body),
+                    now
+                )
+            )
+            self._conn.execute(
+                "DELETE FROM documents WHERE url NOT IN "
+                "(SELECT url FROM documents ORDER BY last_used DESC LIMIT ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def refresh(
+        self,
+        url: str,
+        headers: Optional[Mapping[str, str]] = None,
+        text: Optional[str] = None,
+        engine: Optional[str] = None
+    ):
+        """
+        Apply a 304's headers to the stored entry (new freshness, and new
+        validators if sent) and/or replace its extracted text
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE documents SET fresh_until = COALESCE(?, fresh_until), etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified), text = COALESCE(?, text), "
+                "engine = COALESCE(?, engine), last_used = ? WHERE url = ?",
+                (
+                    fresh_until(headers, now, self.min_fresh_seconds) if headers is not None else None,
+                    headers.get("etag") if headers is not None else None,
+                    headers.get("last-modified") if headers is not None else None,
+                    text,
+                    engine,
+                    now,
+                    normalize_url(url)
+                )
+            )
+            self._conn.commit()
+
+    def record(self, outcome: str):
+        with self._lock:
+            self._counters[outcome] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS entries, COALESCE(SUM(size), 0) AS body_bytes, "
+                "COALESCE(SUM(LENGTH(body)), 0) AS stored_bytes FROM documents"
+            ).fetchone()
+            return {**dict(row), **self._counters}
@@ -0,0 +1,152 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Optional, Dict
+from urllib.parse import urlsplit
+
+import httpx
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class HTTPClientProfile:
+    """Pool and timeout settings for one named client"""
+
+    def __init__(
+        self,
+        max_connections: int,
+        max_keepalive_connections: int,
+        connect_timeout: float,
+        read_timeout: float,
+        keepalive_expiry: float = 30.0
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.keepalive_expiry = keepalive_expiry
+
+    @property
+    def timeout(self) -> httpx.Timeout:
+        return httpx.Timeout(self.read_timeout, connect=self.connect_timeout)
+
+
+class _HostLimiter:
+    """Caps concurrent connections per host for clients that talk to many hosts"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._slots: Dict[str, list] = {}  # host -> [semaphore, users]
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).netloc.lower()
+        entry = self._slots.setdefault(host, [asyncio.Semaphore(self.limit), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._slots.pop(host, None)
+
+
+class HTTPClientRegistry:
+    """
+    Application-lifetime pooled HTTP clients.
+
+    Each upstream gets its own httpx.AsyncClient so connection limits apply
+    per host: "perplexity" and "openai" talk to a single API host each, and
+    "web" fetches arbitrary pages with an additional per-host cap.
+    Clients are created lazily on first use (or eagerly in startup()) and
+    closed in shutdown().
+    """
+
+    def __init__(self, profiles: Dict[str, HTTPClientProfile], http2: bool = True, web_per_host_limit: int = 4):
+        self.profiles = profiles
+        self.http2 = http2 and _http2_available()
+        if http2 and not self.http2:
+            print("⚠️ h2 package not installed - HTTP clients will use HTTP/1.1")
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._host_limiter = _HostLimiter(web_per_host_limit)
+
+    @classmethod
+    def from_env(cls) -> "HTTPClientRegistry":
+        """Build the registry from HTTP_* environment variables"""
+        max_connections = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+        max_keepalive = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+        keepalive_expiry = float(os.getenv("HTTP_KEEPALIVE_EXPIRY_SECONDS", "30"))
+        connect_timeout = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+
+        profiles = {
+            "perplexity": HTTPClientProfile(
+                max_connections, max_keepalive, connect_timeout,
+                float(os.getenv("PERPLEXITY_TIMEOUT_SECONDS", "30")), keepalive_expiry
+            ),
+            "openai": HTTPClientProfile(
+                max_connections, max_keepalive, connect_timeout,
+                # Whisper uploads of long audio can legitimately take minutes
+                float(os.getenv("OPENAI_TIMEOUT_SECONDS", "600")), keepalive_expiry
+            ),
+            "web": HTTPClientProfile(
+                max_connections, max_keepalive, connect_timeout,
+                float(os.getenv("WEB_FETCH_TIMEOUT_SECONDS", "15")), keepalive_expiry
+            ),
+        }
+        return cls(
+            profiles,
+            http2=os.getenv("HTTP_ENABLE_HTTP2", "true").lower() == "true",
+            web_per_host_limit=int(os.getenv("HTTP_WEB_PER_HOST_LIMIT", "4"))
+        )
+
+    def get(self, name: str) -> httpx.AsyncClient:
+        """Return the shared client for a profile, creating it on first use"""
+        client = self._clients.get(name)
+        if client is None or client.is_closed:
+            profile = self.profiles[name]
+            client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=profile.timeout,
+                limits=httpx.Limits(
+                    max_connections=profile.max_connections,
+                    max_keepalive_connections=profile.max_keepalive_connections,
+                    keepalive_expiry=profile.keepalive_expiry
+                )
+            )
+            self._clients[name] = client
+        return client
+
+    def timeout(self, name: str) -> float:
+        """Read timeout in seconds for a profile (for SDKs that take a plain number)"""
+        return self.profiles[name].read_timeout
+
+    def host_limit(self, url: str):
+        """Async context manager limiting concurrent requests to the URL's host"""
+        return self._host_limiter.slot(url)
+
+    async def startup(self):
+        for name in self.profiles:
+            self.get(name)
+
+    async def shutdown(self):
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+
+_default_registry: Optional[HTTPClientRegistry] = None
+
+
+def get_http_clients() -> HTTPClientRegistry:
+    """Process-wide HTTP client registry shared by all services"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = HTTPClientRegistry.from_env()
+    return _default_registry
@@ -0,0 +1,293 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple, List
+
+from fastapi import UploadFile
+
+from services.quiz_pipeline import QuizPipeline, describe_error
+from services.rate_limiter import RateLimitedError, current_client_id, reset_client_id, set_client_id
+from services.upload_spool import SpooledUpload
+from models.job import JobStatus, JobResponse, JobError
+from models.quiz import QuizResponse
+
+
+# Fraction of the job done once each pipeline stage has finished
+STAGE_PROGRESS = {
+    ("extraction", "started"): 0.05,
+    ("extraction", "completed"): 0.5,
+    ("verification", "started"): 0.5,
+    ("verification", "completed"): 0.7,
+    ("generation", "started"): 0.7,
+    ("generation", "completed"): 1.0,
+}
+
+# Pause after a worker iteration fails (e.g. the I/O pool is saturated)
+WORKER_ERROR_BACKOFF_SECONDS = 1.0
+
+
+class JobStore:
+    """SQLite-backed persistent job table, so queued work survives restarts"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, source_key TEXT NOT NULL, status TEXT NOT NULL, "
+            "stage TEXT, progress REAL NOT NULL DEFAULT 0, payload TEXT NOT NULL, "
+            "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_source ON jobs (source_key, status)")
+        self._conn.commit()
+
+    def create_or_get_in_flight(self, source_key: str, payload: Dict[str, Any]) -> Tuple[str, bool]:
+        """
+        Insert a queued job, unless one for the same source is already queued
+        or running. Returns (job_id, deduplicated).
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM jobs WHERE source_key = ? AND status IN (?, ?) ORDER BY created_at LIMIT 1",
+                (source_key, JobStatus.QUEUED.value, JobStatus.RUNNING.value)
+            ).fetchone()
+            if row:
+                return row["id"], True
+
+            job_id = uuid.uuid4().hex
+            now = time.time()
+            self._conn.execute(
+                "INSERT INTO jobs (id, source_key, status, payload, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, source_key, JobStatus.QUEUED.value, json.dumps(payload), now, now)
+            )
+            self._conn.commit()
+            return job_id, False
+
+    def claim_next(self) -> Optional[sqlite3.Row]:
+        """Atomically move the oldest queued job to running and return it"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1",
+                (JobStatus.QUEUED.value,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE id = ?",
+                (JobStatus.RUNNING.value, time.time(), row["id"])
+            )
+            self._conn.commit()
+            return row
+
+    def update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[sqlite3.Row]:
+        with self._lock:
+            return self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+
+    def requeue_running(self) -> int:
+        """Put jobs interrupted by a restart back on the queue"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, progress = 0, updated_at = ? WHERE status = ?",
+                (JobStatus.QUEUED.value, time.time(), JobStatus.RUNNING.value)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+    def purge_finished(self, older_than: float) -> int:
+        """Delete completed/failed jobs last updated before a timestamp"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (JobStatus.COMPLETED.value, JobStatus.FAILED.value, older_than)
+            )
+            self._conn.commit()
+            return cursor.rowcount
+
+
+class JobQueue:
+    """
+    Background workers that run the quiz pipeline for queued jobs.
+
+    Jobs are persisted in SQLite and uploaded files are stored on disk, so a
+    restart resumes queued and interrupted work. Submitting a source that
+    already has a queued or running job returns the existing job. Store
+    reads and writes run in the pipeline's I/O pool, off the event loop.
+    """
+
+    def __init__(
+        self,
+        pipeline: QuizPipeline,
+        storage_dir: str = "jobs",
+        workers: int = 4,
+        retention_seconds: float = 86400,
+        rate_limit_retries: int = 3
+    ):
+        self.pipeline = pipeline
+        self.executor = pipeline.document_processor.executor
+        self.storage_dir = storage_dir
+        self.upload_dir = os.path.join(storage_dir, "uploads")
+        os.makedirs(self.upload_dir, exist_ok=True)
+        self.store = JobStore(os.path.join(storage_dir, "jobs.sqlite3"))
+        self.workers = workers
+        self.retention_seconds = retention_seconds
+        self.rate_limit_retries = rate_limit_retries
+        self._wakeup = asyncio.Event()
+        self._tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        requeued = await self.executor.run_io(self.store.requeue_running)
+        if requeued:
+            print(f"♻️ Re-queued {requeued} interrupted job(s)")
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(
+        self,
+        file: Optional[UploadFile] = None,
+        url: Optional[str] = None,
+        video_url: Optional[str] = None
+    ) -> Tuple[str, bool]:
+        """Queue a job for a source. Returns (job_id, deduplicated)."""
+        payload: Dict[str, Any] = {"url": url, "video_url": video_url, "client_id": current_client_id()}
+
+        if file and not video_url:
+            upload = await self.pipeline.spool(file, directory=self.upload_dir)
+            source_key = self.pipeline.source_key(upload=upload)
+            payload["upload"] = upload.dict()
+        else:
+            source_key = self.pipeline.source_key(video_url=video_url, url=url)
+
+        job_id, deduplicated = await self.executor.run_io(self.store.create_or_get_in_flight, source_key, payload)
+        if deduplicated and payload.get("upload"):
+            await self.executor.run_io(upload.cleanup)
+
+        self._wakeup.set()
+        return job_id, deduplicated
+
+    async def get(self, job_id: str) -> Optional[JobResponse]:
+        row = await self.executor.run_io(self.store.get, job_id)
+        if row is None:
+            return None
+
+        return JobResponse(
+            job_id=row["id"],
+            status=JobStatus(row["status"]),
+            stage=row["stage"],
+            progress=row["progress"],
+            result=QuizResponse(**json.loads(row["result"])) if row["result"] else None,
+            error=JobError(**json.loads(row["error"])) if row["error"] else None,
+            created_at=datetime.fromtimestamp(row["created_at"]),
+            updated_at=datetime.fromtimestamp(row["updated_at"])
+        )
+
+    async def _worker(self, worker_id: int):
+        while True:
+            try:
+                row = await self.executor.run_io(self.store.claim_next)
+                if row is None:
+                    await self.executor.run_io(self.store.purge_finished, time.time() - self.retention_seconds)
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=5)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self._run_job(row)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # A busy I/O pool or a locked database must not end the worker
+                print(f"⚠️ Job worker {worker_id} error: {str(e)[:200]}")
+                await asyncio.sleep(WORKER_ERROR_BACKOFF_SECONDS)
+
+    async def _run_job(self, row: sqlite3.Row):
+        job_id = row["id"]
+        payload = json.loads(row["payload"])
+        print(f"⚙️ Running job {job_id}")
+
+        async def progress(stage: str, status: str):
+            # Best effort: a missed progress update must not fail the job
+            try:
+                await self.executor.run_io(
+                    self.store.update, job_id, stage=stage, progress=STAGE_PROGRESS.get((stage, status), 0.0)
+                )
+            except Exception as e:
+                print(f"⚠️ Job {job_id} progress update failed: {str(e)[:200]}")
+
+        upload = SpooledUpload(**payload["upload"]) if payload.get("upload") else None
+        # LLM calls made for this job count against the submitting client
+        client_token = set_client_id(payload.get("client_id") or "jobs")
+        try:
+            for attempt in range(self.rate_limit_retries + 1):
+                try:
+                    quiz_data = await self.pipeline.run(
+                        file=upload,
+                        url=payload.get("url"),
+                        video_url=payload.get("video_url"),
+                        progress=progress
+                    )
+                    break
+                except RateLimitedError as e:
+                    # Jobs aren't waited on interactively, so wait out the
+                    # backlog instead of failing; finished stages are cached
+                    if attempt == self.rate_limit_retries:
+                        raise
+                    print(f"⏳ Job {job_id} rate limited, retrying in {e.retry_after:.0f}s")
+                    await asyncio.sleep(e.retry_after)
+
+            await self.executor.run_io(
+                self.store.update,
+                job_id,
+                status=JobStatus.COMPLETED.value,
+                progress=1.0,
+                result=quiz_data.json()
+            )
+            print(f"✅ Job {job_id} completed")
+        except asyncio.CancelledError:
+            # Shutting down; the job is re-queued on next start
+            raise
+        except Exception as e:
+            status_code, detail = describe_error(e)
+            print(f"❌ Job {job_id} failed: {str(e)[:200]}")
+            await self.executor.run_io(
+                self.store.update,
+                job_id,
+                status=JobStatus.FAILED.value,
+                error=json.dumps({"status_code": status_code, "detail": detail})
+            )
+        finally:
+            reset_client_id(client_token)
+            # Keep the upload if the job was interrupted and will be re-queued
+            if upload:
+                try:
+                    row = await self.executor.run_io(self.store.get, job_id)
+                    if row["status"] != JobStatus.RUNNING.value:
+                        await self.executor.run_io(upload.cleanup)
+                except Exception as e:
+                    print(f"⚠️ Job {job_id} upload cleanup failed: {str(e)[:200]}")
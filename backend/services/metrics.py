@@ -0,0 +1,116 @@
+"""
+Prometheus metrics, served at /metrics.
+
+Latency histograms per pipeline stage (by source type), per upstream fetch
+step, per verification method and per model call; counters for the
+fallback paths taken; gauges for work in flight. Metrics live in the
+default registry of this process; with several uvicorn workers, each
+worker is scraped (or aggregated) separately.
+"""
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Stages range from cache hits (milliseconds) to long video transcriptions
+LATENCY_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1800)
+
+STAGE_SECONDS = Histogram(
+    "quiz_stage_seconds",
+    "Pipeline stage latency (extraction, verification, generation, total)",
+    ["stage", "source_type"],
+    buckets=LATENCY_BUCKETS
+)
+FETCH_SECONDS = Histogram(
+    "quiz_fetch_seconds",
+    "Upstream fetch latency per step (video metadata/transcript/subtitles/audio, web pages)",
+    ["source_type", "step"],
+    buckets=LATENCY_BUCKETS
+)
+TRANSCRIPTION_SECONDS = Histogram(
+    "quiz_transcription_seconds",
+    "Whisper transcription latency",
+    ["source_type"],
+    buckets=LATENCY_BUCKETS
+)
+VERIFICATION_SECONDS = Histogram(
+    "quiz_verification_seconds",
+    "Content verification latency by the method that decided it",
+    ["method", "status"],
+    buckets=LATENCY_BUCKETS
+)
+MODEL_CALL_SECONDS = Histogram(
+    "quiz_model_call_seconds",
+    "Quiz generation model call latency",
+    ["mode", "model", "outcome"],
+    buckets=LATENCY_BUCKETS
+)
+
+TRANSCRIPT_SOURCES = Counter(
+    "quiz_video_transcript_source",
+    "Where video transcripts came from (transcript_api, subtitles, whisper)",
+    ["source"]
+)
+MODEL_FALLBACKS = Counter(
+    "quiz_model_fallbacks",
+    "Model calls that failed, moving generation on to the next-ranked model",
+    ["mode", "model"]
+)
+MODEL_HEDGES = Counter(
+    "quiz_model_hedges",
+    "Slow model calls raced against the next-best model",
+    ["model"]
+)
+VERIFICATION_FALLBACKS = Counter(
+    "quiz_verification_fallbacks",
+    "AI verification that could not run (quota_exceeded: let through unverified; analysis_failed)",
+    ["reason"]
+)
+BATCH_ITEMS = Counter(
+    "quiz_batch_items",
+    "Batch endpoint items by outcome (completed, failed)",
+    ["outcome"]
+)
+
+REQUESTS_IN_FLIGHT = Gauge(
+    "quiz_requests_in_flight",
+    "Quiz pipeline runs in progress",
+    ["source_type"]
+)
+STAGE_IN_FLIGHT = Gauge(
+    "quiz_stage_in_flight",
+    "Stage work in progress (coalesced requests count once)",
+    ["stage"]
+)
+
+
+class _Call:
+    def __init__(self):
+        self.outcome: Optional[str] = None
+
+
+@contextmanager
+def observe_model_call(mode: str, model: str):
+    """
+    Time a model call into MODEL_CALL_SECONDS. The outcome is "success"
+    unless the body raises ("error", "cancelled") or sets call.outcome.
+    """
+    call = _Call()
+    started = time.monotonic()
+    try:
+        yield call
+    except (asyncio.CancelledError, GeneratorExit):
+        call.outcome = call.outcome or "cancelled"
+        raise
+    except BaseException:
+        call.outcome = call.outcome or "error"
+        raise
+    finally:
+        MODEL_CALL_SECONDS.labels(mode, model, call.outcome or "success").observe(time.monotonic() - started)
+
+
+def render() -> Tuple[bytes, str]:
+    """The exposition payload and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,218 @@
+import os
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ModelHealth:
+    """Rolling outcome window, latency statistics and circuit state for one model"""
+
+    def __init__(self, name: str, window_size: int, ewma_alpha: float):
+        self.name = name
+        self.ewma_alpha = ewma_alpha
+        self.outcomes: Deque[bool] = deque(maxlen=window_size)
+        self.latencies: Deque[float] = deque(maxlen=window_size * 5)
+        self.latency_ewma: Optional[float] = None
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.open_seconds = 0.0
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        self.last_error: Optional[str] = None
+        self.total_requests = 0
+        self.total_failures = 0
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def record_latency(self, latency: float):
+        self.latencies.append(latency)
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = self.ewma_alpha * latency + (1 - self.ewma_alpha) * self.latency_ewma
+
+
+class ModelHealthTracker:
+    """
+    Per-model health for adaptive routing between LLM models.
+
+    Each model has a circuit breaker. It opens when the error rate over the
+    last window_size calls reaches failure_threshold, or straight away on a
+    permanent failure such as an unknown or deprecated model. An open model is
+    skipped for open_seconds. Then it goes half-open: one probe request is let
+    through, and the probe's outcome closes the circuit or re-opens it with a
+    doubled cooldown. Available models are ranked by error rate, then latency
+    EWMA, falling back to the configured order.
+
+    The tracker is only used from the event loop, so it needs no locking.
+    """
+
+    def __init__(
+        self,
+        models: List[str],
+        window_size: int = 20,
+        min_requests: int = 4,
+        failure_threshold: float = 0.5,
+        open_seconds: float = 30,
+        max_open_seconds: float = 600,
+        ewma_alpha: float = 0.3,
+        hedge_percentile: float = 0.9,
+        hedge_min_samples: int = 10,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.order = list(models)
+        self.clock = clock
+        self.min_requests = min_requests
+        self.failure_threshold = failure_threshold
+        self.base_open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self._models: Dict[str, ModelHealth] = {
+            name: ModelHealth(name, window_size, ewma_alpha) for name in models
+        }
+
+    @classmethod
+    def from_env(cls, models: List[str]) -> "ModelHealthTracker":
+        """Build a tracker from MODEL_HEALTH_* and QUIZ_HEDGE_* environment variables"""
+        return cls(
+            models,
+            window_size=int(os.getenv("MODEL_HEALTH_WINDOW", "20")),
+            min_requests=int(os.getenv("MODEL_HEALTH_MIN_REQUESTS", "4")),
+            failure_threshold=float(os.getenv("MODEL_HEALTH_FAILURE_THRESHOLD", "0.5")),
+            open_seconds=float(os.getenv("MODEL_HEALTH_OPEN_SECONDS", "30")),
+            hedge_percentile=float(os.getenv("QUIZ_HEDGE_PERCENTILE", "0.9"))
+        )
+
+    def _available(self, health: ModelHealth, now: float) -> bool:
+        if health.state == OPEN and now - health.opened_at >= health.open_seconds:
+            health.state = HALF_OPEN
+        if health.state == HALF_OPEN:
+            return not health.probe_in_flight
+        return health.state == CLOSED
+
+    def ranked(self) -> List[str]:
+        """Models that may be called now, best first"""
+        now = self.clock()
+        available = [
+            health for health in self._models.values() if self._available(health, now)
+        ]
+
+        def sort_key(health: ModelHealth) -> Tuple:
+            # Unmeasured models sort with the configured order among equals
+            latency = health.latency_ewma if health.latency_ewma is not None else float("inf")
+            return (round(health.error_rate, 1), latency, self.order.index(health.name))
+
+        if not available:
+            # Everything is open: rather than failing outright, try the model
+            # that is due to re-open soonest
+            soonest = min(self._models.values(), key=lambda h: h.opened_at + h.open_seconds)
+            return [soonest.name]
+
+        return [health.name for health in sorted(available, key=sort_key)]
+
+    def start(self, model: str):
+        """Mark a call as started; a half-open model admits only this one probe"""
+        health = self._models[model]
+        if health.state == HALF_OPEN:
+            health.probe_in_flight = True
+
+    def abandon(self, model: str):
+        """A started call was cancelled (e.g. lost a hedge) without an outcome"""
+        self._models[model].probe_in_flight = False
+
+    def record_success(self, model: str, latency: Optional[float] = None):
+        health = self._models[model]
+        health.total_requests += 1
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+        health.probe_in_flight = False
+        if latency is not None:
+            health.record_latency(latency)
+        if health.state != CLOSED:
+            print(f"✓ Model {model} recovered, closing circuit")
+            health.state = CLOSED
+            health.open_seconds = 0.0
+
+    def record_failure(self, model: str, error: str, permanent: bool = False):
+        """
+        Record a failed call. Permanent failures (the provider rejecting the
+        model itself) open the circuit without waiting for min_requests.
+        """
+        health = self._models[model]
+        health.total_requests += 1
+        health.total_failures += 1
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+        health.probe_in_flight = False
+        health.last_error = error[:200]
+
+        if health.state == HALF_OPEN:
+            self._open(health, min(self.max_open_seconds, max(health.open_seconds, self.base_open_seconds) * 2))
+        elif health.state == CLOSED and (
+            permanent
+            or (len(health.outcomes) >= self.min_requests and health.error_rate >= self.failure_threshold)
+        ):
+            self._open(health, self.max_open_seconds if permanent else self.base_open_seconds)
+
+    def _open(self, health: ModelHealth, seconds: float):
+        print(f"⚠️ Opening circuit for model {health.name} for {seconds:.0f}s")
+        health.state = OPEN
+        health.opened_at = self.clock()
+        health.open_seconds = seconds
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """
+        How long to wait on a model before hedging to the next one: its
+        hedge_percentile latency, once enough latencies have been observed
+        """
+        health = self._models[model]
+        if len(health.latencies) < self.hedge_min_samples:
+            return None
+        return health.percentile(self.hedge_percentile)
+
+    def snapshot(self) -> List[Dict]:
+        """Live model table, in routing order, for the admin endpoint"""
+        now = self.clock()
+        ranked = self.ranked()
+        rows = []
+        for health in sorted(
+            self._models.values(),
+            key=lambda h: ranked.index(h.name) if h.name in ranked else len(ranked) + self.order.index(h.name)
+        ):
+            p50 = health.percentile(0.5)
+            p90 = health.percentile(0.9)
+            rows.append({
+                "model": health.name,
+                "state": health.state,
+                "rank": ranked.index(health.name) + 1 if health.name in ranked else None,
+                "window_requests": len(health.outcomes),
+                "error_rate": round(health.error_rate, 4),
+                "latency_ewma_ms": round(health.latency_ewma * 1000) if health.latency_ewma is not None else None,
+                "latency_p50_ms": round(p50 * 1000) if p50 is not None else None,
+                "latency_p90_ms": round(p90 * 1000) if p90 is not None else None,
+                "consecutive_failures": health.consecutive_failures,
+                "reopens_in_seconds": (
+                    round(max(0.0, health.opened_at + health.open_seconds - now), 1)
+                    if health.state == OPEN else None
+                ),
+                "total_requests": health.total_requests,
+                "total_failures": health.total_failures,
+                "last_error": health.last_error,
+            })
+        return rows
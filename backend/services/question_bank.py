@@ -0,0 +1,241 @@
+"""
+Question bank: a larger pool of difficulty-tagged questions, generated once
+per source, from which each request assembles its own randomized quiz.
+
+A regular quiz costs an LLM round trip for every student who wants a fresh
+one. With the bank, the first request for a source generates the pool
+(QUESTION_BANK_POOL_SIZE questions) and stores it in SQLite. Every later
+request draws a quiz from it locally: the questions are sampled to a
+difficulty mix (or to one difficulty), put in random order, and their
+options shuffled with correctAnswer rewritten to match. Hot pools are
+also kept in memory, so a quiz is assembled without touching the disk.
+
+Passing the same seed (e.g. a student ID) gives the same quiz again.
+"""
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from services.quiz_generator import DIFFICULTIES, QUIZ_LENGTH
+from models.quiz import Question
+
+
+# Share of each difficulty in a quiz that doesn't ask for one, as in the
+# regular prompt (2 easy, 2 medium, 1 challenging out of 5)
+DIFFICULTY_MIX = {"easy": 0.4, "medium": 0.4, "hard": 0.2}
+
+MAX_QUIZ_LENGTH = 50
+
+# Options that refer to other options ("All of the above", "Both A and B")
+# only make sense where the model put them, so they are not shuffled
+_POSITIONAL_OPTION = re.compile(r"\b(of the above|of these|both [a-d] and [a-d]|[a-d] and [a-d] only)\b", re.I)
+
+
+class QuizAssembly:
+    """How to assemble one quiz from a pool. Raises ValueError for invalid options."""
+
+    def __init__(
+        self,
+        num_questions: int = QUIZ_LENGTH,
+        difficulty: Optional[str] = None,
+        seed: Optional[str] = None,
+        shuffle_options: bool = True
+    ):
+        if not 1 <= num_questions <= MAX_QUIZ_LENGTH:
+            raise ValueError(f"num_questions must be between 1 and {MAX_QUIZ_LENGTH}")
+        difficulty = difficulty.strip().lower() if difficulty and difficulty.strip() else None
+        if difficulty and difficulty not in DIFFICULTIES:
+            raise ValueError(f"difficulty must be one of: {', '.join(DIFFICULTIES)}")
+        self.num_questions = num_questions
+        self.difficulty = difficulty
+        self.seed = seed
+        self.shuffle_options = shuffle_options
+
+
+def _difficulty_quotas(num_questions: int) -> Dict[str, int]:
+    """Questions per difficulty for DIFFICULTY_MIX (largest remainder rounding)"""
+    exact = {level: num_questions * share for level, share in DIFFICULTY_MIX.items()}
+    quotas = {level: int(value) for level, value in exact.items()}
+    by_remainder = sorted(exact, key=lambda level: exact[level] - quotas[level], reverse=True)
+    for level in by_remainder[:num_questions - sum(quotas.values())]:
+        quotas[level] += 1
+    return quotas
+
+
+def _shuffled_options(question: Dict[str, Any], rng: random.Random) -> Dict[str, Any]:
+    """Shuffle a question's options (except positional ones), keeping correctAnswer on the same text"""
+    options = question["options"]
+    movable = [i for i, option in enumerate(options) if not _POSITIONAL_OPTION.search(option)]
+    targets = movable[:]
+    rng.shuffle(targets)
+    order = list(range(len(options)))
+    for source, target in zip(movable, targets):
+        order[target] = source
+    return {
+        **question,
+        "options": [options[i] for i in order],
+        "correctAnswer": order.index(question["correctAnswer"]),
+    }
+
+
+def assemble_quiz(pool: List[Dict[str, Any]], assembly: QuizAssembly, rng: random.Random) -> List[Question]:
+    """
+    Draw a quiz from a pool of question dicts. With a difficulty, only that
+    difficulty is drawn (the quiz may come out shorter); otherwise questions
+    follow DIFFICULTY_MIX, topped up from other difficulties where the pool
+    runs short (untagged questions count as medium).
+    """
+    if assembly.difficulty:
+        matching = [question for question in pool if question.get("difficulty") == assembly.difficulty]
+        if not matching:
+            raise ValueError(f"The question bank has no {assembly.difficulty} questions for this source")
+        picked = rng.sample(matching, min(assembly.num_questions, len(matching)))
+    else:
+        groups: Dict[str, List[Dict[str, Any]]] = {level: [] for level in DIFFICULTIES}
+        for question in pool:
+            groups[question.get("difficulty") or "medium"].append(question)
+
+        picked = []
+        for level, quota in _difficulty_quotas(assembly.num_questions).items():
+            picked += rng.sample(groups[level], min(quota, len(groups[level])))
+        shortfall = assembly.num_questions - len(picked)
+        if shortfall > 0:
+            chosen = {id(question) for question in picked}
+            leftovers = [question for question in pool if id(question) not in chosen]
+            picked += rng.sample(leftovers, min(shortfall, len(leftovers)))
+        rng.shuffle(picked)
+
+    questions = []
+    for number, question in enumerate(picked, start=1):
+        if assembly.shuffle_options:
+            question = _shuffled_options(question, rng)
+        questions.append(Question(**{**question, "id": number}))
+    return questions
+
+
+class QuestionBankStore:
+    """SQLite store of question pools, one row per source key"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS question_pools ("
+            "source_key TEXT PRIMARY KEY, questions TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, source_key: str, newer_than: float) -> Optional[Tuple[float, List[Dict[str, Any]]]]:
+        """(created_at, pool) for a source, if stored after newer_than"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT questions, created_at FROM question_pools WHERE source_key = ? AND created_at >= ?",
+                (source_key, newer_than)
+            ).fetchone()
+        return (row["created_at"], json.loads(row["questions"])) if row else None
+
+    def put(self, source_key: str, questions: List[Dict[str, Any]]):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO question_pools (source_key, questions, created_at) VALUES (?, ?, ?)",
+                (source_key, json.dumps(questions), time.time())
+            )
+            self._conn.commit()
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM question_pools").fetchone()[0]
+
+
+class QuestionBank:
+    """Stored question pools, with the most recently used ones kept in memory"""
+
+    def __init__(
+        self,
+        store: QuestionBankStore,
+        pool_size: int = 40,
+        max_age_seconds: float = 30 * 86400,
+        memory_pools: int = 256
+    ):
+        self.store = store
+        self.pool_size = pool_size
+        self.max_age_seconds = max_age_seconds
+        self.memory_pools = memory_pools
+        # source_key -> (created_at, pool)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "pools_generated": 0, "quizzes_assembled": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["QuestionBank"]:
+        """Build the bank from QUESTION_BANK_* environment variables (None if disabled)"""
+        if os.getenv("QUESTION_BANK_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            QuestionBankStore(os.getenv("QUESTION_BANK_PATH", "cache/question_bank.sqlite3")),
+            pool_size=int(os.getenv("QUESTION_BANK_POOL_SIZE", "40")),
+            max_age_seconds=float(os.getenv("QUESTION_BANK_MAX_AGE_DAYS", "30")) * 86400,
+            memory_pools=int(os.getenv("QUESTION_BANK_MEMORY_POOLS", "256"))
+        )
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _remember(self, source_key: str, created_at: float, pool: List[Dict[str, Any]]):
+        with self._lock:
+            self._memory[source_key] = (created_at, pool)
+            self._memory.move_to_end(source_key)
+            while len(self._memory) > self.memory_pools:
+                self._memory.popitem(last=False)
+
+    def get(self, source_key: str) -> Optional[List[Dict[str, Any]]]:
+        """The stored pool for a source, or None if there is none (or it has expired)"""
+        newer_than = time.time() - self.max_age_seconds
+        with self._lock:
+            entry = self._memory.get(source_key)
+            if entry and entry[0] >= newer_than:
+                self._memory.move_to_end(source_key)
+                self._counters["memory_hits"] += 1
+                return entry[1]
+
+        stored = self.store.get(source_key, newer_than)
+        if stored is None:
+            self._count("misses")
+            return None
+        self._count("disk_hits")
+        self._remember(source_key, *stored)
+        return stored[1]
+
+    def put(self, source_key: str, questions: List[Question]) -> List[Dict[str, Any]]:
+        """Store a newly generated pool; returns it as stored"""
+        pool = [question.dict() for question in questions]
+        self.store.put(source_key, pool)
+        self._remember(source_key, time.time(), pool)
+        self._count("pools_generated")
+        return pool
+
+    def assemble(self, source_key: str, pool: List[Dict[str, Any]], assembly: QuizAssembly) -> List[Question]:
+        """A randomized quiz from a pool; the same seed and source give the same quiz"""
+        rng = random.Random(f"{source_key}:{assembly.seed}") if assembly.seed else random.Random()
+        questions = assemble_quiz(pool, assembly, rng)
+        self._count("quizzes_assembled")
+        return questions
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            counters = dict(self._counters)
+            in_memory = len(self._memory)
+        return {**counters, "pools_in_memory": in_memory, "pools_stored": self.store.count(), "pool_size": self.pool_size}
@@ -0,0 +1,189 @@
+"""
+Batch quiz generation: many sources in one request, each result streamed as
+soon as it is ready.
+
+Items run through a QuizPipeline whose StageLimiter is shared by every
+batch. Each stage has one concurrency bound, however many batches are
+running. While one item is being generated, the next can be extracted.
+Each batch also caps how many of its own items are in progress, so one
+large batch cannot take every stage slot from the others.
+
+A failing item does not stop the batch. Its error is reported in the same
+shape as the synchronous API (status code and detail), and the remaining
+items carry on. Identical sources, within a batch or across batches and
+the interactive API, are coalesced by the pipeline's single flight.
+"""
+import asyncio
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from fastapi import UploadFile
+
+from services.quiz_pipeline import QuizPipeline, describe_error, input_source_type
+from services.rate_limiter import current_client_id, reset_client_id, set_client_id
+from services.upload_spool import SpooledUpload
+from services import metrics
+from models.batch import BatchItemResult, BatchItemStatus, BatchSummary
+from models.job import JobError
+
+
+class BatchItem:
+    """One source in a batch, or the error that kept it from being accepted"""
+
+    def __init__(
+        self,
+        index: int,
+        source_type: str,
+        source: str,
+        upload: Optional[SpooledUpload] = None,
+        url: Optional[str] = None,
+        video_url: Optional[str] = None,
+        error: Optional[JobError] = None
+    ):
+        self.index = index
+        self.source_type = source_type
+        self.source = source
+        self.upload = upload
+        self.url = url
+        self.video_url = video_url
+        self.error = error
+
+    def describe(self) -> Dict[str, Any]:
+        return {"index": self.index, "source_type": self.source_type, "source": self.source}
+
+    def cleanup(self):
+        if self.upload:
+            self.upload.cleanup()
+
+
+def _url_list(values: Optional[List[str]]) -> List[str]:
+    """Form values as a flat URL list; one field may hold a pasted, newline-separated list"""
+    return [line.strip() for value in values or [] for line in value.splitlines() if line.strip()]
+
+
+class BatchRunner:
+    """Runs batches of sources through a shared, stage-limited pipeline"""
+
+    def __init__(self, pipeline: QuizPipeline, max_items: int = 50, max_concurrent_items: int = 8):
+        self.pipeline = pipeline
+        self.max_items = max_items
+        self.max_concurrent_items = max(1, max_concurrent_items)
+
+    async def prepare(
+        self,
+        files: Optional[List[UploadFile]] = None,
+        urls: Optional[List[str]] = None,
+        video_urls: Optional[List[str]] = None
+    ) -> List[BatchItem]:
+        """
+        Validate the request and spool uploads to disk (FastAPI closes them
+        before a streamed response runs). Raises ValueError for an empty or
+        oversized batch. An upload that can't be spooled becomes a failed
+        item instead of failing the batch.
+        """
+        files = [file for file in files or [] if file.filename]
+        urls, video_urls = _url_list(urls), _url_list(video_urls)
+        total = len(files) + len(urls) + len(video_urls)
+        if total == 0:
+            raise ValueError("Please provide at least one file, URL, or video URL")
+        if total > self.max_items:
+            raise ValueError(f"A batch can hold at most {self.max_items} sources ({total} given)")
+
+        items = []
+        for file in files:
+            item = BatchItem(len(items), input_source_type(file, None), file.filename)
+            try:
+                item.upload = await self.pipeline.spool(file)
+            except Exception as e:
+                status_code, detail = describe_error(e)
+                item.error = JobError(status_code=status_code, detail=detail)
+            items.append(item)
+        for url in urls:
+            items.append(BatchItem(len(items), "web_url", url, url=url))
+        for video_url in video_urls:
+            items.append(BatchItem(len(items), "video_url", video_url, video_url=video_url))
+        return items
+
+    async def run(self, items: List[BatchItem]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run every item, yielding events as they happen:
+        - {"event": "batch", "data": {"total": ..., "items": [{index, source_type, source}]}}
+        - {"event": "stage", "data": {"index": ..., "stage": ..., "status": ...}}
+        - {"event": "item", "data": BatchItemResult}, in completion order
+        - {"event": "done", "data": BatchSummary}
+        Closing the iterator early (client disconnect) cancels unfinished items.
+        Uploads are removed once their item is done.
+        """
+        started = time.monotonic()
+        events: asyncio.Queue = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_concurrent_items)
+        # LLM calls made for the batch count against the client that sent it
+        client_id = current_client_id()
+
+        async def run_item(item: BatchItem):
+            try:
+                async with slots:
+                    token = set_client_id(client_id)
+                    try:
+                        result = await self._run_item(item, events)
+                    finally:
+                        reset_client_id(token)
+            finally:
+                item.cleanup()
+            await events.put({"event": "item", "data": result})
+
+        yield {"event": "batch", "data": {"total": len(items), "items": [item.describe() for item in items]}}
+
+        tasks = [asyncio.create_task(run_item(item)) for item in items]
+        results: List[BatchItemResult] = []
+        try:
+            while len(results) < len(items):
+                event = await events.get()
+                if event["event"] == "item":
+                    results.append(event["data"])
+                yield event
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        failed = sorted(result.index for result in results if result.status == BatchItemStatus.FAILED)
+        yield {"event": "done", "data": BatchSummary(
+            total=len(items),
+            completed=len(items) - len(failed),
+            failed=len(failed),
+            failed_items=failed,
+            elapsed_seconds=round(time.monotonic() - started, 3)
+        )}
+
+    async def _run_item(self, item: BatchItem, events: asyncio.Queue) -> BatchItemResult:
+        started = time.monotonic()
+
+        def finish(status: BatchItemStatus, **fields) -> BatchItemResult:
+            metrics.BATCH_ITEMS.labels(status.value).inc()
+            return BatchItemResult(
+                index=item.index,
+                source_type=item.source_type,
+                source=item.source,
+                status=status,
+                elapsed_seconds=round(time.monotonic() - started, 3),
+                **fields
+            )
+
+        if item.error:
+            return finish(BatchItemStatus.FAILED, error=item.error)
+
+        async def progress(stage: str, status: str):
+            await events.put({"event": "stage", "data": {"index": item.index, "stage": stage, "status": status}})
+
+        try:
+            quiz_data = await self.pipeline.run(
+                file=item.upload,
+                url=item.url,
+                video_url=item.video_url,
+                progress=progress
+            )
+        except Exception as e:
+            status_code, detail = describe_error(e)
+            print(f"❌ Batch item {item.index} ({item.source}) failed: {str(e)[:200]}")
+            return finish(BatchItemStatus.FAILED, error=JobError(status_code=status_code, detail=detail))
+        return finish(BatchItemStatus.COMPLETED, result=quiz_data)
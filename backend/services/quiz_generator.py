@@ -1,19 +1,70 @@
 import os
-import httpx
 import json
+import math
+import time
+import asyncio
+from typing import Any, Optional, AsyncIterator, List
 from models.quiz import QuizResponse, Question
+from services.http_clients import HTTPClientRegistry, get_http_clients
+from services.task_executor import TaskExecutor, gather_or_cancel, get_task_executor
+from services.content_chunker import QuestionSelector, select_chunks
+from services.model_health import ModelHealthTracker
+from services import metrics
+from services.rate_limiter import (
+    RateLimitedError,
+    RateLimiterRegistry,
+    estimate_tokens,
+    get_rate_limiters,
+    parse_retry_after,
+)
+from services.quiz_stream_parser import IncrementalQuestionParser
+
+
+QUIZ_LENGTH = 5
+
+DIFFICULTIES = ("easy", "medium", "hard")
+
+_DIFFICULTY_ALIASES = {"challenging": "hard", "difficult": "hard", "intermediate": "medium", "moderate": "medium"}
+
+
+def normalize_difficulty(value: Any) -> Optional[str]:
+    """A model's difficulty tag as one of DIFFICULTIES, or None if unrecognised"""
+    if not isinstance(value, str):
+        return None
+    value = value.strip().lower()
+    value = _DIFFICULTY_ALIASES.get(value, value)
+    return value if value in DIFFICULTIES else None
+
+SYSTEM_PROMPT = "You are an expert educator and quiz creator. Your specialty is creating thoughtful, content-specific questions that test real understanding. Always generate questions about the ACTUAL CONTENT provided, never about meta-information. Return ONLY valid JSON without any markdown formatting or code blocks."
 
 
 class QuizGenerator:
     """
-    Generates quiz questions using Perplexity API
+    Generates quiz questions using Perplexity API.
+
+    Content longer than LONG_CONTENT_THRESHOLD_CHARS is quizzed map-reduce
+    style: it is split into chunks, the most information-dense chunks are
+    each sent to the model in parallel, and the resulting questions are
+    de-duplicated into one quiz. The number of calls is capped by
+    LONG_CONTENT_MAX_CHUNKS, so cost and latency do not grow with length.
+
+    Models are tried in the order ranked by a ModelHealthTracker, so a
+    failing or deprecated model stops costing every request a timeout.
     """
 
-    def __init__(self):
+    def __init__(
+        self,
+        http_clients: Optional[HTTPClientRegistry] = None,
+        executor: Optional[TaskExecutor] = None,
+        rate_limiters: Optional[RateLimiterRegistry] = None
+    ):
+        self.http_clients = http_clients or get_http_clients()
+        self.executor = executor or get_task_executor()
+        self.rate_limiter = (rate_limiters or get_rate_limiters()).get("perplexity")
         self.api_key = os.getenv("PERPLEXITY_API_KEY")
         if not self.api_key:
             print("WARNING: PERPLEXITY_API_KEY not set. Using demo mode.")
-        self.base_url = "https://api.perplexity.ai/chat/completions"
+        self.base_url = os.getenv("PERPLEXITY_API_URL", "https://api.perplexity.ai/chat/completions")
         # Try different model names in order
         self.models_to_try = [
             "sonar",
@@ -21,6 +72,15 @@ class QuizGenerator:
             "llama-3.1-sonar-small-128k-chat",
             "llama-3.1-8b-instruct"
         ]
+        self.health = ModelHealthTracker.from_env(self.models_to_try)
+        # Race slow calls against the next-best model (costs extra tokens)
+        self.hedge_enabled = os.getenv("QUIZ_HEDGE_ENABLED", "false").lower() == "true"
+        self.long_content_threshold = int(os.getenv("LONG_CONTENT_THRESHOLD_CHARS", "6000"))
+        self.chunk_chars = int(os.getenv("LONG_CONTENT_CHUNK_CHARS", "2500"))
+        self.max_chunks = int(os.getenv("LONG_CONTENT_MAX_CHUNKS", "4"))
+        self.questions_per_chunk = int(os.getenv("LONG_CONTENT_QUESTIONS_PER_CHUNK", "3"))
+        self.long_content_parallelism = int(os.getenv("LONG_CONTENT_PARALLELISM", "4"))
+        self.bank_questions_per_call = int(os.getenv("QUESTION_BANK_MAX_QUESTIONS_PER_CALL", "15"))
 
     async def generate_quiz(self, content: str) -> QuizResponse:
         """
@@ -32,71 +92,369 @@ class QuizGenerator:
 
         print(f"✓ Using Perplexity API to generate quiz from {len(content)} characters of content")
 
-        prompt = self._create_prompt(content)
+        if self._is_long(content):
+            questions = [question async for question in self._map_reduce(content)]
+            return QuizResponse(questions=questions)
+
+        quiz_data = await self._complete(self._create_prompt(content))
+        return QuizResponse(**quiz_data)
+
+    async def generate_question_pool(self, content: str, pool_size: int) -> List[Question]:
+        """
+        Generate up to pool_size difficulty-tagged questions for the question
+        bank. The most informative chunks are quizzed in parallel (at most
+        QUESTION_BANK_MAX_QUESTIONS_PER_CALL questions each) and duplicates
+        are dropped, so short content yields a smaller pool.
+        """
+        if not self.api_key:
+            print("❌ No API key found")
+            raise ValueError("API key not configured. Please set PERPLEXITY_API_KEY environment variable.")
+
+        max_chunks = max(1, math.ceil(pool_size / self.bank_questions_per_call))
+        chunks = await self.executor.run_cpu(select_chunks, content, self.chunk_chars, max_chunks)
+        per_call = min(self.bank_questions_per_call, math.ceil(pool_size / len(chunks)))
+        print(f"🏦 Generating a pool of up to {pool_size} questions from {len(chunks)} chunk(s)")
+
+        semaphore = asyncio.Semaphore(self.long_content_parallelism)
+        max_tokens = min(6000, 400 * per_call)
+
+        async def generate_for_chunk(chunk: str) -> List[dict]:
+            async with semaphore:
+                try:
+                    quiz_data = await self._complete(
+                        self._create_prompt(chunk, per_call, tag_difficulty=True), max_tokens=max_tokens
+                    )
+                except ValueError:
+                    return []
+            questions = [
+                {**q, "difficulty": normalize_difficulty(q.get("difficulty"))}
+                for q in quiz_data.get('questions', []) if isinstance(q, dict)
+            ]
+            return [q for q in questions if self._is_valid_question(q)]
+
+        selector = QuestionSelector(pool_size, len(chunks))
+        # A chunk that fails outright (e.g. RateLimitedError) fails the pool,
+        # so the other chunks' model calls are cancelled rather than paid for
+        for questions in await gather_or_cancel(*(generate_for_chunk(chunk) for chunk in chunks)):
+            selector.offer(questions)
+        selector.finish()
+
+        if not selector.selected:
+            print(f"❌ All models failed to generate quiz")
+            raise ValueError("Could not generate quiz. Please try again later.")
+        return [Question(**{**q, "id": i + 1}) for i, q in enumerate(selector.selected)]
+
+    async def _complete(self, prompt: str, max_tokens: int = 3000) -> dict:
+        """
+        Send a prompt to the healthiest model, falling back through the
+        ranking, and return the parsed quiz JSON. With hedging enabled, a
+        call that outlives the model's usual latency is raced against the
+        next-best model.
+        """
+        attempted = set()
+        while True:
+            candidates = [model for model in self.health.ranked() if model not in attempted]
+            if not candidates:
+                break
+
+            primary = candidates[0]
+            backup = candidates[1] if self.hedge_enabled and len(candidates) > 1 else None
+            hedge_delay = self.health.hedge_delay(primary) if backup else None
 
-        # Try different models until one works
-        for model_name in self.models_to_try:
             try:
-                print(f"🔄 Trying model: {model_name}")
+                if hedge_delay is None:
+                    return await self._call_model(primary, prompt, max_tokens, attempted)
+                return await self._hedged_call(primary, backup, hedge_delay, prompt, max_tokens, attempted)
+            except RateLimitedError:
+                # Shared by all models, so trying the next one won't help
+                raise
+            except Exception as e:
+                print(f"❌ Model error: {str(e)[:200]}")
+                metrics.MODEL_FALLBACKS.labels("complete", primary).inc()
+                continue
+
+        # If all models failed, raise an error
+        print(f"❌ All models failed to generate quiz")
+        raise ValueError("Could not generate quiz. Please try again later.")
 
-                async with httpx.AsyncClient() as client:
+    async def _hedged_call(
+        self, primary: str, backup: str, hedge_delay: float, prompt: str, max_tokens: int, attempted: set
+    ) -> dict:
+        """Call primary; if it hasn't answered after hedge_delay, race it against backup"""
+        primary_task = asyncio.create_task(self._call_model(primary, prompt, max_tokens, attempted))
+        done, _ = await asyncio.wait({primary_task}, timeout=hedge_delay)
+        if done:
+            return primary_task.result()
+
+        print(f"⏱️ {primary} slower than p{self.health.hedge_percentile * 100:.0f} ({hedge_delay:.1f}s), hedging to {backup}")
+        metrics.MODEL_HEDGES.labels(primary).inc()
+        pending = {primary_task, asyncio.create_task(self._call_model(backup, prompt, max_tokens, attempted))}
+        error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call_model(self, model_name: str, prompt: str, max_tokens: int, attempted: set) -> dict:
+        """
+        One completion request, admitted by the rate limiter, with its outcome
+        recorded in the health tracker
+        """
+        attempted.add(model_name)
+        async with self.rate_limiter.reserve(estimate_tokens(SYSTEM_PROMPT + prompt) + max_tokens) as permit:
+            with metrics.observe_model_call("complete", model_name) as call:
+                print(f"🔄 Trying model: {model_name}")
+                self.health.start(model_name)
+                started = time.monotonic()
+                try:
+                    client = self.http_clients.get("perplexity")
                     response = await client.post(
                         self.base_url,
-                        headers={
-                            "Authorization": f"Bearer {self.api_key}",
-                            "Content-Type": "application/json"
-                        },
-                        json={
-                            "model": model_name,
-                            "messages": [
-                                {
-                                    "role": "system",
-                                    "content": "You are an expert educator and quiz creator. Your specialty is creating thoughtful, content-specific questions that test real understanding. Always generate questions about the ACTUAL CONTENT provided, never about meta-information. Return ONLY valid JSON without any markdown formatting or code blocks."
-                                },
-                                {
-                                    "role": "user",
-                                    "content": prompt
-                                }
-                            ],
-                            "temperature": 0.8,
-                            "max_tokens": 3000
-                        },
-                        timeout=30.0
+                        headers=self._headers(),
+                        json=self._request_body(model_name, prompt, max_tokens=max_tokens)
                     )
+                except asyncio.CancelledError:
+                    self.health.abandon(model_name)
+                    raise
+                except Exception as e:
+                    self.health.record_failure(model_name, str(e))
+                    raise
+
+                if response.status_code == 429:
+                    # Account-wide throttling, not a problem with this model
+                    call.outcome = "throttled"
+                    permit.throttled(parse_retry_after(response.headers.get("retry-after")))
+                    self.health.abandon(model_name)
+                    raise ValueError(f"Model {model_name} failed (429)")
+
+                if response.status_code != 200:
+                    error_detail = response.text
+                    print(f"❌ Model {model_name} failed ({response.status_code}): {error_detail[:200]}")
+                    self.health.record_failure(
+                        model_name,
+                        f"{response.status_code}: {error_detail}",
+                        permanent=self._is_model_rejected(response.status_code, error_detail)
+                    )
+                    raise ValueError(f"Model {model_name} failed ({response.status_code})")
+
+                try:
+                    result = response.json()
+                    permit.record_usage((result.get('usage') or {}).get('total_tokens'))
+                    quiz_text = result['choices'][0]['message']['content']
+                    quiz_data = self._parse_quiz_text(quiz_text)
+                except Exception as e:
+                    self.health.record_failure(model_name, f"Unparseable response: {e}")
+                    raise ValueError(f"Model {model_name} returned an unparseable quiz: {str(e)[:200]}")
+
+        self.health.record_success(model_name, time.monotonic() - started)
+        print(f"✓ Successfully using model: {model_name}")
+        print(f"✓ Received response from Perplexity API")
+        print(f"✓ Successfully generated {len(quiz_data['questions'])} questions")
+        return quiz_data
+
+    def _is_model_rejected(self, status_code: int, error_detail: str) -> bool:
+        """Whether the provider rejected the model itself (unknown or deprecated)"""
+        return status_code in (404, 410) or (status_code == 400 and "model" in error_detail.lower())
+
+    async def stream_quiz(self, content: str) -> AsyncIterator[Question]:
+        """
+        Stream quiz questions as the model produces them, using the provider's
+        streaming completions. Falls back to the next model only if the current
+        one fails before yielding any question. Streams are not hedged, and
+        only their outcome (not latency) feeds the health tracker.
+        """
+        if not self.api_key:
+            print("❌ No API key found")
+            raise ValueError("API key not configured. Please set PERPLEXITY_API_KEY environment variable.")
+
+        if self._is_long(content):
+            async for question in self._map_reduce(content):
+                yield question
+            return
+
+        prompt = self._create_prompt(content)
+
+        for model_name in self.health.ranked():
+            emitted = 0
+            try:
+                async with self.rate_limiter.reserve(estimate_tokens(SYSTEM_PROMPT + prompt) + 3000) as permit:
+                    with metrics.observe_model_call("stream", model_name) as call:
+                        self.health.start(model_name)
+                        print(f"🔄 Streaming with model: {model_name}")
+
+                        client = self.http_clients.get("perplexity")
+                        async with client.stream(
+                            "POST",
+                            self.base_url,
+                            headers=self._headers(),
+                            json=self._request_body(model_name, prompt, stream=True)
+                        ) as response:
+                            if response.status_code == 429:
+                                await response.aread()
+                                permit.throttled(parse_retry_after(response.headers.get("retry-after")))
+                                self.health.abandon(model_name)
+                                call.outcome = "throttled"
+                                metrics.MODEL_FALLBACKS.labels("stream", model_name).inc()
+                                continue
+
+                            if response.status_code != 200:
+                                error_detail = (await response.aread()).decode(errors="replace")
+                                print(f"❌ Model {model_name} failed ({response.status_code}): {error_detail[:200]}")
+                                self.health.record_failure(
+                                    model_name,
+                                    f"{response.status_code}: {error_detail}",
+                                    permanent=self._is_model_rejected(response.status_code, error_detail)
+                                )
+                                call.outcome = "error"
+                                metrics.MODEL_FALLBACKS.labels("stream", model_name).inc()
+                                continue
 
-                    if response.status_code == 200:
-                        result = response.json()
-                        quiz_text = result['choices'][0]['message']['content']
-                        print(f"✓ Successfully using model: {model_name}")
-                        print(f"✓ Received response from Perplexity API")
-
-                        quiz_text = quiz_text.strip()
-                        if quiz_text.startswith('```json'):
-                            quiz_text = quiz_text[7:]
-                        if quiz_text.startswith('```'):
-                            quiz_text = quiz_text[3:]
-                        if quiz_text.endswith('```'):
-                            quiz_text = quiz_text[:-3]
-                        quiz_text = quiz_text.strip()
-
-                        quiz_data = json.loads(quiz_text)
-                        print(f"✓ Successfully generated {len(quiz_data['questions'])} questions")
-
-                        return QuizResponse(**quiz_data)
-                    else:
-                        error_detail = response.text
-                        print(f"❌ Model {model_name} failed ({response.status_code}): {error_detail[:200]}")
-                        continue
+                            parser = IncrementalQuestionParser()
+                            async for line in response.aiter_lines():
+                                if not line.startswith("data:"):
+                                    continue
+                                data = line[5:].strip()
+                                if data == "[DONE]":
+                                    break
 
+                                delta = json.loads(data)['choices'][0].get('delta', {}).get('content') or ""
+                                for question_data in parser.feed(delta):
+                                    # Same checks as a non-streamed quiz (4 options, answer in range)
+                                    if not self._is_valid_question(question_data):
+                                        continue  # Skip malformed questions
+                                    emitted += 1
+                                    yield Question(**{**question_data, "id": emitted})
+
+                        if emitted:
+                            self.health.record_success(model_name)
+                            print(f"✓ Streamed {emitted} questions using model: {model_name}")
+                            return
+                        print(f"❌ Model {model_name} streamed no questions")
+                        self.health.record_failure(model_name, "Streamed no questions")
+                        call.outcome = "error"
+                        metrics.MODEL_FALLBACKS.labels("stream", model_name).inc()
+
+            except RateLimitedError:
+                raise
+            except (asyncio.CancelledError, GeneratorExit):
+                self.health.abandon(model_name)
+                raise
             except Exception as e:
+                self.health.record_failure(model_name, str(e))
+                if emitted:
+                    # Questions already reached the client; switching models would duplicate them
+                    raise ValueError(f"Quiz stream interrupted: {str(e)[:200]}")
                 print(f"❌ Model {model_name} error: {str(e)[:200]}")
+                metrics.MODEL_FALLBACKS.labels("stream", model_name).inc()
                 continue
 
-        # If all models failed, raise an error
         print(f"❌ All models failed to generate quiz")
         raise ValueError("Could not generate quiz. Please try again later.")
 
-    def _create_prompt(self, content: str) -> str:
+    def _is_long(self, content: str) -> bool:
+        return len(content) > self.long_content_threshold
+
+    async def _map_reduce(self, content: str) -> AsyncIterator[Question]:
+        """
+        Generate questions from the top-ranked chunks of long content in
+        parallel, yielding de-duplicated questions as chunk results arrive
+        """
+        chunks = await self.executor.run_cpu(select_chunks, content, self.chunk_chars, self.max_chunks)
+        print(f"📚 Long content: generating from {len(chunks)} of its most informative chunks")
+
+        semaphore = asyncio.Semaphore(self.long_content_parallelism)
+        # Fewer questions per call need fewer output tokens
+        max_tokens = min(3000, 600 * self.questions_per_chunk)
+
+        async def generate_for_chunk(chunk: str) -> List[dict]:
+            async with semaphore:
+                try:
+                    quiz_data = await self._complete(
+                        self._create_prompt(chunk, self.questions_per_chunk), max_tokens=max_tokens
+                    )
+                except ValueError:
+                    return []
+            return [q for q in quiz_data.get('questions', []) if self._is_valid_question(q)]
+
+        selector = QuestionSelector(QUIZ_LENGTH, len(chunks))
+        tasks = [asyncio.create_task(generate_for_chunk(chunk)) for chunk in chunks]
+        emitted = 0
+        try:
+            for finished in asyncio.as_completed(tasks):
+                for question_data in selector.offer(await finished):
+                    emitted += 1
+                    yield Question(**{**question_data, "id": emitted})
+                if emitted >= QUIZ_LENGTH:
+                    break
+
+            for question_data in selector.finish():
+                emitted += 1
+                yield Question(**{**question_data, "id": emitted})
+        finally:
+            # Early exit, a failed chunk (e.g. RateLimitedError) or the
+            # consumer going away: stop the other chunks' model calls
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        if not emitted:
+            print(f"❌ All models failed to generate quiz")
+            raise ValueError("Could not generate quiz. Please try again later.")
+
+    def _is_valid_question(self, question_data: dict) -> bool:
+        try:
+            question = Question(**{**question_data, "id": 0})
+        except Exception:
+            return False
+        return len(question.options) == 4 and 0 <= question.correctAnswer < 4
+
+    def _headers(self) -> dict:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json"
+        }
+
+    def _request_body(self, model_name: str, prompt: str, stream: bool = False, max_tokens: int = 3000) -> dict:
+        body = {
+            "model": model_name,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": 0.8,
+            "max_tokens": max_tokens
+        }
+        if stream:
+            body["stream"] = True
+        return body
+
+    def _parse_quiz_text(self, quiz_text: str) -> dict:
+        """Strip markdown fences from the model output and parse the JSON"""
+        quiz_text = quiz_text.strip()
+        if quiz_text.startswith('```json'):
+            quiz_text = quiz_text[7:]
+        if quiz_text.startswith('```'):
+            quiz_text = quiz_text[3:]
+        if quiz_text.endswith('```'):
+            quiz_text = quiz_text[:-3]
+        quiz_text = quiz_text.strip()
+
+        return json.loads(quiz_text)
+
+    def _create_prompt(self, content: str, num_questions: int = QUIZ_LENGTH, tag_difficulty: bool = False) -> str:
         """
         Create a prompt for the AI model
         """
@@ -109,7 +467,19 @@ class QuizGenerator:
             content = content[:max_content_length] + "..."
             print(f"📝 Content truncated to {max_content_length} characters for API efficiency")
 
-        return f"""You are an expert educator creating a comprehensive quiz. Read the following content carefully and create exactly 5 multiple-choice questions that test deep understanding of the KEY FACTS, CONCEPTS, and DETAILS mentioned in the content.
+        difficulty_field = ""
+        if tag_difficulty:
+            difficulty = (
+                "Vary difficulty across easy, medium, and hard questions (about 40% easy, 40% medium, 20% hard) "
+                "and tag each one with \"difficulty\": \"easy\", \"medium\" or \"hard\""
+            )
+            difficulty_field = ',\n            "difficulty": "easy"'
+        elif num_questions == QUIZ_LENGTH:
+            difficulty = "Vary difficulty: include 2 easy, 2 medium, and 1 challenging question"
+        else:
+            difficulty = "Vary difficulty across easy, medium, and challenging questions"
+
+        return f"""You are an expert educator creating a comprehensive quiz. Read the following content carefully and create exactly {num_questions} multiple-choice questions that test deep understanding of the KEY FACTS, CONCEPTS, and DETAILS mentioned in the content.
 
 IMPORTANT: Your questions MUST be about the SPECIFIC INFORMATION in the content below. DO NOT ask generic questions about the document format or meta-information.
 
@@ -123,7 +493,7 @@ Generate the questions in the following JSON format:
             "id": 1,
             "question": "Question text here?",
             "options": ["Option A", "Option B", "Option C", "Option D"],
-            "correctAnswer": 0
+            "correctAnswer": 0{difficulty_field}
         }}
     ]
 }}
@@ -135,7 +505,7 @@ Requirements:
 4. Each question must have exactly 4 distinct options
 5. Include plausible wrong answers that someone who didn't read carefully might choose
 6. correctAnswer is the index (0-3) of the correct option
-7. Vary difficulty: include 2 easy, 2 medium, and 1 challenging question
+7. {difficulty}
 8. Return ONLY valid JSON without any markdown formatting, code blocks, or additional text
 
 Examples of GOOD questions (specific to content):
@@ -148,7 +518,7 @@ Examples of BAD questions (avoid these):
 - "How long is the content?"
 - "What type of file was uploaded?"
 
-Now create 5 questions based ONLY on the specific information in the content provided above."""
+Now create {num_questions} questions based ONLY on the specific information in the content provided above."""
 
     def _generate_demo_quiz(self, content: str) -> QuizResponse:
         """
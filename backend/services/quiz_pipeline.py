@@ -0,0 +1,606 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Tuple, Callable, Awaitable, Any, AsyncIterator, Union
+
+from fastapi import UploadFile
+
+from services.document_processor import DocumentProcessor
+from services.quiz_generator import QUIZ_LENGTH, QuizGenerator
+from services.video_processor import VideoProcessor
+from services.verification_service import FAILED_ANALYSIS_METHOD, VerificationService
+from services.result_cache import (
+    ResultCache,
+    youtube_source_key,
+    video_url_source_key,
+    web_url_source_key,
+    file_source_key,
+)
+from services.single_flight import SingleFlight
+from services.question_bank import QuestionBank, QuizAssembly
+from services import metrics
+from services.task_executor import ExecutorSaturatedError, TaskTimeoutError, WorkerPoolRestartedError
+from services.rate_limiter import RateLimitedError
+from services.upload_spool import (
+    SpooledUpload,
+    UploadTooLargeError,
+    VIDEO_FILE_EXTENSIONS,
+    spool_upload,
+)
+from models.quiz import QuizResponse, Question
+from models.verification import VerificationStatus, VerificationMetadata, SourceInfo
+
+# Called as progress(stage, status), e.g. ("verification", "started")
+ProgressCallback = Callable[[str, str], Awaitable[None]]
+
+
+class ContentRejectedError(Exception):
+    """Raised when verification rejects content as non-educational"""
+
+    def __init__(self, reason: Optional[str], confidence: Optional[float]):
+        super().__init__(reason or "Content rejected")
+        self.reason = reason
+        self.confidence = confidence
+
+
+class ServiceUnavailableError(Exception):
+    """Raised when a source type needs a service that is not configured"""
+
+
+def describe_error(error: Exception) -> Tuple[int, Any]:
+    """Map a pipeline exception to the (status_code, detail) the API reports"""
+    if isinstance(error, ContentRejectedError):
+        return 403, {
+            "error": "Content Rejected",
+            "reason": error.reason,
+            "confidence": error.confidence
+        }
+    if isinstance(error, ServiceUnavailableError):
+        return 500, str(error)
+    if isinstance(error, RateLimitedError):
+        return 429, str(error)
+    if isinstance(error, (ExecutorSaturatedError, WorkerPoolRestartedError)):
+        return 503, str(error)
+    if isinstance(error, TaskTimeoutError):
+        return 504, str(error)
+    if isinstance(error, UploadTooLargeError):
+        return 413, str(error)
+    if isinstance(error, ValueError):
+        return 400, str(error)
+    return 500, str(error)
+
+
+def input_source_type(file: Optional[Union[UploadFile, SpooledUpload]], video_url: Optional[str]) -> str:
+    """Source type of a request, known before extraction (metrics label)"""
+    if video_url:
+        return "video_url"
+    if file is not None:
+        extension = (file.filename or "").split('.')[-1].lower()
+        return "video_file" if extension in VIDEO_FILE_EXTENSIONS else "document_file"
+    return "web_url"
+
+
+def error_headers(error: Exception) -> Optional[Dict[str, str]]:
+    """Extra response headers for a pipeline exception (Retry-After on 429)"""
+    if isinstance(error, RateLimitedError):
+        return {"Retry-After": str(max(1, round(error.retry_after)))}
+    return None
+
+
+class StageLimiter:
+    """Per-stage concurrency limits (extraction, verification, generation)"""
+
+    STAGES = ("extraction", "verification", "generation")
+
+    def __init__(self, limits: Optional[Dict[str, int]] = None):
+        limits = limits or {}
+        self._semaphores = {
+            stage: asyncio.Semaphore(limits[stage])
+            for stage in self.STAGES
+            if limits.get(stage)
+        }
+
+    @asynccontextmanager
+    async def slot(self, stage: str):
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+        async with semaphore:
+            yield
+
+
+def _discard(speculative):
+    """Cancel a speculative task or stream and swallow whatever it ends with"""
+    task = speculative.task if isinstance(speculative, _BufferedStream) else speculative
+    task.cancel()
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+
+class _BufferedStream:
+    """
+    Consumes an async iterator in a background task, buffering items so a
+    speculative stream can make progress before anyone is reading it
+    """
+
+    _END = object()
+
+    def __init__(self, source: AsyncIterator):
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.create_task(self._pump(source))
+
+    async def _pump(self, source: AsyncIterator):
+        try:
+            async for item in source:
+                await self._queue.put(item)
+        except Exception as e:
+            await self._queue.put(e)
+            return
+        await self._queue.put(self._END)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        item = await self._queue.get()
+        if item is self._END:
+            raise StopAsyncIteration
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+
+class QuizPipeline:
+    """
+    The extract -> verify -> generate flow behind /api/generate-quiz,
+    shared by the synchronous endpoint and the background job workers
+    """
+
+    def __init__(
+        self,
+        document_processor: DocumentProcessor,
+        quiz_generator: QuizGenerator,
+        video_processor: Optional[VideoProcessor],
+        verification_service: Optional[VerificationService],
+        result_cache: ResultCache,
+        speculative_generation: bool = False,
+        stage_limiter: Optional[StageLimiter] = None,
+        single_flight: Optional[SingleFlight] = None,
+        question_bank: Optional[QuestionBank] = None
+    ):
+        self.document_processor = document_processor
+        self.quiz_generator = quiz_generator
+        self.video_processor = video_processor
+        self.verification_service = verification_service
+        self.result_cache = result_cache
+        self.speculative_generation = speculative_generation
+        self.stage_limiter = stage_limiter or StageLimiter()
+        # Shared between pipelines so the API and job workers coalesce with each other
+        self.single_flight = single_flight or SingleFlight()
+        self.question_bank = question_bank
+
+    def video_source_key(self, video_url: str) -> str:
+        """Canonical cache key for a video URL (YouTube ID when available)"""
+        video_id = self.video_processor.extract_youtube_video_id(video_url) if self.video_processor else None
+        if video_id:
+            return youtube_source_key(video_id)
+        return video_url_source_key(video_url)
+
+    def source_key(
+        self,
+        video_url: Optional[str] = None,
+        url: Optional[str] = None,
+        upload: Optional[SpooledUpload] = None
+    ) -> str:
+        """Canonical source key for whichever input was provided"""
+        if video_url:
+            return self.video_source_key(video_url)
+        if upload is not None:
+            return file_source_key(upload.sha256, upload.extension)
+        return web_url_source_key(url)
+
+    async def spool(self, file: UploadFile, directory: Optional[str] = None) -> SpooledUpload:
+        """Stream an upload to disk (size-capped, hashed on the fly)"""
+        return await spool_upload(file, self.document_processor.executor, directory=directory)
+
+    async def run(
+        self,
+        file: Optional[Union[UploadFile, SpooledUpload]] = None,
+        url: Optional[str] = None,
+        video_url: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+        assembly: Optional[QuizAssembly] = None
+    ) -> QuizResponse:
+        """
+        Run the full pipeline. Raises ValueError, ContentRejectedError,
+        ServiceUnavailableError or executor errors; see describe_error().
+
+        `file` may be a raw UploadFile (spooled to disk and removed afterwards)
+        or an already spooled upload, which stays owned by the caller.
+        With `assembly`, the quiz is drawn from the source's question bank
+        pool (generated on first use) instead of being generated.
+        """
+        source_type = input_source_type(file, video_url)
+        with metrics.REQUESTS_IN_FLIGHT.labels(source_type).track_inprogress(), \
+                metrics.STAGE_SECONDS.labels("total", source_type).time():
+            return await self._run(file, url, video_url, progress, source_type, assembly)
+
+    async def _run(
+        self,
+        file: Optional[Union[UploadFile, SpooledUpload]],
+        url: Optional[str],
+        video_url: Optional[str],
+        progress: Optional[ProgressCallback],
+        source_type: str,
+        assembly: Optional[QuizAssembly] = None
+    ) -> QuizResponse:
+        async def report(stage: str, status: str):
+            if progress:
+                await progress(stage, status)
+
+        await report("extraction", "started")
+        with metrics.STAGE_SECONDS.labels("extraction", source_type).time():
+            content, source_info, source_key = await self._extract_source(file, url, video_url)
+        await report("extraction", "completed")
+
+        cached_quiz = None if assembly else await self.result_cache.get("quiz", source_key)
+        quiz_task = None
+
+        # Verify educational quality (if verification service available)
+        verification = None
+        if self.verification_service:
+            await report("verification", "started")
+            cached_verification = await self.result_cache.get("verification", source_key)
+            # A pool costs several model calls, so it is never built speculatively
+            if not assembly and self._should_speculate(cached_quiz, cached_verification):
+                print(f"🎯 Generating quiz speculatively while verifying...")
+                quiz_task = asyncio.create_task(self._generate(content, source_key))
+            with metrics.STAGE_SECONDS.labels("verification", source_type).time():
+                verification = await self._verify(
+                    content, source_info, source_key, video_url or url, cached_verification, quiz_task
+                )
+            await report("verification", "completed")
+
+        # Generate quiz
+        await report("generation", "started")
+        with metrics.STAGE_SECONDS.labels("generation", source_type).time():
+            if assembly:
+                quiz_data = await self._assemble(content, source_key, assembly)
+            elif cached_quiz:
+                print(f"⚡ Using cached quiz for {source_key}")
+                quiz_data = QuizResponse(**cached_quiz)
+            else:
+                if quiz_task:
+                    quiz_data = await quiz_task
+                else:
+                    print(f"🎯 Generating quiz...")
+                    quiz_data = await self._generate(content, source_key)
+                await self.result_cache.set("quiz", source_key, {"questions": [q.dict() for q in quiz_data.questions]})
+        await report("generation", "completed")
+
+        # Attach metadata to response
+        quiz_data.verification = verification
+        quiz_data.source_info = source_info
+        quiz_data.points_awarded = self._points_for(verification)
+        return quiz_data
+
+    async def stream(
+        self,
+        file: Optional[UploadFile] = None,
+        url: Optional[str] = None,
+        video_url: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the pipeline, yielding events as they happen:
+        - {"event": "stage", "data": {"stage": ..., "status": ...}}
+        - {"event": "question", "data": Question}
+        - {"event": "done", "data": {"verification", "source_info", "points_awarded"}}
+        Errors are raised, as in run(). `file` is handled as in run().
+        """
+        source_type = input_source_type(file, video_url)
+        with metrics.REQUESTS_IN_FLIGHT.labels(source_type).track_inprogress(), \
+                metrics.STAGE_SECONDS.labels("total", source_type).time():
+            async for event in self._stream(file, url, video_url, source_type):
+                yield event
+
+    async def _stream(
+        self,
+        file: Optional[UploadFile],
+        url: Optional[str],
+        video_url: Optional[str],
+        source_type: str
+    ) -> AsyncIterator[Dict[str, Any]]:
+        def stage(name: str, status: str, **extra) -> Dict[str, Any]:
+            return {"event": "stage", "data": {"stage": name, "status": status, **extra}}
+
+        yield stage("extraction", "started")
+        with metrics.STAGE_SECONDS.labels("extraction", source_type).time():
+            content, source_info, source_key = await self._extract_source(file, url, video_url)
+        yield stage("extraction", "completed", characters=len(content))
+
+        cached_quiz = await self.result_cache.get("quiz", source_key)
+        speculative = None
+
+        # The client may go away at any yield; a speculative stream must not
+        # keep generating (and spending) for nobody
+        try:
+            verification = None
+            if self.verification_service:
+                yield stage("verification", "started")
+                cached_verification = await self.result_cache.get("verification", source_key)
+                if self._should_speculate(cached_quiz, cached_verification):
+                    print(f"🎯 Streaming quiz speculatively while verifying...")
+                    speculative = _BufferedStream(self._stream_questions(content))
+                with metrics.STAGE_SECONDS.labels("verification", source_type).time():
+                    verification = await self._verify(
+                        content, source_info, source_key, video_url or url, cached_verification, speculative
+                    )
+                yield stage("verification", "completed", status_detail=verification.status.value)
+
+            yield stage("generation", "started")
+            questions = []
+            with metrics.STAGE_SECONDS.labels("generation", source_type).time():
+                if cached_quiz:
+                    print(f"⚡ Using cached quiz for {source_key}")
+                    for question in QuizResponse(**cached_quiz).questions:
+                        yield {"event": "question", "data": question}
+                elif not speculative and self.single_flight.in_flight(("generation", source_key)):
+                    # Another request is already generating this quiz: wait for it
+                    print(f"⏳ Joining in-flight quiz generation for {source_key}")
+                    for question in (await self._generate(content, source_key)).questions:
+                        yield {"event": "question", "data": question}
+                else:
+                    question_stream = speculative if speculative else self._stream_questions(content)
+                    async for question in question_stream:
+                        questions.append(question)
+                        yield {"event": "question", "data": question}
+                    # Only a complete quiz is cached; a stream that ended early
+                    # (truncated output, skipped invalid questions) is served once
+                    if len(questions) == QUIZ_LENGTH:
+                        await self.result_cache.set("quiz", source_key, {"questions": [q.dict() for q in questions]})
+            yield stage("generation", "completed")
+
+            yield {"event": "done", "data": {
+                "verification": verification,
+                "source_info": source_info,
+                "points_awarded": self._points_for(verification)
+            }}
+        finally:
+            if speculative and not speculative.task.done():
+                _discard(speculative)
+
+    def _should_speculate(self, cached_quiz: Optional[Dict], cached_verification: Optional[Dict]) -> bool:
+        # Nothing to overlap with when the verdict or the quiz is already cached
+        return self.speculative_generation and not cached_quiz and not cached_verification
+
+    async def _verify(
+        self,
+        content: str,
+        source_info: SourceInfo,
+        source_key: str,
+        url: Optional[str],
+        cached_verification: Optional[Dict],
+        speculative=None
+    ) -> VerificationMetadata:
+        """
+        Verify educational quality, or reuse a cached verdict.
+        Raises ContentRejectedError (discarding any speculative generation) on rejection.
+        """
+        if cached_verification:
+            print(f"⚡ Using cached verification for {source_key}")
+            verification = VerificationMetadata(**cached_verification)
+        else:
+            print(f"🔍 Verifying educational content...")
+            started = time.monotonic()
+            try:
+                verification = await self._coalesced(
+                    "verification",
+                    source_key,
+                    lambda: self.verification_service.verify_content(
+                        content=content,
+                        url=url,
+                        metadata=source_info.dict() if source_info else None
+                    )
+                )
+            except BaseException:
+                if speculative:
+                    _discard(speculative)
+                raise
+            metrics.VERIFICATION_SECONDS.labels(
+                verification.verification_method, verification.status.value
+            ).observe(time.monotonic() - started)
+
+        # Content let through unverified (verification API out of quota).
+        # Not cached, so the next request gets a real verdict.
+        if verification.status == VerificationStatus.PENDING:
+            return verification
+
+        # Reject if failed verification. A rejection because the AI call
+        # failed isn't cached either: the next request should retry it.
+        if verification.status == VerificationStatus.REJECTED:
+            if not cached_verification and verification.verification_method != FAILED_ANALYSIS_METHOD:
+                await self.result_cache.set("verification", source_key, verification.dict())
+            if speculative:
+                print(f"🗑️ Discarding speculative quiz for rejected content")
+                _discard(speculative)
+            # Reject for actual educational quality issues
+            raise ContentRejectedError(verification.rejection_reason, verification.confidence_score)
+
+        if not cached_verification:
+            await self.result_cache.set("verification", source_key, verification.dict())
+        return verification
+
+    @staticmethod
+    def _points_for(verification: Optional[VerificationMetadata]) -> int:
+        """Calculate points based on verification status"""
+        if verification:
+            if verification.status == VerificationStatus.VERIFIED:
+                return 150  # Verified platforms
+            elif verification.status == VerificationStatus.AI_VERIFIED:
+                return 100  # AI-verified content
+            else:
+                return 50   # Fallback
+        return 50  # No verification available
+
+    async def _stream_questions(self, content: str) -> AsyncIterator[Question]:
+        async with self.stage_limiter.slot("generation"):
+            async for question in self.quiz_generator.stream_quiz(content):
+                yield question
+
+    async def _generate(self, content: str, source_key: str) -> QuizResponse:
+        quiz = await self._coalesced("generation", source_key, lambda: self.quiz_generator.generate_quiz(content))
+        # Each waiter attaches its own metadata, so don't share the object
+        return QuizResponse(questions=quiz.questions)
+
+    async def _assemble(self, content: str, source_key: str, assembly: QuizAssembly) -> QuizResponse:
+        """A quiz drawn from the source's question bank pool, generating the pool if needed"""
+        if not self.question_bank:
+            raise ServiceUnavailableError("Question bank unavailable. Set QUESTION_BANK_ENABLED=true.")
+
+        executor = self.document_processor.executor
+        pool = await executor.run_io(self.question_bank.get, source_key)
+        if pool is None:
+            print(f"🏦 Building question bank for {source_key}...")
+
+            async def build_pool():
+                questions = await self.quiz_generator.generate_question_pool(content, self.question_bank.pool_size)
+                return await executor.run_io(self.question_bank.put, source_key, questions)
+
+            pool = await self._coalesced("generation", f"bank:{source_key}", build_pool)
+        else:
+            print(f"⚡ Assembling quiz from question bank for {source_key}")
+        return QuizResponse(questions=self.question_bank.assemble(source_key, pool, assembly))
+
+    async def _coalesced(
+        self,
+        stage: str,
+        source_key: str,
+        work: Callable[[], Awaitable[Any]],
+        on_done: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """
+        Run a stage's work for source_key in a stage slot, or wait for the
+        identical run already in flight (the waiter takes no slot).
+        on_done releases what work() uses; see SingleFlight.do().
+        """
+        async def leader():
+            async with self.stage_limiter.slot(stage):
+                with metrics.STAGE_IN_FLIGHT.labels(stage).track_inprogress():
+                    return await work()
+
+        return await self.single_flight.do((stage, source_key), leader, on_done=on_done)
+
+    async def _extract_source(
+        self,
+        file: Optional[Union[UploadFile, SpooledUpload]],
+        url: Optional[str],
+        video_url: Optional[str]
+    ) -> Tuple[str, SourceInfo, str]:
+        """Spool a raw upload to disk for the duration of extraction"""
+        if file is None or video_url or isinstance(file, SpooledUpload):
+            return await self._extract(file, url, video_url)
+
+        upload = await self.spool(file)
+        try:
+            return await self._extract(upload, url, video_url)
+        finally:
+            upload.cleanup()
+
+    async def _extract(
+        self,
+        file: Optional[SpooledUpload],
+        url: Optional[str],
+        video_url: Optional[str]
+    ) -> Tuple[str, SourceInfo, str]:
+        """Extract text from the source, using the extraction cache when possible"""
+        content = None
+        source_info = None
+
+        # Route 1: Video URL
+        if video_url:
+            if not self.video_processor:
+                raise ServiceUnavailableError("Video processing unavailable. OpenAI API key not configured.")
+
+            source_key = self.video_source_key(video_url)
+            cached = await self.result_cache.get("extraction", source_key)
+            if cached:
+                print(f"⚡ Using cached transcript for {source_key}")
+                content = cached["content"]
+                source_info = SourceInfo(**{**cached["source_info"], "source_identifier": video_url})
+            else:
+                print(f"📹 Processing video URL: {video_url}")
+                result = await self._coalesced(
+                    "extraction", source_key, lambda: self.video_processor.process_video_url(video_url)
+                )
+                content = result.transcript
+                source_info = SourceInfo(
+                    source_type="video_url",
+                    source_identifier=video_url,
+                    title=result.title,
+                    channel=result.channel,
+                    duration=result.duration,
+                    transcript_length=len(content)
+                )
+
+        # Route 2: File Upload (including video files)
+        elif file:
+            if file.extension in VIDEO_FILE_EXTENSIONS:
+                source_type = "video_file"
+            else:
+                source_type = "document_file"
+
+            source_key = file_source_key(file.sha256, file.extension)
+
+            cached = await self.result_cache.get("extraction", source_key)
+            if cached:
+                print(f"⚡ Using cached extraction for {file.filename}")
+                content = cached["content"]
+            else:
+                if source_type == "video_file":
+                    print(f"📹 Processing video file: {file.filename}")
+                else:
+                    print(f"📄 Processing document file: {file.filename}")
+                # The shared run can outlive this request (and its upload's
+                # owner), so it reads its own link to the file and removes it
+                private = await self.document_processor.executor.run_io(file.link)
+                content = await self._coalesced(
+                    "extraction",
+                    source_key,
+                    lambda: self.document_processor.process_file(private.path, private.filename),
+                    on_done=private.cleanup
+                )
+
+            source_info = SourceInfo(
+                source_type=source_type,
+                source_identifier=file.filename,
+                transcript_length=len(content) if source_type == "video_file" else None
+            )
+
+        # Route 3: Web URL
+        else:
+            source_key = web_url_source_key(url)
+            cached = await self.result_cache.get("extraction", source_key)
+            if cached:
+                print(f"⚡ Using cached page content for {source_key}")
+                content = cached["content"]
+            else:
+                print(f"🌐 Processing web URL: {url}")
+                content = await self._coalesced(
+                    "extraction", source_key, lambda: self.document_processor.process_url(url)
+                )
+            source_info = SourceInfo(
+                source_type="web_url",
+                source_identifier=url
+            )
+
+        # Validate content length
+        if not content or len(content.strip()) < 50:
+            raise ValueError("The provided content is too short to generate a quiz")
+
+        if not cached:
+            await self.result_cache.set("extraction", source_key, {
+                "content": content,
+                "source_info": source_info.dict()
+            })
+
+        return content, source_info, source_key
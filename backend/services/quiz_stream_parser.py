@@ -0,0 +1,84 @@
+import json
+import re
+from typing import List, Dict, Any
+
+
+QUESTIONS_ARRAY_START = re.compile(r'"questions"\s*:\s*\[')
+
+
+class IncrementalQuestionParser:
+    """
+    Incrementally parses the `questions` array of a streamed quiz JSON response.
+
+    feed() takes the next chunk of model output and returns every question
+    object that has been completed since the previous call, so questions can
+    be delivered before the rest of the response has arrived. Anything before
+    the array (markdown fences, the opening brace) is ignored.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._object_start = None
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if self._done:
+            return []
+
+        self._buffer += chunk
+        completed = []
+
+        if not self._in_array:
+            match = QUESTIONS_ARRAY_START.search(self._buffer)
+            if not match:
+                return completed
+            self._in_array = True
+            self._buffer = self._buffer[match.end():]
+            self._pos = 0
+
+        buffer = self._buffer
+        while self._pos < len(buffer):
+            char = buffer[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._object_start = self._pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0 and self._object_start is not None:
+                    try:
+                        completed.append(json.loads(buffer[self._object_start:self._pos + 1]))
+                    except json.JSONDecodeError:
+                        pass  # Malformed question; skip it rather than fail the stream
+                    self._object_start = None
+            elif char == ']' and self._depth == 0:
+                self._done = True
+                break
+
+            self._pos += 1
+
+        # Drop text belonging to questions that have already been emitted
+        if self._object_start is None:
+            self._buffer = buffer[self._pos:]
+            self._pos = 0
+        elif self._object_start > 0:
+            self._buffer = buffer[self._object_start:]
+            self._pos -= self._object_start
+            self._object_start = 0
+
+        return completed
@@ -0,0 +1,350 @@
+"""
+Client-side rate limiting for LLM providers.
+
+Every OpenAI/Perplexity call reserves capacity from its provider's
+token buckets (requests per minute and tokens per minute) before it is
+sent, so bursts queue here instead of turning into provider 429s. Waiting
+callers are served round-robin by client ID, so one client's burst cannot
+starve the others. When the expected wait exceeds a bound, calls are
+rejected up front with RateLimitedError (HTTP 429) rather than queued.
+"""
+import asyncio
+import contextvars
+import email.utils
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Callable, Deque, Dict, Optional
+
+
+_client_id: contextvars.ContextVar[str] = contextvars.ContextVar("rate_limit_client_id", default="anonymous")
+
+
+def set_client_id(client_id: str) -> contextvars.Token:
+    """Bind the client that subsequent LLM calls in this context are made for"""
+    return _client_id.set(client_id)
+
+
+def reset_client_id(token: contextvars.Token):
+    _client_id.reset(token)
+
+
+def current_client_id() -> str:
+    return _client_id.get()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP-date, relative to now)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - (time.time() if now is None else now))
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimitedError(Exception):
+    """Raised when a call is shed because the provider's queue is too long"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class QuotaExceededError(Exception):
+    """Raised when a provider reports the account's quota or credits are exhausted"""
+
+
+class TokenBucket:
+    """Continuously refilling bucket; the level may go negative to absorb under-estimates"""
+
+    def __init__(self, per_minute: float, clock: Callable[[], float] = time.monotonic):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = clock()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float, cap: bool = True) -> float:
+        """
+        Seconds until amount is available. With cap, amounts above capacity
+        only need a full bucket (a single oversized call must still proceed);
+        without it, the result estimates how long a backlog of amount takes.
+        """
+        self._refill(now)
+        needed = (min(amount, self.capacity) if cap else amount) - self.level
+        return max(0.0, needed / self.rate)
+
+    def take(self, amount: float, now: float):
+        self._refill(now)
+        self.level -= amount
+
+    def drain(self, now: float):
+        self._refill(now)
+        self.level = min(self.level, 0.0)
+
+
+class _Timings:
+    """Recent latency samples for stats"""
+
+    def __init__(self, size: int = 500):
+        self.samples: Deque[float] = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self) -> Dict:
+        ordered = sorted(self.samples)
+
+        def pct(fraction: float):
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] * 1000) if ordered else None
+
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count * 1000) if self.count else None,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+            "max_ms": round(ordered[-1] * 1000) if ordered else None,
+        }
+
+
+class _Waiter:
+    def __init__(self, tokens: int, future: asyncio.Future):
+        self.tokens = tokens
+        self.future = future
+
+
+class Permit:
+    """A granted reservation; report actual usage or provider throttling through it"""
+
+    def __init__(self, limiter: "ProviderLimiter", tokens: int):
+        self.limiter = limiter
+        self.tokens = tokens
+
+    def record_usage(self, actual_tokens: Optional[int]):
+        """Correct the token bucket once the provider reports real usage"""
+        if actual_tokens is not None:
+            self.limiter.tokens_bucket_adjust(actual_tokens - self.tokens)
+
+    def throttled(self, retry_after: Optional[float]):
+        """The provider answered 429: pause the whole provider for retry_after"""
+        self.limiter.penalize(retry_after)
+
+
+class ProviderLimiter:
+    """Request and token buckets, a fair wait queue and metrics for one provider"""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float,
+        tokens_per_minute: Optional[float] = None,
+        max_queue_wait: float = 30,
+        max_queued: int = 200,
+        default_retry_after: float = 10,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.clock = clock
+        self.requests = TokenBucket(requests_per_minute, clock)
+        self.tokens = TokenBucket(tokens_per_minute, clock) if tokens_per_minute else None
+        self.max_queue_wait = max_queue_wait
+        self.max_queued = max_queued
+        self.default_retry_after = default_retry_after
+        self.blocked_until = 0.0
+
+        # client_id -> waiters, in round-robin order
+        self._queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self._queued = 0
+        self._queued_tokens = 0
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+        self.queue_wait = _Timings()
+        self.provider_latency = _Timings()
+        self.shed = 0
+        self.upstream_throttled = 0
+
+    def _estimated_wait(self, tokens: int, now: float) -> float:
+        """Rough time until a new reservation would be granted, given the queue ahead of it"""
+        wait = max(0.0, self.blocked_until - now)
+        wait = max(wait, self.requests.wait_time(self._queued + 1, now, cap=False))
+        if self.tokens:
+            wait = max(wait, self.tokens.wait_time(self._queued_tokens + tokens, now, cap=False))
+        return wait
+
+    @asynccontextmanager
+    async def reserve(self, tokens: int = 0, client_id: Optional[str] = None):
+        """
+        Wait for capacity for one call of about `tokens` tokens, then time the
+        call itself. Raises RateLimitedError instead of waiting when the queue
+        is full or the expected wait exceeds max_queue_wait.
+        """
+        client_id = client_id or current_client_id()
+        now = self.clock()
+        expected_wait = self._estimated_wait(tokens, now)
+        if self._queued >= self.max_queued or expected_wait > self.max_queue_wait:
+            self.shed += 1
+            retry_after = max(1.0, expected_wait)
+            raise RateLimitedError(
+                f"{self.name} is at capacity; try again in {retry_after:.0f}s", retry_after
+            )
+
+        waiter = _Waiter(tokens, asyncio.get_running_loop().create_future())
+        self._queues.setdefault(client_id, deque()).append(waiter)
+        self._queued += 1
+        self._queued_tokens += tokens
+        self._ensure_dispatcher()
+
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            self._forget(client_id, waiter)
+            raise
+
+        granted = self.clock()
+        self.queue_wait.add(granted - now)
+        try:
+            yield Permit(self, tokens)
+        finally:
+            self.provider_latency.add(self.clock() - granted)
+
+    def _forget(self, client_id: str, waiter: _Waiter):
+        queue = self._queues.get(client_id)
+        if queue and waiter in queue:
+            queue.remove(waiter)
+            self._queued -= 1
+            self._queued_tokens -= waiter.tokens
+            if not queue:
+                del self._queues[client_id]
+            self._wakeup.set()
+
+    def _ensure_dispatcher(self):
+        self._wakeup.set()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def _dispatch(self):
+        """Grant waiters round-robin across clients as the buckets allow"""
+        while self._queues:
+            client_id, queue = next(iter(self._queues.items()))
+            waiter = queue[0]
+
+            now = self.clock()
+            wait = max(0.0, self.blocked_until - now)
+            wait = max(wait, self.requests.wait_time(1, now))
+            if self.tokens:
+                wait = max(wait, self.tokens.wait_time(waiter.tokens, now))
+
+            if wait > 0:
+                self._wakeup.clear()
+                try:
+                    # Also wake on new arrivals or cancellations
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            queue.popleft()
+            self._queued -= 1
+            self._queued_tokens -= waiter.tokens
+            # Rotate: this client goes to the back of the line
+            del self._queues[client_id]
+            if queue:
+                self._queues[client_id] = queue
+
+            if waiter.future.done():
+                continue
+            self.requests.take(1, now)
+            if self.tokens:
+                self.tokens.take(waiter.tokens, now)
+            waiter.future.set_result(None)
+
+    def tokens_bucket_adjust(self, delta: int):
+        if self.tokens and delta:
+            self.tokens.take(delta, self.clock())
+
+    def penalize(self, retry_after: Optional[float]):
+        """Stop granting until the provider's Retry-After has passed"""
+        self.upstream_throttled += 1
+        now = self.clock()
+        self.blocked_until = max(self.blocked_until, now + (retry_after or self.default_retry_after))
+        self.requests.drain(now)
+        print(f"⚠️ {self.name} rate limited upstream, pausing for {self.blocked_until - now:.0f}s")
+
+    def stats(self) -> Dict:
+        now = self.clock()
+        return {
+            "requests_per_minute": self.requests.capacity,
+            "tokens_per_minute": self.tokens.capacity if self.tokens else None,
+            "queued": self._queued,
+            "queued_clients": len(self._queues),
+            "blocked_for_seconds": round(max(0.0, self.blocked_until - now), 1),
+            "shed": self.shed,
+            "upstream_throttled": self.upstream_throttled,
+            "queue_wait": self.queue_wait.summary(),
+            "provider_latency": self.provider_latency.summary(),
+        }
+
+
+class RateLimiterRegistry:
+    """Per-provider limiters: "openai" (chat), "whisper" and "perplexity" """
+
+    def __init__(self, limiters: Dict[str, ProviderLimiter]):
+        self.limiters = limiters
+
+    @classmethod
+    def from_env(cls) -> "RateLimiterRegistry":
+        """Build limiters from *_RPM / *_TPM and RATE_LIMIT_* environment variables"""
+        max_queue_wait = float(os.getenv("RATE_LIMIT_MAX_QUEUE_WAIT_SECONDS", "30"))
+        max_queued = int(os.getenv("RATE_LIMIT_MAX_QUEUED", "200"))
+
+        def limiter(name: str, rpm: str, tpm: Optional[str]) -> ProviderLimiter:
+            tokens_per_minute = float(tpm) if tpm else 0
+            return ProviderLimiter(
+                name,
+                float(rpm),
+                tokens_per_minute or None,
+                max_queue_wait=max_queue_wait,
+                max_queued=max_queued
+            )
+
+        return cls({
+            "openai": limiter("openai", os.getenv("OPENAI_RPM", "500"), os.getenv("OPENAI_TPM", "30000")),
+            "whisper": limiter("whisper", os.getenv("WHISPER_RPM", "50"), None),
+            "perplexity": limiter("perplexity", os.getenv("PERPLEXITY_RPM", "50"), os.getenv("PERPLEXITY_TPM", "")),
+        })
+
+    def get(self, name: str) -> ProviderLimiter:
+        return self.limiters[name]
+
+    def stats(self) -> Dict[str, Dict]:
+        return {name: limiter.stats() for name, limiter in self.limiters.items()}
+
+
+_default_registry: Optional[RateLimiterRegistry] = None
+
+
+def get_rate_limiters() -> RateLimiterRegistry:
+    """Process-wide rate limiters shared by all services"""
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = RateLimiterRegistry.from_env()
+    return _default_registry
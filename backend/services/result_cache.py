@@ -0,0 +1,265 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from services.task_executor import TaskExecutor, get_task_executor
+
+
+# Query parameters that never change the content of a page/video
+TRACKING_QUERY_PARAMS = {
+    "utm_source", "utm_medium", "utm_campaign", "utm_term", "utm_content",
+    "fbclid", "gclid", "si", "feature", "ref",
+}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that trivially different spellings of the same
+    source map to the same cache key
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or "http").lower()
+    netloc = parts.netloc.lower()
+
+    # Drop default ports
+    if (scheme == "http" and netloc.endswith(":80")) or (scheme == "https" and netloc.endswith(":443")):
+        netloc = netloc.rsplit(":", 1)[0]
+
+    path = parts.path or "/"
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/")
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_QUERY_PARAMS
+    )
+
+    # Fragments are client-side only
+    return urlunsplit((scheme, netloc, path, urlencode(query), ""))
+
+
+def youtube_source_key(video_id: str) -> str:
+    """Cache key for a YouTube video (any URL spelling of the same ID)"""
+    return f"youtube:{video_id}"
+
+
+def video_url_source_key(url: str) -> str:
+    """Cache key for a non-YouTube video URL"""
+    return f"video_url:{normalize_url(url)}"
+
+
+def web_url_source_key(url: str) -> str:
+    """Cache key for a web page URL"""
+    return f"web_url:{normalize_url(url)}"
+
+
+def file_source_key(sha256: str, file_extension: str) -> str:
+    """
+    Cache key for an uploaded file, based on the SHA-256 of its bytes.
+    The extension is part of the key because it decides how the bytes are parsed.
+    """
+    return f"file:{file_extension.lower()}:{sha256}"
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry expiry"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: float):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    """On-disk cache backend so results survive restarts and are shared between workers"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, expires_at = row
+            if expires_at <= time.time():
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            return value
+
+    def set(self, key: str, value: str, ttl_seconds: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, time.time() + ttl_seconds)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class ResultCache:
+    """
+    Content-addressed cache for the quiz pipeline.
+
+    Entries are namespaced by pipeline stage ("extraction", "verification",
+    "quiz") so each stage can be short-circuited independently. Values must
+    be JSON-serializable. When a SQLite backend is configured, the in-memory
+    LRU sits in front of it as a first-level cache, and disk reads and writes
+    run in the executor's I/O pool so they never block the event loop.
+    """
+
+    STAGES = ("extraction", "verification", "quiz")
+
+    def __init__(
+        self,
+        memory: Optional[MemoryCacheBackend] = None,
+        disk: Optional[SQLiteCacheBackend] = None,
+        ttl_seconds: float = 3600,
+        enabled: bool = True,
+        executor: Optional[TaskExecutor] = None
+    ):
+        self.memory = memory or MemoryCacheBackend()
+        self.disk = disk
+        self.executor = executor or get_task_executor()
+        self.ttl_seconds = ttl_seconds
+        self.enabled = enabled
+        self._counters: Dict[str, Dict[str, int]] = {
+            stage: {"hits": 0, "misses": 0} for stage in self.STAGES
+        }
+        self._counter_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, executor: Optional[TaskExecutor] = None) -> "ResultCache":
+        """Build the cache from QUIZ_CACHE_* environment variables"""
+        backend = os.getenv("QUIZ_CACHE_BACKEND", "memory").lower()
+        ttl_seconds = float(os.getenv("QUIZ_CACHE_TTL_SECONDS", "3600"))
+        max_entries = int(os.getenv("QUIZ_CACHE_MAX_ENTRIES", "1024"))
+
+        if backend == "none":
+            return cls(ttl_seconds=ttl_seconds, enabled=False, executor=executor)
+
+        disk = None
+        if backend == "sqlite":
+            disk = SQLiteCacheBackend(os.getenv("QUIZ_CACHE_SQLITE_PATH", "cache/quiz_cache.sqlite3"))
+
+        return cls(
+            memory=MemoryCacheBackend(max_entries=max_entries),
+            disk=disk,
+            ttl_seconds=ttl_seconds,
+            executor=executor
+        )
+
+    def _record(self, stage: str, hit: bool):
+        with self._counter_lock:
+            self._counters.setdefault(stage, {"hits": 0, "misses": 0})
+            self._counters[stage]["hits" if hit else "misses"] += 1
+
+    async def get(self, stage: str, source_key: str) -> Optional[Any]:
+        """Return the cached value for a stage/source, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        key = f"{stage}:{source_key}"
+        raw = self.memory.get(key)
+
+        if raw is None and self.disk is not None:
+            raw = await self.executor.run_io(self.disk.get, key)
+            if raw is not None:
+                # Promote into the in-memory tier
+                self.memory.set(key, raw, self.ttl_seconds)
+
+        self._record(stage, raw is not None)
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, stage: str, source_key: str, value: Any):
+        """Store a JSON-serializable value for a stage/source"""
+        if not self.enabled:
+            return
+
+        key = f"{stage}:{source_key}"
+        raw = json.dumps(value, default=str)
+        self.memory.set(key, raw, self.ttl_seconds)
+        if self.disk is not None:
+            await self.executor.run_io(self.disk.set, key, raw, self.ttl_seconds)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters per stage plus backend sizes"""
+        with self._counter_lock:
+            stages = {stage: dict(counts) for stage, counts in self._counters.items()}
+
+        for counts in stages.values():
+            total = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / total, 4) if total else 0.0
+
+        return {
+            "enabled": self.enabled,
+            "backend": "sqlite" if self.disk is not None else "memory",
+            "ttl_seconds": self.ttl_seconds,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk) if self.disk is not None else None,
+            "stages": stages,
+        }
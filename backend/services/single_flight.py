@@ -0,0 +1,90 @@
+"""
+In-flight request coalescing ("single flight").
+
+When several requests need the same expensive work at the same time (a
+shared link: thirty students asking for the same video within seconds), the
+first caller for a key becomes the leader and runs the work; everyone else
+arriving before it finishes awaits the leader's result instead of repeating
+the download, transcription or LLM calls. The result, or the exception,
+is delivered to every waiter.
+
+The work runs in its own task, so one waiter going away (a client
+disconnect) does not cancel it for the others; it is cancelled only when
+every waiter has gone. Once it finishes the key is released, and later
+callers are served by the result cache instead.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces concurrent calls by key; keys are (stage, source key) tuples"""
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+
+    async def do(
+        self,
+        key: Tuple[str, str],
+        work: Callable[[], Awaitable[Any]],
+        on_done: Optional[Callable[[], None]] = None
+    ) -> Any:
+        """
+        Run work() for key, or join the run already in progress.
+        Raises whatever the run raised.
+
+        on_done is called once the caller's own resources are no longer
+        needed: when the run finishes (however it ends, even cancelled before
+        starting) if this caller started it, or straight away if it joined.
+        """
+        stage = key[0]
+        counters = self._counters.setdefault(stage, {"leaders": 0, "followers": 0})
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight(asyncio.ensure_future(work()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task: self._release(key, flight))
+            if on_done:
+                flight.task.add_done_callback(lambda _task: on_done())
+            counters["leaders"] += 1
+        else:
+            counters["followers"] += 1
+            if on_done:
+                on_done()
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            # Last waiter gone: nobody needs the result any more
+            if flight.waiters == 1 and not flight.task.done():
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def in_flight(self, key: Tuple[str, str]) -> bool:
+        return key in self._flights
+
+    def _release(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        # Retrieve the outcome so an error nobody awaited isn't logged as unhandled
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        in_flight: Dict[str, int] = {}
+        for stage, _ in self._flights:
+            in_flight[stage] = in_flight.get(stage, 0) + 1
+        return {
+            stage: {**counters, "in_flight": in_flight.get(stage, 0)}
+            for stage, counters in self._counters.items()
+        }
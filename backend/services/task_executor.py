@@ -0,0 +1,226 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Optional, Callable, Any, Awaitable, Dict, List
+
+
+class TaskExecutorError(Exception):
+    """Base class for errors raised by the task executor itself"""
+
+
+class ExecutorSaturatedError(TaskExecutorError):
+    """Raised when a pool's queue is full and the task is refused"""
+
+
+class TaskTimeoutError(TaskExecutorError):
+    """Raised when a task does not finish within its timeout"""
+
+
+class WorkerPoolRestartedError(TaskExecutorError):
+    """Raised when a task's worker pool broke (a worker died or was killed) before it finished"""
+
+
+def _kill_workers(executor: ProcessPoolExecutor):
+    """Stop a process pool now, killing tasks that are still running; their futures fail as broken"""
+    processes = list((getattr(executor, "_processes", None) or {}).values())
+    executor.shutdown(wait=False)
+    for process in processes:
+        process.kill()
+
+
+class _BoundedPool:
+    """
+    Wraps a concurrent.futures executor with a queue-depth limit.
+
+    A task counts against the limit until the underlying worker actually
+    finishes it, not just until the caller stops waiting, so timed-out work
+    that is still running keeps occupying its slot. A process pool can do
+    better: when a running task times out, or a worker dies and breaks the
+    pool, the pool is replaced with a fresh one and the old workers killed.
+    Other tasks still on the old pool fail with WorkerPoolRestartedError.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any], workers: int, max_queued: int, default_timeout: float):
+        self.name = name
+        self.workers = workers
+        self.max_queued = max_queued
+        self.default_timeout = default_timeout
+        self._factory = factory
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.restarts = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._factory()
+            return self._executor
+
+    def _recycle(self, executor):
+        """Replace a broken or stuck process pool (once, however many callers notice)"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+            self.restarts += 1
+        print(f"♻️ Restarting the {self.name} worker pool")
+        _kill_workers(executor)
+
+    def _submit(self, func: Callable, *args, **kwargs):
+        executor = self._get_executor()
+        try:
+            return executor, executor.submit(functools.partial(func, *args, **kwargs))
+        except BrokenExecutor:
+            # A worker died since the last task; start over with a fresh pool
+            self._recycle(executor)
+            executor = self._get_executor()
+            return executor, executor.submit(functools.partial(func, *args, **kwargs))
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        with self._lock:
+            if self._pending >= self.workers + self.max_queued:
+                self.rejected += 1
+                raise ExecutorSaturatedError(
+                    f"The {self.name} worker pool is busy ({self._pending} tasks pending). Please try again shortly."
+                )
+            self._pending += 1
+
+        try:
+            executor, future = self._submit(func, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        future.add_done_callback(self._release)
+
+        timeout = self.default_timeout if timeout is None else timeout
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.timed_out += 1
+            # cancel() only stops a task that hasn't started; a running one
+            # can only be stopped by killing its process
+            if not future.cancel() and isinstance(executor, ProcessPoolExecutor):
+                self._recycle(executor)
+            raise TaskTimeoutError(f"{getattr(func, '__name__', 'task')} timed out after {timeout:.0f}s")
+        except BrokenExecutor:
+            self._recycle(executor)
+            raise WorkerPoolRestartedError(
+                f"The {self.name} worker pool was restarted while running "
+                f"{getattr(func, '__name__', 'task')}. Please try again."
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "max_queued": self.max_queued,
+            "pending": self._pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "restarts": self.restarts,
+        }
+
+
+class TaskExecutor:
+    """
+    Runs blocking work off the event loop.
+
+    - run_io: thread pool for blocking I/O library calls (yt-dlp, transcript API, file I/O)
+    - run_cpu: process pool for CPU-bound parsing (PDF, DOCX, HTML, subtitle cleaning).
+      Functions passed to run_cpu must be picklable (module-level).
+    """
+
+    def __init__(
+        self,
+        io_workers: int = 16,
+        cpu_workers: int = 2,
+        max_queued_io: int = 64,
+        max_queued_cpu: int = 16,
+        io_timeout: float = 120.0,
+        cpu_timeout: float = 60.0
+    ):
+        self.io_pool = _BoundedPool(
+            "I/O",
+            lambda: ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="quiz-io"),
+            io_workers, max_queued_io, io_timeout
+        )
+        self.cpu_pool = _BoundedPool(
+            "CPU",
+            # spawn avoids forking a process that already runs event loop and pool threads
+            lambda: ProcessPoolExecutor(max_workers=cpu_workers, mp_context=multiprocessing.get_context("spawn")),
+            cpu_workers, max_queued_cpu, cpu_timeout
+        )
+
+    @classmethod
+    def from_env(cls) -> "TaskExecutor":
+        """Build the executor from TASK_* environment variables"""
+        return cls(
+            io_workers=int(os.getenv("TASK_IO_WORKERS", "16")),
+            cpu_workers=int(os.getenv("TASK_CPU_WORKERS", str(max(1, min(4, os.cpu_count() or 1))))),
+            max_queued_io=int(os.getenv("TASK_IO_MAX_QUEUED", "64")),
+            max_queued_cpu=int(os.getenv("TASK_CPU_MAX_QUEUED", "16")),
+            io_timeout=float(os.getenv("TASK_IO_TIMEOUT_SECONDS", "120")),
+            cpu_timeout=float(os.getenv("TASK_CPU_TIMEOUT_SECONDS", "60")),
+        )
+
+    async def run_io(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a blocking I/O-bound call in the thread pool"""
+        return await self.io_pool.run(func, *args, timeout=timeout, **kwargs)
+
+    async def run_cpu(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """Run a CPU-bound, picklable function in the process pool"""
+        return await self.cpu_pool.run(func, *args, timeout=timeout, **kwargs)
+
+    def shutdown(self):
+        self.io_pool.shutdown()
+        self.cpu_pool.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"io": self.io_pool.stats(), "cpu": self.cpu_pool.stats()}
+
+
+async def gather_or_cancel(*aws: Awaitable) -> List[Any]:
+    """
+    asyncio.gather, except that the first error (or the caller being
+    cancelled) cancels the remaining awaitables and waits for them to stop
+    before it is raised, so none keep running against resources the caller
+    cleans up next.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+_default_executor: Optional[TaskExecutor] = None
+
+
+def get_task_executor() -> TaskExecutor:
+    """Process-wide executor shared by all services"""
+    global _default_executor
+    if _default_executor is None:
+        _default_executor = TaskExecutor.from_env()
+    return _default_executor
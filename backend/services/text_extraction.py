@@ -0,0 +1,189 @@
+"""
+CPU-bound text extraction routines.
+
+These are module-level functions so they can run in the task executor's
+process pool; keep this module free of heavy imports that workers don't need.
+"""
+import mmap
+import re
+from typing import Iterator, Optional
+
+
+def iter_pdf_pages(path: str, start: int = 0, stop: Optional[int] = None) -> Iterator[str]:
+    """
+    Yield the text of pages [start, stop) one at a time. The file is
+    memory-mapped rather than read into a buffer, so large PDFs are paged in
+    by the OS on demand, and pages are only parsed as they are consumed.
+    """
+    import PyPDF2
+
+    with open(path, 'rb') as pdf_file, mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        pdf_reader = PyPDF2.PdfReader(mapped)
+        total = len(pdf_reader.pages)
+        for index in range(start, min(stop, total) if stop is not None else total):
+            yield pdf_reader.pages[index].extract_text() or ""
+
+
+def pdf_page_count(path: str) -> int:
+    """Number of pages in a PDF"""
+    import PyPDF2
+
+    try:
+        with open(path, 'rb') as pdf_file, mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return len(PyPDF2.PdfReader(mapped).pages)
+    except Exception as e:
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+
+def extract_pdf_text(
+    path: str,
+    max_chars: Optional[int] = None,
+    start: int = 0,
+    stop: Optional[int] = None
+) -> str:
+    """
+    Extract text from PDF file (pages [start, stop), all by default),
+    stopping early once at least max_chars characters have been gathered
+    """
+    try:
+        pages = []
+        gathered = 0
+        for page_text in iter_pdf_pages(path, start, stop):
+            pages.append(page_text)
+            gathered += len(page_text) + 1
+            if max_chars and gathered >= max_chars:
+                break
+
+        return "\n".join(pages).strip()
+    except Exception as e:
+        raise ValueError(f"Failed to extract text from PDF: {str(e)}")
+
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_HEADING_STYLE = re.compile(r"^(?:heading\s*(\d)|title)$", re.IGNORECASE)
+
+
+def _docx_paragraph(paragraph) -> str:
+    """Text of a w:p element (runs, tabs and line breaks), with its structural marker"""
+    parts = []
+    for element in paragraph.iter():
+        if element.tag == _W + "t":
+            parts.append(element.text or "")
+        elif element.tag == _W + "tab":
+            parts.append("\t")
+        elif element.tag in (_W + "br", _W + "cr"):
+            parts.append("\n")
+    text = "".join(parts).strip()
+    if not text:
+        return ""
+
+    properties = paragraph.find(_W + "pPr")
+    if properties is not None:
+        style = properties.find(_W + "pStyle")
+        match = _HEADING_STYLE.match(style.get(_W + "val", "")) if style is not None else None
+        if match:
+            return "#" * min(int(match.group(1) or 1), 6) + " " + " ".join(text.split())
+        if properties.find(_W + "numPr") is not None:
+            return "- " + text
+    return text
+
+
+def iter_docx_blocks(path: str) -> Iterator[str]:
+    """
+    Yield the body of a DOCX file block by block, in document order:
+    paragraphs as plain text, headings as "# Heading" (one # per level),
+    list items as "- item" and tables as one "| cell | cell |" line per row.
+
+    word/document.xml is parsed incrementally straight from the zip, and each
+    top-level block is discarded once emitted, so memory stays bounded by the
+    largest single paragraph or table rather than the document.
+    """
+    import zipfile
+    from xml.etree.ElementTree import iterparse
+
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as document:
+        body = None
+        # Each open table is a list of rows; each row a list of cells; each cell a list of paragraphs
+        tables = []
+        for event, element in iterparse(document, events=("start", "end")):
+            tag = element.tag
+            if event == "start":
+                if tag == _W + "body":
+                    body = element
+                elif tag == _W + "tbl":
+                    tables.append([])
+                elif tag == _W + "tr" and tables:
+                    tables[-1].append([])
+                elif tag == _W + "tc" and tables and tables[-1]:
+                    tables[-1][-1].append([])
+                continue
+
+            if tag == _W + "p":
+                text = _docx_paragraph(element)
+                # Clear so an enclosing paragraph (text boxes) doesn't repeat it
+                element.clear()
+                if text and not tables:
+                    yield text
+                elif text and tables[-1] and tables[-1][-1]:
+                    tables[-1][-1][-1].append(" ".join(text.split()))
+            elif tag == _W + "tbl":
+                rows = tables.pop()
+                lines = [
+                    "| " + " | ".join(" ".join(cell) for cell in row) + " |"
+                    for row in rows
+                    if any(row)
+                ]
+                if lines and not tables:
+                    yield "\n".join(lines)
+                elif lines and tables[-1] and tables[-1][-1]:
+                    # Nested table: flattened into the enclosing cell
+                    tables[-1][-1][-1].append(" ".join(lines))
+
+            if body is not None and tag in (_W + "p", _W + "tbl", _W + "sdt") and not tables:
+                # Drop finished top-level blocks from the tree
+                body.clear()
+
+
+def extract_docx_text(path: str) -> str:
+    """
+    Extract text from DOCX file, blocks separated by blank lines
+    """
+    try:
+        return "\n\n".join(iter_docx_blocks(path)).strip()
+    except Exception as e:
+        raise ValueError(f"Failed to extract text from DOCX: {str(e)}")
+
+
+def read_text_file(path: str) -> str:
+    """
+    Read a plain text upload
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def clean_subtitle_text(subtitle_content: str) -> str:
+    """Clean VTT/SRT subtitle formatting to get plain text"""
+    # Remove WEBVTT header
+    text = re.sub(r'^WEBVTT.*?\n\n', '', subtitle_content, flags=re.DOTALL)
+
+    # Remove timestamp lines (e.g., "00:00:01.000 --> 00:00:05.000")
+    text = re.sub(r'\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}', '', text)
+
+    # Remove cue identifiers (numbers)
+    text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
+
+    # Remove positioning tags
+    text = re.sub(r'<[^>]+>', '', text)
+
+    # Remove duplicate spaces and newlines
+    text = re.sub(r'\n\s*\n', '\n', text)
+    text = re.sub(r' +', ' ', text)
+
+    return text.strip()
+
+
+def read_and_clean_subtitle_file(path: str) -> str:
+    """Read a VTT/SRT file from disk and return its plain text"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return clean_subtitle_text(f.read())
@@ -0,0 +1,272 @@
+import asyncio
+import difflib
+import os
+import re
+import shutil
+import tempfile
+from typing import List, Optional
+
+from openai import AsyncOpenAI, RateLimitError
+
+from services.task_executor import TaskExecutor, gather_or_cancel
+from services.rate_limiter import ProviderLimiter, get_rate_limiters, parse_retry_after
+from services.audio_extraction import (
+    cut_segment,
+    detect_silences,
+    extract_speech_audio,
+    plan_chunks,
+    probe_duration,
+)
+
+
+# Formats the Whisper API accepts as-is
+WHISPER_FORMATS = {"mp3", "mp4", "mpeg", "mpga", "m4a", "wav", "webm", "ogg"}
+WHISPER_MAX_UPLOAD_BYTES = 25 * 1024 * 1024
+
+AUDIO_ENGINES = ("ffmpeg", "pydub")
+
+
+def _can_send_unchanged(audio_path: str, duration_seconds: float, chunk_seconds: float) -> bool:
+    extension = audio_path.rsplit('.', 1)[-1].lower()
+    return (
+        duration_seconds <= chunk_seconds
+        and extension in WHISPER_FORMATS
+        and os.path.getsize(audio_path) <= WHISPER_MAX_UPLOAD_BYTES
+    )
+
+
+def split_audio(
+    audio_path: str,
+    output_dir: str,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    silence_search_seconds: float,
+    min_silence_ms: int
+) -> List[str]:
+    """
+    Split an audio/video file into overlapping mp3 chunks, cutting at the
+    last silence before each chunk boundary when there is one.
+
+    Returns the original path (as a single chunk) if it can be sent to
+    Whisper unchanged. Runs in the I/O pool: pydub shells out to ffmpeg.
+
+    This decodes the whole track into PCM in Python memory; it is kept as the
+    "pydub" engine for comparison and for hosts without ffprobe.
+    """
+    from pydub import AudioSegment
+    from pydub.silence import detect_silence
+
+    # Decode straight to 16 kHz mono, which is all Whisper uses
+    audio = AudioSegment.from_file(audio_path, parameters=["-ac", "1", "-ar", "16000"])
+    chunk_ms = int(chunk_seconds * 1000)
+    overlap_ms = int(overlap_seconds * 1000)
+    search_ms = int(silence_search_seconds * 1000)
+
+    if _can_send_unchanged(audio_path, len(audio) / 1000, chunk_seconds):
+        return [audio_path]
+
+    silence_thresh = audio.dBFS - 16
+    chunk_paths = []
+    start = 0
+    while start < len(audio):
+        cut = min(start + chunk_ms, len(audio))
+
+        if cut < len(audio):
+            window_start = max(start + overlap_ms, cut - search_ms)
+            silences = detect_silence(
+                audio[window_start:cut],
+                min_silence_len=min_silence_ms,
+                silence_thresh=silence_thresh
+            )
+            if silences:
+                silence_start, silence_end = silences[-1]
+                cut = window_start + (silence_start + silence_end) // 2
+
+        chunk = audio[max(0, start - overlap_ms):cut]
+        chunk_path = os.path.join(output_dir, f"chunk_{len(chunk_paths):04d}.mp3")
+        chunk.export(chunk_path, format="mp3", bitrate="64k")
+        chunk_paths.append(chunk_path)
+        start = cut
+
+    return chunk_paths
+
+
+_WORD_NORMALIZER = re.compile(r"[^\w']+")
+
+
+def _normalize_word(word: str) -> str:
+    return _WORD_NORMALIZER.sub("", word.lower())
+
+
+def stitch_transcripts(transcripts: List[str], max_overlap_words: int = 60) -> str:
+    """
+    Join chunk transcripts, removing text duplicated by the chunk overlap.
+
+    The tail of the text so far and the head of the next chunk are aligned on
+    their longest run of matching words; everything up to the end of that run
+    is taken from the earlier chunk and the rest from the later one.
+    """
+    words: List[str] = []
+    for transcript in transcripts:
+        next_words = transcript.split()
+        if not next_words:
+            continue
+        if not words:
+            words = next_words
+            continue
+
+        tail_offset = max(0, len(words) - max_overlap_words)
+        tail = [_normalize_word(w) for w in words[tail_offset:]]
+        head = [_normalize_word(w) for w in next_words[:max_overlap_words]]
+
+        match = difflib.SequenceMatcher(None, tail, head, autojunk=False).find_longest_match(
+            0, len(tail), 0, len(head)
+        )
+        # Short matches only count when they sit exactly on the seam
+        on_seam = match.a + match.size == len(tail) and match.b == 0
+        if match.size >= 3 or (match.size >= 2 and on_seam):
+            words = words[:tail_offset + match.a + match.size] + next_words[match.b + match.size:]
+        else:
+            words = words + next_words
+
+    return " ".join(words)
+
+
+class ChunkedTranscriber:
+    """
+    Transcribes long audio by splitting it into overlapping, silence-aligned
+    chunks and sending them to Whisper concurrently, so total time tracks the
+    slowest chunk rather than the whole recording, and no single upload
+    exceeds the API size limit.
+    """
+
+    def __init__(
+        self,
+        openai_client: AsyncOpenAI,
+        executor: TaskExecutor,
+        chunk_seconds: float = 600,
+        overlap_seconds: float = 5,
+        max_concurrency: int = 10,
+        silence_search_seconds: float = 30,
+        min_silence_ms: int = 400,
+        split_timeout: float = 600,
+        engine: str = "ffmpeg",
+        trim_silence: bool = False,
+        rate_limiter: Optional[ProviderLimiter] = None
+    ):
+        if engine not in AUDIO_ENGINES:
+            raise ValueError(f"Unknown audio extraction engine: {engine}")
+
+        self.openai_client = openai_client
+        self.executor = executor
+        self.chunk_seconds = chunk_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_concurrency = max_concurrency
+        self.silence_search_seconds = silence_search_seconds
+        self.min_silence_ms = min_silence_ms
+        self.split_timeout = split_timeout
+        self.engine = engine
+        self.trim_silence = trim_silence
+        self.rate_limiter = rate_limiter or get_rate_limiters().get("whisper")
+
+    @classmethod
+    def from_env(cls, openai_client: AsyncOpenAI, executor: TaskExecutor) -> "ChunkedTranscriber":
+        """Build a transcriber from WHISPER_* and AUDIO_* environment variables"""
+        return cls(
+            openai_client,
+            executor,
+            chunk_seconds=float(os.getenv("WHISPER_CHUNK_SECONDS", "600")),
+            overlap_seconds=float(os.getenv("WHISPER_CHUNK_OVERLAP_SECONDS", "5")),
+            max_concurrency=int(os.getenv("WHISPER_MAX_CONCURRENCY", "10")),
+            split_timeout=float(os.getenv("AUDIO_EXTRACTION_TIMEOUT_SECONDS", "600")),
+            engine=os.getenv("AUDIO_EXTRACTION_ENGINE", "ffmpeg").lower(),
+            trim_silence=os.getenv("AUDIO_TRIM_SILENCE", "false").lower() == "true"
+        )
+
+    async def transcribe(self, audio_path: str) -> str:
+        """
+        Transcribe an audio or video file of any length
+        """
+        work_dir = tempfile.mkdtemp(prefix="quiz_chunks_")
+        try:
+            if self.engine == "pydub":
+                chunk_paths = await self.executor.run_io(
+                    split_audio,
+                    audio_path,
+                    work_dir,
+                    self.chunk_seconds,
+                    self.overlap_seconds,
+                    self.silence_search_seconds,
+                    self.min_silence_ms,
+                    timeout=self.split_timeout
+                )
+            else:
+                chunk_paths = await self._split_with_ffmpeg(audio_path, work_dir)
+            if len(chunk_paths) > 1:
+                print(f"✂️ Split audio into {len(chunk_paths)} chunks for parallel transcription")
+
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async def transcribe_chunk(chunk_path: str) -> str:
+                async with semaphore:
+                    return await self._transcribe_file(chunk_path)
+
+            # Chunks still uploading must stop before their files are removed below
+            transcripts = await gather_or_cancel(*(transcribe_chunk(path) for path in chunk_paths))
+            return stitch_transcripts(list(transcripts))
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    async def _split_with_ffmpeg(self, audio_path: str, work_dir: str) -> List[str]:
+        """
+        Same chunking as split_audio, but ffmpeg does all decoding in a
+        subprocess: the track is extracted once to compact speech audio, then
+        chunks are cut out of that without re-encoding.
+        """
+        duration = await probe_duration(audio_path)
+        if not self.trim_silence and _can_send_unchanged(audio_path, duration, self.chunk_seconds):
+            return [audio_path]
+
+        speech_path = os.path.join(work_dir, "speech.mp3")
+        await extract_speech_audio(
+            audio_path, speech_path, trim_silence=self.trim_silence, timeout=self.split_timeout
+        )
+        if self.trim_silence:
+            duration = await probe_duration(speech_path)
+        if duration <= self.chunk_seconds:
+            return [speech_path]
+
+        silences = await detect_silences(
+            speech_path, min_silence_seconds=self.min_silence_ms / 1000, timeout=self.split_timeout
+        )
+        chunks = plan_chunks(
+            duration, silences, self.chunk_seconds, self.overlap_seconds, self.silence_search_seconds
+        )
+        return list(await gather_or_cancel(*(
+            cut_segment(
+                speech_path,
+                os.path.join(work_dir, f"chunk_{index:04d}.mp3"),
+                start,
+                end - start,
+                timeout=self.split_timeout
+            )
+            for index, (start, end) in enumerate(chunks)
+        )))
+
+    async def _transcribe_file(self, path: str) -> str:
+        async with self.rate_limiter.reserve() as permit:
+            with open(path, 'rb') as audio_file:
+                try:
+                    transcript = await self.openai_client.audio.transcriptions.create(
+                        model="whisper-1",
+                        file=audio_file,
+                        response_format="text"
+                    )
+                except RateLimitError as e:
+                    permit.throttled(parse_retry_after(e.response.headers.get("retry-after")))
+                    raise
+
+        if isinstance(transcript, str):
+            return transcript
+        # Handle case where transcript is an object with text attribute
+        return transcript.text if hasattr(transcript, 'text') else str(transcript)
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from typing import Optional
+
+from fastapi import UploadFile
+from pydantic import BaseModel
+
+from services.task_executor import TaskExecutor
+
+
+VIDEO_FILE_EXTENSIONS = ['mp4', 'avi', 'mov', 'mkv', 'webm']
+
+# The extension ends up in a path on disk, so it is kept to plain characters
+_EXTENSION = re.compile(r"[A-Za-z0-9]{1,10}")
+
+
+class UploadTooLargeError(ValueError):
+    """Raised while spooling when an upload exceeds its size cap"""
+
+
+class SpooledUpload(BaseModel):
+    """An upload written to disk, with its size and SHA-256 computed on the way"""
+    path: str
+    filename: str
+    size: int
+    sha256: str
+
+    @property
+    def extension(self) -> str:
+        return self.filename.split('.')[-1].lower()
+
+    def cleanup(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def link(self) -> "SpooledUpload":
+        """
+        The same upload under a second path (a hard link, or a copy where
+        links aren't supported), so it can outlive this one's cleanup()
+        """
+        root, extension = os.path.splitext(self.path)
+        path = f"{root}_{uuid.uuid4().hex[:8]}{extension}"
+        try:
+            os.link(self.path, path)
+        except OSError:
+            shutil.copyfile(self.path, path)
+        return SpooledUpload(**{**self.dict(), "path": path})
+
+
+def upload_filename(filename: Optional[str]) -> str:
+    """
+    The client's filename without any directory part. Raises ValueError
+    when it is missing or its extension isn't a short alphanumeric one.
+    """
+    name = os.path.basename((filename or "").replace("\\", "/")).strip()
+    if not name:
+        raise ValueError("The uploaded file has no filename")
+    if '.' not in name or not _EXTENSION.fullmatch(name.rsplit('.', 1)[-1]):
+        raise ValueError(f"Unsupported file name: {name}")
+    return name
+
+
+def max_upload_bytes(filename: str) -> int:
+    """Size cap for an upload, by file type (MAX_VIDEO_SIZE_MB / MAX_DOCUMENT_SIZE_MB)"""
+    if filename.split('.')[-1].lower() in VIDEO_FILE_EXTENSIONS:
+        return int(os.getenv("MAX_VIDEO_SIZE_MB", "500")) * 1024 * 1024
+    return int(os.getenv("MAX_DOCUMENT_SIZE_MB", "50")) * 1024 * 1024
+
+
+async def spool_upload(
+    file: UploadFile,
+    executor: TaskExecutor,
+    directory: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+    chunk_size: int = 1024 * 1024
+) -> SpooledUpload:
+    """
+    Stream an upload to a file on disk in fixed-size chunks, hashing as it goes
+    and aborting as soon as the size cap is exceeded, so the upload is never
+    held in memory as a whole. Raises ValueError for a missing or unsafe
+    filename and UploadTooLargeError past the size cap.
+    """
+    filename = upload_filename(file.filename)
+    if max_bytes is None:
+        max_bytes = max_upload_bytes(filename)
+
+    directory = directory or tempfile.gettempdir()
+    extension = filename.split('.')[-1]
+    path = os.path.join(directory, f"upload_{uuid.uuid4().hex}.{extension}")
+
+    digest = hashlib.sha256()
+    size = 0
+    out = open(path, "wb")
+    try:
+        while chunk := await file.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(
+                    f"File too large. Maximum allowed size for .{extension} files is {max_bytes // (1024 * 1024)} MB."
+                )
+            digest.update(chunk)
+            await executor.run_io(out.write, chunk)
+    except BaseException:
+        out.close()
+        os.remove(path)
+        raise
+    out.close()
+
+    return SpooledUpload(path=path, filename=filename, size=size, sha256=digest.hexdigest())
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, Any, Iterator, Tuple
+from urllib.parse import urlsplit
+
+from models.verification import EducationalAnalysis
+from services.result_cache import normalize_url
+
+
+# Hosts where anyone can publish: a verdict on one page or video says nothing
+# about the next, so they never build domain reputation (videos use channels)
+SHARED_HOSTS = {
+    "youtube.com", "youtu.be", "vimeo.com", "dailymotion.com", "twitch.tv",
+    "medium.com", "substack.com", "reddit.com", "quora.com", "github.com",
+    "docs.google.com", "drive.google.com", "sites.google.com",
+    "wordpress.com", "blogspot.com", "tumblr.com", "linkedin.com",
+}
+
+
+def content_fingerprint(content: str) -> str:
+    """SHA-256 of the content with whitespace normalized"""
+    return hashlib.sha256(" ".join(content.split()).encode("utf-8")).hexdigest()
+
+
+def reputation_domain(url: Optional[str]) -> Optional[str]:
+    """Host a web page's verdict counts towards, or None for shared hosts"""
+    if not url:
+        return None
+    try:
+        host = (urlsplit(url).hostname or "").lower()
+    except ValueError:
+        return None
+    if host.startswith("www."):
+        host = host[4:]
+    if not host or any(host == shared or host.endswith("." + shared) for shared in SHARED_HOSTS):
+        return None
+    return host
+
+
+class Reputation:
+    """Accumulated AI verdicts for one domain or channel"""
+
+    def __init__(self, approvals: int, rejections: int, average_confidence: Optional[float]):
+        self.approvals = approvals
+        self.rejections = rejections
+        self.average_confidence = average_confidence
+
+    @property
+    def total(self) -> int:
+        return self.approvals + self.rejections
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "approvals": self.approvals,
+            "rejections": self.rejections,
+            "average_confidence": self.average_confidence,
+        }
+
+
+class VerdictStore:
+    """
+    Local SQLite store of AI verification verdicts.
+
+    One row per distinct content fingerprint, tagged with the normalized URL,
+    domain and channel it came from. Exact content or URL repeats reuse the
+    stored analysis; per-domain and per-channel reputation is aggregated from
+    the rows younger than max_age_seconds, so stale evidence ages out.
+    """
+
+    def __init__(self, path: str, max_age_seconds: float = 30 * 86400):
+        self.path = path
+        self.max_age_seconds = max_age_seconds
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "content_hash TEXT PRIMARY KEY, url TEXT, domain TEXT, channel TEXT, "
+            "accepted INTEGER NOT NULL, confidence REAL NOT NULL, analysis TEXT NOT NULL, "
+            "created_at REAL NOT NULL, sample TEXT)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(verdicts)")}
+        if "sample" not in columns:
+            self._conn.execute("ALTER TABLE verdicts ADD COLUMN sample TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_url ON verdicts (url, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_domain ON verdicts (domain, created_at)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS verdicts_channel ON verdicts (channel, created_at)")
+        self._conn.commit()
+
+    @classmethod
+    def from_env(cls) -> Optional["VerdictStore"]:
+        """Build the store from VERDICT_STORE_* environment variables (None if disabled)"""
+        if os.getenv("VERDICT_STORE_ENABLED", "true").lower() != "true":
+            return None
+        return cls(
+            os.getenv("VERDICT_STORE_PATH", "cache/verdicts.sqlite3"),
+            max_age_seconds=float(os.getenv("VERDICT_MAX_AGE_DAYS", "30")) * 86400
+        )
+
+    def record(
+        self,
+        content_hash: str,
+        url: Optional[str],
+        channel: Optional[str],
+        analysis: EducationalAnalysis,
+        accepted: bool,
+        sample: Optional[str] = None
+    ):
+        """
+        Store an AI verdict (accepted = it passed the acceptance criteria).
+        sample is the text the AI judged, kept as training data for the local
+        classifier.
+        """
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO verdicts "
+                "(content_hash, url, domain, channel, accepted, confidence, analysis, created_at, sample) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    content_hash,
+                    normalize_url(url) if url else None,
+                    reputation_domain(url),
+                    channel.lower() if channel else None,
+                    int(accepted),
+                    analysis.confidence,
+                    analysis.json(),
+                    time.time(),
+                    sample
+                )
+            )
+            self._conn.commit()
+
+    def _cutoff(self) -> float:
+        return time.time() - self.max_age_seconds
+
+    def by_content(self, content_hash: str) -> Optional[EducationalAnalysis]:
+        """Stored analysis of exactly this content"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis FROM verdicts WHERE content_hash = ? AND created_at > ?",
+                (content_hash, self._cutoff())
+            ).fetchone()
+        return EducationalAnalysis(**json.loads(row["analysis"])) if row else None
+
+    def by_url(self, url: str) -> Optional[EducationalAnalysis]:
+        """Latest stored analysis of this URL (its content may have changed slightly since)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT analysis FROM verdicts WHERE url = ? AND created_at > ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (normalize_url(url), self._cutoff())
+            ).fetchone()
+        return EducationalAnalysis(**json.loads(row["analysis"])) if row else None
+
+    def reputation(self, kind: str, key: Optional[str]) -> Optional[Reputation]:
+        """Aggregated recent verdicts for a "domain" or "channel" """
+        if kind not in ("domain", "channel") or not key:
+            return None
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT SUM(accepted) AS approvals, COUNT(*) - SUM(accepted) AS rejections, "
+                f"AVG(CASE WHEN accepted THEN confidence END) AS average_confidence "
+                f"FROM verdicts WHERE {kind} = ? AND created_at > ?",
+                (key.lower(), self._cutoff())
+            ).fetchone()
+        if not row or row["approvals"] is None:
+            return None
+        return Reputation(row["approvals"], row["rejections"], row["average_confidence"])
+
+    def labelled_samples(self) -> Iterator[Tuple[str, bool]]:
+        """(sample, accepted) for every stored verdict that kept its sample, expired ones included"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sample, accepted FROM verdicts WHERE sample IS NOT NULL ORDER BY created_at"
+            ).fetchall()
+        for row in rows:
+            yield row["sample"], bool(row["accepted"])
+
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM verdicts WHERE created_at <= ?", (self._cutoff(),))
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) AS verdicts, COUNT(DISTINCT domain) AS domains, "
+                "COUNT(DISTINCT channel) AS channels FROM verdicts WHERE created_at > ?",
+                (self._cutoff(),)
+            ).fetchone()
+        return dict(row)
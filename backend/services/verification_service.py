@@ -1,9 +1,23 @@
 import json
-import re
-from urllib.parse import urlparse
+import os
 from datetime import datetime
 from typing import Optional, Dict
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, RateLimitError
+
+from services.http_clients import HTTPClientRegistry, get_http_clients
+from services.task_executor import TaskExecutor, get_task_executor
+from services.whitelist_index import WhitelistStore
+from services.verdict_store import VerdictStore, content_fingerprint, reputation_domain
+from services.content_classifier import LocalContentClassifier
+from services import metrics
+from services.rate_limiter import (
+    QuotaExceededError,
+    RateLimitedError,
+    RateLimiterRegistry,
+    estimate_tokens,
+    get_rate_limiters,
+    parse_retry_after,
+)
 
 from models.verification import (
     VerificationStatus,
@@ -12,7 +26,13 @@ from models.verification import (
 )
 
 
-# Educational platform whitelist
+# verification_method of the rejection given when the AI analysis itself
+# failed (timeout, 5xx, bad JSON): a verdict on the call, not the content
+FAILED_ANALYSIS_METHOD = "ai_analysis_failed"
+
+# Built-in educational platform whitelist. Entries match the domain and its
+# subdomains, optionally restricted to a path prefix. More can be added via
+# the JSON file at EDU_WHITELIST_PATH (see WhitelistStore).
 VERIFIED_EDUCATIONAL_PLATFORMS = {
     # Major MOOCs
     "coursera.org": {"name": "Coursera", "priority": 1},
@@ -123,17 +143,35 @@ Return JSON format:
 class VerificationService:
     """Service for verifying educational content quality"""
 
-    def __init__(self, openai_api_key: str):
-        self.openai_client = AsyncOpenAI(api_key=openai_api_key)
+    def __init__(
+        self,
+        openai_api_key: str,
+        http_clients: Optional[HTTPClientRegistry] = None,
+        rate_limiters: Optional[RateLimiterRegistry] = None,
+        executor: Optional[TaskExecutor] = None
+    ):
+        self.http_clients = http_clients or get_http_clients()
+        self.executor = executor or get_task_executor()
+        self.rate_limiter = (rate_limiters or get_rate_limiters()).get("openai")
+        self.openai_client = AsyncOpenAI(
+            api_key=openai_api_key,
+            http_client=self.http_clients.get("openai"),
+            timeout=self.http_clients.timeout("openai")
+        )
         self.confidence_threshold = 70.0  # Minimum confidence to accept content
+        self.whitelist = WhitelistStore.from_env(
+            VERIFIED_EDUCATIONAL_PLATFORMS, YOUTUBE_EDU_PATTERNS, YOUTUBE_EDU_CHANNELS, executor=self.executor
+        )
 
-    def _extract_domain(self, url: str) -> str:
-        """Extract domain from URL"""
-        try:
-            parsed = urlparse(url)
-            return parsed.netloc.lower().replace('www.', '')
-        except:
-            return ""
+        # Past AI verdicts, reused for repeat content and to build reputation
+        # (SQLite, so every store call goes through the I/O pool)
+        self.verdicts = VerdictStore.from_env()
+        self.reputation_min_verdicts = int(os.getenv("REPUTATION_MIN_VERDICTS", "5"))
+        self.reputation_min_ratio = float(os.getenv("REPUTATION_MIN_RATIO", "0.9"))
+        self.reputation_min_confidence = float(os.getenv("REPUTATION_MIN_CONFIDENCE", "80"))
+
+        # Local pre-classifier (only present once a model has been trained)
+        self.local_classifier = LocalContentClassifier.from_env()
 
     def check_whitelist(self, url: Optional[str]) -> Optional[VerificationMetadata]:
         """
@@ -143,27 +181,26 @@ class VerificationService:
         if not url:
             return None
 
-        domain = self._extract_domain(url)
+        index = self.whitelist.index
 
-        # Check direct domain matches
-        for pattern, info in VERIFIED_EDUCATIONAL_PLATFORMS.items():
-            if pattern in domain:
-                return VerificationMetadata(
-                    status=VerificationStatus.VERIFIED,
-                    platform=info["name"],
-                    verification_method="whitelist",
-                    verified_at=datetime.now()
-                )
+        # Check domain (and path prefix) matches
+        info = index.match_platform(url)
+        if info:
+            return VerificationMetadata(
+                status=VerificationStatus.VERIFIED,
+                platform=info["name"],
+                verification_method="whitelist",
+                verified_at=datetime.now()
+            )
 
         # Check YouTube educational patterns
-        for pattern in YOUTUBE_EDU_PATTERNS:
-            if re.search(pattern, url, re.IGNORECASE):
-                return VerificationMetadata(
-                    status=VerificationStatus.VERIFIED,
-                    platform="YouTube Education",
-                    verification_method="whitelist",
-                    verified_at=datetime.now()
-                )
+        if index.match_url_pattern(url):
+            return VerificationMetadata(
+                status=VerificationStatus.VERIFIED,
+                platform="YouTube Education",
+                verification_method="whitelist",
+                verified_at=datetime.now()
+            )
 
         return None
 
@@ -173,14 +210,24 @@ class VerificationService:
         metadata: Optional[Dict] = None
     ) -> EducationalAnalysis:
         """
-        Use GPT-4 to analyze if content is educational and high-quality
+        Use GPT-4 to analyze if content is educational and high-quality.
+        Raises QuotaExceededError when the OpenAI account is out of quota and
+        RateLimitedError when OpenAI is throttling or our queue is full.
         """
         try:
-            # Prepare content sample (first 3000 characters)
-            content_sample = content[:3000] if len(content) > 3000 else content
+            return await self._classify(content, metadata)
+        except (QuotaExceededError, RateLimitedError):
+            raise
+        except Exception as e:
+            return self._failed_analysis(e)
+
+    async def _classify(self, content: str, metadata: Optional[Dict]) -> EducationalAnalysis:
+        """GPT-4 classification; raises on any failure"""
+        # Prepare content sample (first 3000 characters)
+        content_sample = content[:3000] if len(content) > 3000 else content
 
-            # Build user prompt
-            user_prompt = f"""Analyze this content for educational quality:
+        # Build user prompt
+        user_prompt = f"""Analyze this content for educational quality:
 
 CONTENT TYPE: {metadata.get('source_type', 'unknown') if metadata else 'unknown'}
 SOURCE: {metadata.get('source_identifier', 'unknown') if metadata else 'unknown'}
@@ -190,54 +237,128 @@ CONTENT SAMPLE (first 3000 characters):
 
 Provide your analysis in JSON format."""
 
-            # Call GPT-4
-            response = await self.openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": EDUCATIONAL_CLASSIFIER_SYSTEM_PROMPT
-                    },
-                    {
-                        "role": "user",
-                        "content": user_prompt
-                    }
-                ],
-                temperature=0.3,  # Low temperature for consistent classification
-                response_format={"type": "json_object"}
+        # Call GPT-4 (prompt plus a few hundred tokens of JSON output)
+        estimated_tokens = estimate_tokens(EDUCATIONAL_CLASSIFIER_SYSTEM_PROMPT + user_prompt) + 500
+        async with self.rate_limiter.reserve(estimated_tokens) as permit:
+            try:
+                response = await self.openai_client.chat.completions.create(
+                    model="gpt-4o",
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": EDUCATIONAL_CLASSIFIER_SYSTEM_PROMPT
+                        },
+                        {
+                            "role": "user",
+                            "content": user_prompt
+                        }
+                    ],
+                    temperature=0.3,  # Low temperature for consistent classification
+                    response_format={"type": "json_object"}
+                )
+            except RateLimitError as e:
+                if e.code == "insufficient_quota":
+                    raise QuotaExceededError(str(e))
+                retry_after = parse_retry_after(e.response.headers.get("retry-after"))
+                permit.throttled(retry_after)
+                raise RateLimitedError("OpenAI is rate limiting verification requests", retry_after or 10)
+
+            if response.usage:
+                permit.record_usage(response.usage.total_tokens)
+
+        # Parse response
+        analysis_data = json.loads(response.choices[0].message.content)
+
+        return EducationalAnalysis(**analysis_data)
+
+    @staticmethod
+    def _failed_analysis(error: Exception) -> EducationalAnalysis:
+        """Cautious analysis that rejects, used when the AI call fails"""
+        print(f"⚠️ AI analysis failed: {str(error)}")
+        return EducationalAnalysis(
+            is_educational=False,
+            confidence=0.0,
+            topics=["Unknown"],
+            educational_indicators=[],
+            non_educational_flags=["AI analysis unavailable"],
+            reasoning=f"AI analysis failed: {str(error)}. Cannot verify educational quality."
+        )
+
+    def check_local_classifier(self, content: str) -> Optional[VerificationMetadata]:
+        """
+        Verdict from the local classifier when it is confident,
+        None to escalate to the AI analysis
+        """
+        probability = self.local_classifier.decide(content)
+        if probability is None:
+            return None
+
+        if probability >= self.local_classifier.approve_threshold:
+            print(f"✓ Content verified via local classifier ({probability:.3f})")
+            return VerificationMetadata(
+                status=VerificationStatus.AI_VERIFIED,
+                confidence_score=round(probability * 100, 1),
+                verification_method="local_classifier",
+                verified_at=datetime.now()
             )
 
-            # Parse response
-            analysis_data = json.loads(response.choices[0].message.content)
+        print(f"✗ Content rejected via local classifier ({probability:.3f})")
+        return VerificationMetadata(
+            status=VerificationStatus.REJECTED,
+            confidence_score=round((1 - probability) * 100, 1),
+            rejection_reason="Non-educational content detected: content closely matches sources previously found non-educational",
+            verification_method="local_classifier",
+            verified_at=datetime.now()
+        )
 
-            return EducationalAnalysis(**analysis_data)
+    async def _check_verdict_store(
+        self,
+        fingerprint: str,
+        url: Optional[str],
+        channel: Optional[str]
+    ) -> Optional[VerificationMetadata]:
+        """
+        Verdict from past AI analyses: the same content, the same URL, then
+        the channel's (videos) or domain's accumulated reputation
+        """
+        analysis = await self.executor.run_io(self.verdicts.by_content, fingerprint)
+        method = "verdict_store_content"
+        if not analysis and url:
+            analysis = await self.executor.run_io(self.verdicts.by_url, url)
+            method = "verdict_store_url"
+        if analysis:
+            return self._verdict_from_analysis(analysis, method)
+
+        kind, key = ("channel", channel) if channel else ("domain", reputation_domain(url))
+        reputation = await self.executor.run_io(self.verdicts.reputation, kind, key)
+        if not reputation or reputation.total < self.reputation_min_verdicts:
+            return None
 
-        except Exception as e:
-            # Fallback: return analysis based on error type
-            print(f"⚠️ AI analysis failed: {str(e)}")
-
-            # Check if it's a quota/billing error
-            if "quota" in str(e).lower() or "429" in str(e):
-                print("⚠️ OpenAI API quota exceeded - content will be unverified")
-                return EducationalAnalysis(
-                    is_educational=False,  # Will trigger REJECTED status
-                    confidence=0.0,
-                    topics=["API quota exceeded"],
-                    educational_indicators=[],
-                    non_educational_flags=["API quota exceeded"],
-                    reasoning=f"OpenAI API quota exceeded. Please add credits at https://platform.openai.com/account/billing to enable content verification."
-                )
+        if (
+            reputation.approvals / reputation.total >= self.reputation_min_ratio
+            and (reputation.average_confidence or 0) >= self.reputation_min_confidence
+        ):
+            print(f"✓ Content verified via {kind} reputation: {key} ({reputation.approvals}/{reputation.total} approved)")
+            return VerificationMetadata(
+                status=VerificationStatus.AI_VERIFIED,
+                confidence_score=reputation.average_confidence,
+                platform=key,
+                verification_method=f"{kind}_reputation",
+                verified_at=datetime.now()
+            )
 
-            # For other errors, return cautious analysis that rejects
-            return EducationalAnalysis(
-                is_educational=False,
-                confidence=0.0,
-                topics=["Unknown"],
-                educational_indicators=[],
-                non_educational_flags=["AI analysis unavailable"],
-                reasoning=f"AI analysis failed: {str(e)}. Cannot verify educational quality."
+        if reputation.rejections / reputation.total >= self.reputation_min_ratio:
+            print(f"✗ Content rejected via {kind} reputation: {key} ({reputation.rejections}/{reputation.total} rejected)")
+            return VerificationMetadata(
+                status=VerificationStatus.REJECTED,
+                rejection_reason=f"Content from this {kind} has repeatedly been found non-educational ({reputation.rejections} of {reputation.total} recent sources).",
+                platform=key,
+                verification_method=f"{kind}_reputation",
+                verified_at=datetime.now()
             )
 
+        return None
+
     async def verify_content(
         self,
         content: str,
@@ -248,8 +369,10 @@ Provide your analysis in JSON format."""
         Main verification flow:
         1. Check whitelist (Tier 1)
         2. Check YouTube channel name from metadata
-        3. AI analysis (Tier 2)
-        4. Apply rejection criteria
+        3. Reuse past verdicts for this content/URL, or the domain's/channel's reputation
+        4. Local classifier, for confidently (non-)educational content
+        5. AI analysis (Tier 2)
+        6. Apply rejection criteria
         """
         # Step 1: Check whitelist
         whitelist_result = self.check_whitelist(url)
@@ -259,22 +382,53 @@ Provide your analysis in JSON format."""
 
         # Step 2: Check if YouTube video is from known educational channel (using metadata)
         if metadata and metadata.get('title'):
-            title = metadata.get('title', '')
             # Check if any known educational channel name is in the title metadata
             # (YouTube often includes channel name in video title metadata)
-            for channel in YOUTUBE_EDU_CHANNELS:
-                if channel.lower() in title.lower():
-                    print(f"✓ Content verified via YouTube channel detection: {channel}")
-                    return VerificationMetadata(
-                        status=VerificationStatus.VERIFIED,
-                        platform=f"YouTube - {channel}",
-                        verification_method="youtube_channel_whitelist",
-                        verified_at=datetime.now()
-                    )
-
-        # Step 2: AI Analysis
+            channel = self.whitelist.index.match_channel(metadata['title'])
+            if channel:
+                print(f"✓ Content verified via YouTube channel detection: {channel}")
+                return VerificationMetadata(
+                    status=VerificationStatus.VERIFIED,
+                    platform=f"YouTube - {channel}",
+                    verification_method="youtube_channel_whitelist",
+                    verified_at=datetime.now()
+                )
+
+        # Step 3: Past verdicts
+        fingerprint = content_fingerprint(content)
+        channel = metadata.get('channel') if metadata else None
+        if self.verdicts:
+            stored = await self._check_verdict_store(fingerprint, url, channel)
+            if stored:
+                return stored
+
+        # Step 4: Local classifier
+        if self.local_classifier:
+            local_result = self.check_local_classifier(content)
+            if local_result:
+                return local_result
+
+        # Step 5: AI Analysis
         print(f"🤖 Running AI educational analysis...")
-        analysis = await self.analyze_educational_quality(content, metadata)
+        analysis_failed = False
+        try:
+            analysis = await self._classify(content, metadata)
+        except QuotaExceededError:
+            # Let content through unverified rather than blocking everyone
+            # until credits are added (https://platform.openai.com/account/billing)
+            print("⚠️ OpenAI API quota exceeded - content will be unverified")
+            metrics.VERIFICATION_FALLBACKS.labels("quota_exceeded").inc()
+            return VerificationMetadata(
+                status=VerificationStatus.PENDING,
+                verification_method="api_unavailable",
+                verified_at=datetime.now()
+            )
+        except RateLimitedError:
+            raise
+        except Exception as e:
+            analysis = self._failed_analysis(e)
+            analysis_failed = True
+            metrics.VERIFICATION_FALLBACKS.labels("analysis_failed").inc()
 
         print(f"AI Analysis Result:")
         print(f"  - Is Educational: {analysis.is_educational}")
@@ -282,19 +436,20 @@ Provide your analysis in JSON format."""
         print(f"  - Topics: {', '.join(analysis.topics)}")
         print(f"  - Reasoning: {analysis.reasoning}")
 
-        # Step 3: Apply rejection criteria
-
-        # FIRST: Check if rejection is due to API quota issues (check this BEFORE confidence threshold)
-        if analysis.non_educational_flags and "API quota exceeded" in analysis.non_educational_flags:
-            # Return rejection with quota info so main.py can handle it
-            print(f"⚠️ Quota exceeded detected - marking for fallback to PENDING status")
-            return VerificationMetadata(
-                status=VerificationStatus.REJECTED,
-                confidence_score=analysis.confidence,
-                rejection_reason=f"OpenAI API quota exceeded: {analysis.reasoning}",
-                verification_method="ai_analysis",
-                verified_at=datetime.now()
+        # A failed analysis is marked so that its rejection isn't cached either
+        verdict = self._verdict_from_analysis(analysis, FAILED_ANALYSIS_METHOD if analysis_failed else "ai_analysis")
+        # Failed analyses say nothing about the content, so aren't remembered
+        if self.verdicts and not analysis_failed:
+            await self.executor.run_io(
+                self.verdicts.record,
+                fingerprint, url, channel, analysis,
+                accepted=verdict.status == VerificationStatus.AI_VERIFIED,
+                sample=content[:3000]
             )
+        return verdict
+
+    def _verdict_from_analysis(self, analysis: EducationalAnalysis, method: str) -> VerificationMetadata:
+        """Step 6: Apply rejection criteria"""
 
         # Reject if confidence too low
         if analysis.confidence < self.confidence_threshold:
@@ -302,7 +457,7 @@ Provide your analysis in JSON format."""
                 status=VerificationStatus.REJECTED,
                 confidence_score=analysis.confidence,
                 rejection_reason=f"Low confidence ({analysis.confidence:.1f}%). AI is not confident this is educational content. Minimum required: {self.confidence_threshold}%.",
-                verification_method="ai_analysis",
+                verification_method=method,
                 verified_at=datetime.now()
             )
 
@@ -315,15 +470,15 @@ Provide your analysis in JSON format."""
                 status=VerificationStatus.REJECTED,
                 confidence_score=analysis.confidence,
                 rejection_reason=f"Non-educational content detected: {flags}",
-                verification_method="ai_analysis",
+                verification_method=method,
                 verified_at=datetime.now()
             )
 
-        # Step 4: Accept as AI-verified
-        print(f"✓ Content verified via AI analysis")
+        # Accept as AI-verified
+        print(f"✓ Content verified via {method}")
         return VerificationMetadata(
             status=VerificationStatus.AI_VERIFIED,
             confidence_score=analysis.confidence,
-            verification_method="ai_analysis",
+            verification_method=method,
             verified_at=datetime.now()
         )
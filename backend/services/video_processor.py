@@ -4,12 +4,82 @@ import yt_dlp
 from openai import AsyncOpenAI
 from pathlib import Path
 import tempfile
+import shutil
 import asyncio
-from typing import Optional, Dict
+import time
+from typing import Any, Optional, Dict
 from pydantic import BaseModel
 from youtube_transcript_api import YouTubeTranscriptApi
 from youtube_transcript_api._errors import TranscriptsDisabled, NoTranscriptFound
 
+from services.task_executor import TaskExecutor, TaskExecutorError, get_task_executor
+from services.rate_limiter import RateLimitedError
+from services.http_clients import HTTPClientRegistry, get_http_clients
+from services.transcription import ChunkedTranscriber
+from services.text_extraction import read_and_clean_subtitle_file
+from services import metrics
+
+
+# Preferred English tracks, in order, for transcripts and subtitles
+TRANSCRIPT_LANGUAGES = ['en', 'en-US', 'en-GB']
+SUBTITLE_LANGUAGES = ['en', 'en-US', 'en-GB']
+
+# Common yt-dlp options to avoid blocking
+COMMON_YDL_OPTS = {
+    'quiet': True,
+    'no_warnings': True,
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['android', 'web'],
+            'player_skip': ['webpage', 'configs'],
+        }
+    },
+    # Additional headers to avoid bot detection
+    'http_headers': {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-us,en;q=0.5',
+        'Sec-Fetch-Mode': 'navigate',
+    },
+}
+
+
+class FetchReport:
+    """Time spent and upstream calls made per stage while fetching one video (or many, merged)"""
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, seconds: float, calls: int = 1, runs: int = 1):
+        entry = self.stages.setdefault(stage, {"seconds": 0.0, "calls": 0, "runs": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += calls
+        entry["runs"] += runs
+
+    def merge(self, other: "FetchReport"):
+        for stage, entry in other.stages.items():
+            self.record(stage, entry["seconds"], entry["calls"], entry["runs"])
+
+    @property
+    def upstream_calls(self) -> int:
+        return sum(entry["calls"] for entry in self.stages.values())
+
+    def summary(self) -> str:
+        stages = ", ".join(
+            f"{stage} {entry['seconds']:.2f}s/{entry['calls']}" for stage, entry in self.stages.items()
+        )
+        return f"{stages or 'no stages'} ({self.upstream_calls} upstream calls)"
+
+    def dict(self) -> Dict[str, Any]:
+        return {
+            "upstream_calls": self.upstream_calls,
+            "stages": {
+                stage: {"seconds": round(entry["seconds"], 3), "calls": entry["calls"]}
+                for stage, entry in self.stages.items()
+            },
+        }
+
 
 class VideoProcessingResult(BaseModel):
     """Result of video processing"""
@@ -17,15 +87,32 @@ class VideoProcessingResult(BaseModel):
     title: Optional[str] = None
     duration: Optional[int] = None
     platform: Optional[str] = None
+    channel: Optional[str] = None
+    fetch_report: Optional[Dict[str, Any]] = None
 
 
 class VideoProcessor:
     """Service for processing video URLs and extracting transcripts"""
 
-    def __init__(self, openai_api_key: str):
-        self.openai_client = AsyncOpenAI(api_key=openai_api_key)
+    def __init__(
+        self,
+        openai_api_key: str,
+        executor: Optional[TaskExecutor] = None,
+        http_clients: Optional[HTTPClientRegistry] = None
+    ):
+        self.http_clients = http_clients or get_http_clients()
+        self.openai_client = AsyncOpenAI(
+            api_key=openai_api_key,
+            http_client=self.http_clients.get("openai"),
+            timeout=self.http_clients.timeout("openai")
+        )
+        self.executor = executor or get_task_executor()
+        self.transcriber = ChunkedTranscriber.from_env(self.openai_client, self.executor)
         self.temp_dir = tempfile.mkdtemp(prefix="quiz_videos_")
         self.max_duration = int(os.getenv("MAX_VIDEO_DURATION_SECONDS", "7200"))  # 2 hours default
+        self.download_timeout = float(os.getenv("VIDEO_DOWNLOAD_TIMEOUT_SECONDS", "1800"))
+        self.fetch_totals = FetchReport()
+        self.videos_fetched = 0
 
     def detect_platform(self, url: str) -> str:
         """Detect video platform from URL"""
@@ -57,62 +144,37 @@ class VideoProcessor:
                 return match.group(1)
         return None
 
-    async def _try_youtube_transcript_api(self, url: str) -> Optional[Dict[str, any]]:
+    async def _timed(self, report: "FetchReport", stage: str, awaitable, calls: int = 1):
+        """Await awaitable, recording its duration and upstream calls under stage"""
+        started = time.monotonic()
+        try:
+            return await awaitable
+        finally:
+            elapsed = time.monotonic() - started
+            report.record(stage, elapsed, calls)
+            if stage == "transcription":
+                metrics.TRANSCRIPTION_SECONDS.labels("video_url").observe(elapsed)
+            else:
+                metrics.FETCH_SECONDS.labels("video_url", stage).observe(elapsed)
+
+    async def _fetch_youtube_transcript(self, video_id: str, report: "FetchReport") -> Optional[str]:
         """
-        Try to get transcript using youtube-transcript-api.
-        This is more reliable than yt-dlp for getting transcripts as it doesn't download video.
+        List the video's transcripts once, pick the best English track
+        (manual before auto-generated) and fetch only that one
         """
         try:
-            video_id = self.extract_youtube_video_id(url)
-            if not video_id:
-                return None
-
-            print(f"🔍 Attempting to fetch transcript via YouTube Transcript API for video: {video_id}")
-
-            # Try multiple language codes and auto-generated captions
-            language_attempts = [
-                ['en'],           # English
-                ['en-US'],        # US English
-                ['en-GB'],        # British English
-                ['a.en'],         # Auto-generated English
-            ]
-
-            transcript_list = None
-            for languages in language_attempts:
-                try:
-                    transcript_list = YouTubeTranscriptApi.get_transcript(video_id, languages=languages)
-                    if transcript_list:
-                        print(f"✓ Found transcript with languages: {languages}")
-                        break
-                except:
-                    continue
-
-            # If specific languages failed, try to get any available transcript
-            if not transcript_list:
-                try:
-                    transcript_dict = YouTubeTranscriptApi.list_transcripts(video_id)
-                    # Try to find any English transcript (manual or auto-generated)
-                    for transcript in transcript_dict:
-                        if transcript.language_code.startswith('en'):
-                            transcript_list = transcript.fetch()
-                            print(f"✓ Found transcript: {transcript.language} ({transcript.language_code})")
-                            break
-                except:
-                    pass
-
-            if not transcript_list:
+            transcript = await self._timed(
+                report, "transcript_list", self.executor.run_io(_find_best_transcript, video_id)
+            )
+            if transcript is None:
+                print(f"⚠️ No English transcript listed for video: {video_id}")
                 return None
 
-            # Combine all transcript entries
-            transcript_text = " ".join([entry['text'] for entry in transcript_list])
-
+            entries = await self._timed(report, "transcript_fetch", self.executor.run_io(transcript.fetch))
+            transcript_text = " ".join(entry['text'] for entry in entries or [])
             if transcript_text:
-                print("✓ Successfully fetched transcript via YouTube Transcript API")
-                return {
-                    'transcript': transcript_text,
-                    'method': 'youtube_transcript_api'
-                }
-
+                print(f"✓ Fetched transcript: {transcript.language} ({transcript.language_code})")
+                return transcript_text
             return None
 
         except (TranscriptsDisabled, NoTranscriptFound) as e:
@@ -122,245 +184,257 @@ class VideoProcessor:
             print(f"⚠️ YouTube Transcript API error: {str(e)}")
             return None
 
+    async def _extract_metadata(self, url: str, report: "FetchReport") -> Optional[dict]:
+        """
+        The one yt-dlp extract_info for this video (no download). Returns None
+        when blocked by bot detection; other failures raise.
+        """
+        try:
+            info = await self._timed(
+                report, "metadata", self.executor.run_io(_ydl_extract_info, COMMON_YDL_OPTS, url, False)
+            )
+            if not info:
+                raise Exception("Failed to extract video information")
+            return info
+        except TaskExecutorError:
+            raise
+        except Exception as e:
+            # If bot detection blocks us, we can still try to continue
+            if "bot" in str(e).lower() or "sign in" in str(e).lower():
+                print(f"⚠️ yt-dlp metadata extraction blocked by bot detection, continuing with transcript attempts...")
+                return None
+            raise
+
     async def process_video_url(self, url: str) -> VideoProcessingResult:
         """
-        Process a video URL with multiple fallback strategies:
-        1. For YouTube: Try YouTube Transcript API first (fastest, no bot detection)
-        2. Try yt-dlp to extract metadata and subtitles
-        3. If yt-dlp fails due to bot detection, use basic metadata
-        4. Fall back to audio download and Whisper transcription
+        Process a video URL with one fetch plan:
+        1. Extract metadata with yt-dlp once; for YouTube, concurrently list
+           the transcripts once and fetch the best English track
+        2. Without a transcript, download subtitles from the extracted info
+        3. Without subtitles, download audio (again from the extracted info)
+           and transcribe it with Whisper
+        Each stage's time and upstream calls are logged and aggregated in stats().
         """
+        report = FetchReport()
         try:
             platform = self.detect_platform(url)
-            title = "Unknown"
-            duration = 0
+            video_id = self.extract_youtube_video_id(url) if platform == "YouTube" else None
             transcript = None
 
-            # Step 1: For YouTube videos, try YouTube Transcript API first
-            if platform == "YouTube":
-                yt_api_result = await self._try_youtube_transcript_api(url)
-                if yt_api_result:
-                    # Success! We have the transcript, now just get metadata
-                    try:
-                        # Try to get basic metadata without downloading
-                        video_id = self.extract_youtube_video_id(url)
-                        title = f"YouTube Video {video_id}" if video_id else "YouTube Video"
-
-                        # Try to get full metadata if possible
-                        with yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True}) as ydl:
-                            try:
-                                info = ydl.extract_info(url, download=False)
-                                if info:
-                                    title = info.get('title', title)
-                                    duration = info.get('duration', 0)
-                            except:
-                                pass  # If metadata fails, continue with what we have
-
-                    except:
-                        pass  # Continue with transcript even if metadata fails
-
-                    return VideoProcessingResult(
-                        transcript=yt_api_result['transcript'],
-                        title=title,
-                        duration=duration,
-                        platform=platform
-                    )
-
-            # Step 2: Try yt-dlp for non-YouTube or if Transcript API failed
-            # Common options to avoid blocking
-            common_opts = {
-                'quiet': True,
-                'no_warnings': True,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'extractor_args': {
-                    'youtube': {
-                        'player_client': ['android', 'web'],
-                        'player_skip': ['webpage', 'configs'],
-                    }
-                },
-                # Additional headers to avoid bot detection
-                'http_headers': {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                    'Accept-Language': 'en-us,en;q=0.5',
-                    'Sec-Fetch-Mode': 'navigate',
-                },
-            }
-
-            # Try to extract video info
-            try:
-                with yt_dlp.YoutubeDL(common_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
-
-                    if not info:
-                        raise Exception("Failed to extract video information")
-
-                    title = info.get('title', 'Unknown')
-                    duration = info.get('duration', 0)
+            if video_id:
+                print(f"🔍 Fetching transcript and metadata for YouTube video: {video_id}")
+                info, transcript = await asyncio.gather(
+                    self._extract_metadata(url, report),
+                    self._fetch_youtube_transcript(video_id, report),
+                    return_exceptions=True
+                )
+                if isinstance(transcript, BaseException):
+                    transcript = None
+                if isinstance(info, BaseException):
+                    if not transcript:
+                        raise info
+                    info = None  # Metadata is optional once we have the transcript
+            else:
+                info = await self._extract_metadata(url, report)
 
-                    # Check duration limit
-                    if duration > self.max_duration:
-                        raise Exception(f"Video too long ({duration}s). Maximum allowed: {self.max_duration}s")
-            except Exception as e:
-                # If bot detection blocks us, we can still try to continue
-                if "bot" in str(e).lower() or "sign in" in str(e).lower():
-                    print(f"⚠️ yt-dlp metadata extraction blocked by bot detection, continuing with transcript attempts...")
-                else:
-                    raise
+            source = "transcript_api" if transcript else None
+            title = info.get('title', 'Unknown') if info else "Unknown"
+            duration = (info.get('duration') or 0) if info else 0
+            channel = (info.get('channel') or info.get('uploader')) if info else None
+            if transcript and not info:
+                title = f"YouTube Video {video_id}"
 
-            # Step 3: Try to extract subtitles/captions
             if not transcript:
-                transcript = await self._try_extract_subtitles(url, common_opts)
+                # Check duration limit
+                if duration > self.max_duration:
+                    raise Exception(f"Video too long ({duration}s). Maximum allowed: {self.max_duration}s")
 
-            # Step 4: If no subtitles, fall back to audio transcription
-            if not transcript:
-                print("⚠️ No subtitles found, attempting audio download and transcription...")
-                transcript = await self._transcribe_from_audio(url, common_opts)
+                transcript = await self._try_extract_subtitles(url, info, report)
+                source = "subtitles"
 
+                if not transcript:
+                    print("⚠️ No subtitles found, attempting audio download and transcription...")
+                    transcript = await self._transcribe_from_audio(url, info, report)
+                    source = "whisper"
+
+            metrics.TRANSCRIPT_SOURCES.labels(source).inc()
+            self._record_fetch(report)
             return VideoProcessingResult(
                 transcript=transcript,
                 title=title,
                 duration=duration,
-                platform=platform
+                platform=platform,
+                channel=channel,
+                fetch_report=report.dict()
             )
 
         except yt_dlp.utils.DownloadError as e:
             raise Exception(f"Failed to download video: {str(e)}")
+        except (TaskExecutorError, RateLimitedError):
+            raise
         except Exception as e:
             raise Exception(f"Video processing error: {str(e)}")
 
-    async def _try_extract_subtitles(self, url: str, common_opts: dict) -> Optional[str]:
+    async def _try_extract_subtitles(self, url: str, info: Optional[dict], report: "FetchReport") -> Optional[str]:
         """
         Try to extract existing subtitles/captions from video.
-        This is less likely to be blocked than downloading audio.
+        This is less likely to be blocked than downloading audio. With the
+        extracted info at hand only the subtitle files are downloaded, and
+        not at all when the info lists no English subtitles.
+
+        Files go to a directory of their own, so concurrent calls for the
+        same video never read or delete each other's subtitle files.
         """
+        work_dir = tempfile.mkdtemp(prefix="subs_", dir=self.temp_dir)
         try:
             subtitle_opts = {
-                **common_opts,
+                **COMMON_YDL_OPTS,
                 'writesubtitles': True,
                 'writeautomaticsub': True,
-                'subtitleslangs': ['en', 'en-US', 'en-GB'],
+                'subtitleslangs': SUBTITLE_LANGUAGES,
                 'skip_download': True,
-                'outtmpl': f'{self.temp_dir}/%(id)s',
+                'outtmpl': f'{work_dir}/%(id)s',
             }
 
-            with yt_dlp.YoutubeDL(subtitle_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-
-                # Check if subtitles were downloaded
-                video_id = info.get('id', 'video')
-
-                # Try different subtitle file extensions
-                for ext in ['.en.vtt', '.en-US.vtt', '.en-GB.vtt', '.en.srt']:
-                    subtitle_path = f"{self.temp_dir}/{video_id}{ext}"
-                    if os.path.exists(subtitle_path):
-                        with open(subtitle_path, 'r', encoding='utf-8') as f:
-                            subtitle_content = f.read()
-
-                        # Clean VTT/SRT format
-                        transcript = self._clean_subtitle_text(subtitle_content)
+            if info is not None:
+                available = {**(info.get('automatic_captions') or {}), **(info.get('subtitles') or {})}
+                if not any(language in available for language in SUBTITLE_LANGUAGES):
+                    return None
+                info = await self._timed(
+                    report, "subtitles", self.executor.run_io(_ydl_process_info, subtitle_opts, info)
+                )
+            else:
+                info = await self._timed(
+                    report, "subtitles", self.executor.run_io(_ydl_extract_info, subtitle_opts, url, True)
+                )
 
-                        # Cleanup subtitle file
-                        try:
-                            os.remove(subtitle_path)
-                        except:
-                            pass
+            # Check if subtitles were downloaded
+            video_id = info.get('id', 'video')
 
-                        if transcript:
-                            print("✓ Successfully extracted subtitles")
-                            return transcript
+            # Try different subtitle file extensions
+            for ext in ['.en.vtt', '.en-US.vtt', '.en-GB.vtt', '.en.srt']:
+                subtitle_path = f"{work_dir}/{video_id}{ext}"
+                if os.path.exists(subtitle_path):
+                    # Read and clean VTT/SRT format
+                    transcript = await self.executor.run_cpu(read_and_clean_subtitle_file, subtitle_path)
+                    if transcript:
+                        print("✓ Successfully extracted subtitles")
+                        return transcript
 
             return None
         except Exception as e:
             print(f"⚠️ Subtitle extraction failed: {str(e)}")
             return None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
 
-    def _clean_subtitle_text(self, subtitle_content: str) -> str:
-        """Clean VTT/SRT subtitle formatting to get plain text"""
-        import re
-
-        # Remove WEBVTT header
-        text = re.sub(r'^WEBVTT.*?\n\n', '', subtitle_content, flags=re.DOTALL)
-
-        # Remove timestamp lines (e.g., "00:00:01.000 --> 00:00:05.000")
-        text = re.sub(r'\d{2}:\d{2}:\d{2}[.,]\d{3}\s*-->\s*\d{2}:\d{2}:\d{2}[.,]\d{3}', '', text)
-
-        # Remove cue identifiers (numbers)
-        text = re.sub(r'^\d+\s*$', '', text, flags=re.MULTILINE)
-
-        # Remove positioning tags
-        text = re.sub(r'<[^>]+>', '', text)
-
-        # Remove duplicate spaces and newlines
-        text = re.sub(r'\n\s*\n', '\n', text)
-        text = re.sub(r' +', ' ', text)
-
-        return text.strip()
-
-    async def _transcribe_from_audio(self, url: str, common_opts: dict) -> str:
+    async def _transcribe_from_audio(self, url: str, info: Optional[dict], report: "FetchReport") -> str:
         """
         Download audio and transcribe using Whisper API.
         Fallback method when subtitles are not available.
         """
+        work_dir = tempfile.mkdtemp(prefix="audio_", dir=self.temp_dir)
         ydl_opts = {
-            **common_opts,
+            **COMMON_YDL_OPTS,
             'format': 'bestaudio/best',
-            'outtmpl': f'{self.temp_dir}/%(id)s.%(ext)s',
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
+            'outtmpl': f'{work_dir}/%(id)s.%(ext)s',
+            # No FFmpegExtractAudio postprocessor: the transcriber extracts
+            # speech audio itself, so a 192k mp3 transcode here is wasted work
         }
 
-        audio_file_path = None
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                download_info = ydl.extract_info(url, download=True)
-                video_id = download_info.get('id', 'audio')
-                audio_file_path = f"{self.temp_dir}/{video_id}.mp3"
+            if info is not None:
+                download = self.executor.run_io(_ydl_process_info, ydl_opts, info, timeout=self.download_timeout)
+            else:
+                download = self.executor.run_io(
+                    _ydl_extract_info, ydl_opts, url, True, timeout=self.download_timeout
+                )
+            download_info = await self._timed(report, "audio_download", download)
+            requested = download_info.get('requested_downloads') or [{}]
+            audio_file_path = requested[0].get('filepath')
 
             if not audio_file_path or not os.path.exists(audio_file_path):
                 raise Exception("Failed to download audio from video")
 
-            # Transcribe audio
-            transcript = await self.transcribe_audio(audio_file_path)
+            # Transcribe audio (Whisper requests are accounted by the rate limiter, not here)
+            transcript = await self._timed(report, "transcription", self.transcribe_audio(audio_file_path), calls=0)
 
             return transcript
         finally:
-            # Cleanup audio file
-            if audio_file_path:
-                try:
-                    os.remove(audio_file_path)
-                except:
-                    pass
+            # Cleanup audio file (and any partial download)
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _record_fetch(self, report: "FetchReport"):
+        print(f"⏱️ Video fetch plan: {report.summary()}")
+        self.fetch_totals.merge(report)
+        self.videos_fetched += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-stage totals over all videos processed, and upstream calls per video"""
+        videos = self.videos_fetched
+        return {
+            "videos": videos,
+            "upstream_calls_per_video": round(self.fetch_totals.upstream_calls / videos, 2) if videos else None,
+            "stages": {
+                stage: {
+                    "runs": entry["runs"],
+                    "calls": entry["calls"],
+                    "mean_seconds": round(entry["seconds"] / entry["runs"], 3),
+                }
+                for stage, entry in self.fetch_totals.stages.items()
+            },
+        }
 
     async def transcribe_audio(self, audio_path: str) -> str:
         """
-        Transcribe audio file using OpenAI Whisper API
+        Transcribe audio file using OpenAI Whisper API.
+        Long recordings are split into chunks and transcribed in parallel.
         """
         try:
-            with open(audio_path, 'rb') as audio_file:
-                transcript = await self.openai_client.audio.transcriptions.create(
-                    model="whisper-1",
-                    file=audio_file,
-                    response_format="text"
-                )
-
-            if isinstance(transcript, str):
-                return transcript
-            else:
-                # Handle case where transcript is an object with text attribute
-                return transcript.text if hasattr(transcript, 'text') else str(transcript)
-
+            return await self.transcriber.transcribe(audio_path)
+        except (TaskExecutorError, RateLimitedError):
+            raise
         except Exception as e:
             raise Exception(f"Transcription failed: {str(e)}")
 
     def cleanup(self):
         """Clean up temporary files"""
         try:
-            import shutil
             if os.path.exists(self.temp_dir):
                 shutil.rmtree(self.temp_dir)
         except:
             pass
+
+
+def _ydl_extract_info(opts: dict, url: str, download: bool) -> Optional[dict]:
+    """Blocking yt-dlp extract_info call, run on the I/O pool"""
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        return ydl.extract_info(url, download=download)
+
+
+def _ydl_process_info(opts: dict, info: dict) -> dict:
+    """
+    Blocking download from an already extracted info dict (as yt-dlp's
+    --load-info-json does), so the page and player are not fetched again.
+    Formats and subtitles are re-selected with opts.
+    """
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        return ydl.process_ie_result(ydl.sanitize_info(info), download=True)
+
+
+def _find_best_transcript(video_id: str):
+    """
+    List the video's transcripts (one request) and pick the best English
+    track: manual before auto-generated, preferred locales first, then any
+    other English variant. None if there is no English track.
+    """
+    transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+    for find in (transcript_list.find_manually_created_transcript, transcript_list.find_generated_transcript):
+        try:
+            return find(TRANSCRIPT_LANGUAGES)
+        except NoTranscriptFound:
+            continue
+    for transcript in transcript_list:
+        if transcript.language_code.startswith('en'):
+            return transcript
+    return None
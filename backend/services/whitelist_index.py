@@ -0,0 +1,259 @@
+"""
+Precompiled lookup structures for the educational source whitelist.
+
+- DomainTrie: domains stored by reversed labels (edu -> mit), so a lookup
+  walks the URL's host label by label and only ever matches on label
+  boundaries ("ocw.mit.edu" matches "mit.edu", "notmit.edu" and
+  "mit.edu.evil.com" don't). Entries may carry a path prefix
+  ("linkedin.com/learning").
+- The URL regexes are combined into one compiled alternation.
+- Channel names are matched with an Aho-Corasick automaton, so scanning a
+  title costs O(len(title)) however many channels are listed.
+
+WhitelistStore loads the lists from an optional JSON file and rebuilds the
+index when the file changes.
+"""
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from services.task_executor import TaskExecutor
+
+
+class DomainTrie:
+    """Reversed-label domain suffix trie with optional path prefixes per entry"""
+
+    def __init__(self):
+        self._root: Dict = {}
+
+    def add(self, pattern: str, info: Dict):
+        """Add "example.com" or "example.com/some/path" """
+        host, _, path = pattern.lower().partition("/")
+        node = self._root
+        for label in reversed(host.strip(".").split(".")):
+            node = node.setdefault(label, {})
+        prefix = "/" + path.strip("/") if path.strip("/") else ""
+        entries = node.setdefault("", [])
+        entries.append((prefix, info))
+        # Longest path prefix first
+        entries.sort(key=lambda entry: len(entry[0]), reverse=True)
+
+    def match(self, host: str, path: str) -> Optional[Dict]:
+        """Most specific entry for a host/path: deepest domain, then longest path prefix"""
+        path = path.lower().rstrip("/")
+        best = None
+        node = self._root
+        for label in reversed(host.lower().strip(".").split(".")):
+            node = node.get(label)
+            if node is None:
+                break
+            for prefix, info in node.get("", ()):
+                if not prefix or path == prefix or path.startswith(prefix + "/"):
+                    best = info
+                    break
+        return best
+
+
+class AhoCorasick:
+    """Case-insensitive multi-substring matcher"""
+
+    def __init__(self, words: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # Longest word ending at each state (directly or via failure links)
+        self._output: List[Optional[str]] = [None]
+
+        for word in words:
+            if not word:
+                continue
+            state = 0
+            for char in word.lower():
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(None)
+                state = next_state
+            if self._output[state] is None:
+                self._output[state] = word
+
+        # Breadth-first pass to set failure links
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                if self._output[next_state] is None:
+                    self._output[next_state] = self._output[self._fail[next_state]]
+
+    def search(self, text: str) -> Optional[str]:
+        """The first word (by end position) that occurs in text, or None"""
+        state = 0
+        for char in text.lower():
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            if self._output[state] is not None:
+                return self._output[state]
+        return None
+
+
+class WhitelistIndex:
+    """Immutable, precompiled whitelist: build once, then share between requests"""
+
+    def __init__(self, platforms: Dict[str, Dict], url_patterns: List[str], channels: List[str]):
+        self.size = len(platforms) + len(url_patterns) + len(channels)
+        self.domains = DomainTrie()
+        for pattern, info in platforms.items():
+            self.domains.add(pattern, info)
+
+        self.url_regex = re.compile(
+            "|".join(f"(?:{pattern})" for pattern in url_patterns), re.IGNORECASE
+        ) if url_patterns else None
+
+        self.channels = AhoCorasick(channels)
+
+    def match_platform(self, url: str) -> Optional[Dict]:
+        """Whitelisted platform info for a URL's domain (and path), if any"""
+        try:
+            parts = urlsplit(url if "://" in url else f"http://{url}")
+            host = parts.hostname or ""
+        except ValueError:
+            return None
+        return self.domains.match(host, parts.path) if host else None
+
+    def match_url_pattern(self, url: str) -> bool:
+        return bool(self.url_regex and self.url_regex.search(url))
+
+    def match_channel(self, text: str) -> Optional[str]:
+        """Whitelisted channel name occurring in text, if any"""
+        return self.channels.search(text) if text else None
+
+
+class WhitelistStore:
+    """
+    Holds the current WhitelistIndex, built from the built-in lists plus an
+    optional JSON file:
+
+        {"platforms": {"example.edu": {"name": "Example", "priority": 1}},
+         "youtube_patterns": ["youtube\\\\.com/c/example"],
+         "youtube_channels": ["Example Channel"],
+         "replace_defaults": false}
+
+    The file's modification time is checked at most every reload_seconds on
+    access; a changed file is re-read and the index swapped atomically. With
+    an executor, that check and rebuild run in its I/O pool while lookups keep
+    using the previous index. A file that fails to load leaves the previous
+    index in place.
+    """
+
+    def __init__(
+        self,
+        default_platforms: Dict[str, Dict],
+        default_patterns: List[str],
+        default_channels: List[str],
+        path: Optional[str] = None,
+        reload_seconds: float = 5,
+        executor: Optional[TaskExecutor] = None
+    ):
+        self.defaults = (default_platforms, default_patterns, default_channels)
+        self.path = path
+        self.reload_seconds = reload_seconds
+        self.executor = executor
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._reload_task: Optional[asyncio.Task] = None
+        self._index = WhitelistIndex(*self.defaults)
+        if path:
+            self._reload_if_changed()
+
+    @classmethod
+    def from_env(
+        cls,
+        default_platforms: Dict[str, Dict],
+        default_patterns: List[str],
+        default_channels: List[str],
+        executor: Optional[TaskExecutor] = None
+    ) -> "WhitelistStore":
+        """Build a store from EDU_WHITELIST_PATH / EDU_WHITELIST_RELOAD_SECONDS"""
+        return cls(
+            default_platforms,
+            default_patterns,
+            default_channels,
+            path=os.getenv("EDU_WHITELIST_PATH") or None,
+            reload_seconds=float(os.getenv("EDU_WHITELIST_RELOAD_SECONDS", "5")),
+            executor=executor
+        )
+
+    @property
+    def index(self) -> WhitelistIndex:
+        if self.path and time.monotonic() - self._checked_at >= self.reload_seconds:
+            self._schedule_reload()
+        return self._index
+
+    def _schedule_reload(self):
+        """Check the file in the background if there's an event loop and executor, inline otherwise"""
+        if self._reload_task is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        if loop is None or self.executor is None:
+            self._reload_if_changed()
+            return
+
+        self._checked_at = time.monotonic()
+        self._reload_task = loop.create_task(self.executor.run_io(self._reload_if_changed))
+        self._reload_task.add_done_callback(self._reload_finished)
+
+    def _reload_finished(self, task: asyncio.Task):
+        self._reload_task = None
+        if not task.cancelled() and task.exception() is not None:
+            # e.g. the I/O pool was saturated; retried after reload_seconds
+            print(f"⚠️ Failed to reload whitelist from {self.path}: {task.exception()}")
+
+    def _load(self) -> Tuple[Dict[str, Dict], List[str], List[str]]:
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        platforms, patterns, channels = ({}, [], []) if data.get("replace_defaults") else (
+            dict(self.defaults[0]), list(self.defaults[1]), list(self.defaults[2])
+        )
+        platforms.update(data.get("platforms", {}))
+        patterns.extend(data.get("youtube_patterns", []))
+        channels.extend(data.get("youtube_channels", []))
+        return platforms, patterns, channels
+
+    def _reload_if_changed(self):
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.path.getmtime(self.path)
+            except OSError:
+                return
+            if mtime == self._mtime:
+                return
+
+            try:
+                index = WhitelistIndex(*self._load())
+            except (OSError, ValueError, re.error, AttributeError) as e:
+                print(f"⚠️ Failed to load whitelist from {self.path}: {e}")
+                return
+
+            self._index = index
+            self._mtime = mtime
+            print(f"✓ Loaded whitelist from {self.path} ({index.size} entries)")
@@ -0,0 +1,126 @@
+import pytest
+
+from services.model_health import CLOSED, HALF_OPEN, OPEN, ModelHealthTracker
+from tests.clock import FakeClock
+
+
+def make_tracker(clock, **overrides):
+    options = {"min_requests": 4, "failure_threshold": 0.5, "open_seconds": 30, "max_open_seconds": 600}
+    return ModelHealthTracker(["sonar", "sonar-pro"], clock=clock, **{**options, **overrides})
+
+
+def state(tracker, model):
+    return tracker._models[model].state
+
+
+def test_circuit_opens_once_the_error_rate_reaches_the_threshold():
+    tracker = make_tracker(FakeClock())
+    tracker.record_success("sonar")
+    tracker.record_success("sonar")
+    tracker.record_failure("sonar", "500")
+    assert state(tracker, "sonar") == CLOSED  # fewer than min_requests
+
+    tracker.record_failure("sonar", "500")
+    assert state(tracker, "sonar") == OPEN
+    assert tracker.ranked() == ["sonar-pro"]
+
+
+def test_permanent_failure_opens_immediately_for_the_longest_cooldown():
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    tracker.record_failure("sonar", "400: invalid model", permanent=True)
+    assert state(tracker, "sonar") == OPEN
+
+    clock.advance(599)
+    assert tracker.ranked() == ["sonar-pro"]
+    clock.advance(1)
+    assert "sonar" in tracker.ranked()
+
+
+def test_half_open_admits_one_probe_and_reopens_with_a_doubled_cooldown():
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    for _ in range(4):
+        tracker.record_failure("sonar", "500")
+
+    clock.advance(29)
+    assert "sonar" not in tracker.ranked()
+    clock.advance(1)
+    assert "sonar" in tracker.ranked()
+    assert state(tracker, "sonar") == HALF_OPEN
+
+    tracker.start("sonar")
+    assert "sonar" not in tracker.ranked()  # probe in flight
+
+    tracker.record_failure("sonar", "500")
+    assert state(tracker, "sonar") == OPEN
+    clock.advance(59)
+    assert "sonar" not in tracker.ranked()
+    clock.advance(1)
+    assert state(tracker, "sonar") == OPEN  # ranked() moves it on
+    assert "sonar" in tracker.ranked()
+
+
+def test_successful_probe_closes_the_circuit():
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    for _ in range(4):
+        tracker.record_failure("sonar", "500")
+    clock.advance(30)
+    tracker.ranked()
+
+    tracker.start("sonar")
+    tracker.record_success("sonar", latency=1.0)
+    assert state(tracker, "sonar") == CLOSED
+    assert tracker._models["sonar"].open_seconds == 0
+
+
+def test_abandoned_probe_lets_another_one_through():
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    for _ in range(4):
+        tracker.record_failure("sonar", "500")
+    clock.advance(30)
+    tracker.ranked()
+
+    tracker.start("sonar")
+    assert "sonar" not in tracker.ranked()
+    tracker.abandon("sonar")
+    assert "sonar" in tracker.ranked()
+
+
+@pytest.mark.parametrize("failed_probes, expected_cooldown", [(1, 60), (2, 120), (4, 480), (5, 600), (8, 600)])
+def test_reopen_cooldown_doubles_up_to_the_maximum(failed_probes, expected_cooldown):
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    for _ in range(4):
+        tracker.record_failure("sonar", "500")
+
+    for _ in range(failed_probes):
+        clock.advance(tracker._models["sonar"].open_seconds)
+        tracker.ranked()
+        tracker.start("sonar")
+        tracker.record_failure("sonar", "500")
+    assert tracker._models["sonar"].open_seconds == expected_cooldown
+
+
+def test_everything_open_falls_back_to_the_model_reopening_soonest():
+    clock = FakeClock()
+    tracker = make_tracker(clock)
+    tracker.record_failure("sonar-pro", "400", permanent=True)
+    clock.advance(10)
+    for _ in range(4):
+        tracker.record_failure("sonar", "500")
+    assert tracker.ranked() == ["sonar"]
+
+
+def test_ranking_prefers_lower_error_rate_then_lower_latency():
+    tracker = make_tracker(FakeClock())
+    assert tracker.ranked() == ["sonar", "sonar-pro"]  # configured order
+
+    tracker.record_success("sonar", latency=3.0)
+    tracker.record_success("sonar-pro", latency=1.0)
+    assert tracker.ranked() == ["sonar-pro", "sonar"]
+
+    tracker.record_failure("sonar-pro", "500")
+    assert tracker.ranked() == ["sonar", "sonar-pro"]
@@ -0,0 +1,158 @@
+import random
+
+import pytest
+
+from services.question_bank import (
+    QuestionBank,
+    QuestionBankStore,
+    QuizAssembly,
+    _difficulty_quotas,
+    _shuffled_options,
+    assemble_quiz,
+)
+from models.quiz import Question
+
+
+def make_question(number: int, difficulty=None, options=None, correct: int = 0):
+    return {
+        "id": number,
+        "question": f"Question {number}?",
+        "options": options or [f"right {number}", f"wrong {number}a", f"wrong {number}b", f"wrong {number}c"],
+        "correctAnswer": correct,
+        "difficulty": difficulty,
+    }
+
+
+def make_pool(easy=8, medium=8, hard=4):
+    levels = ["easy"] * easy + ["medium"] * medium + ["hard"] * hard
+    return [make_question(number, level, correct=number % 4) for number, level in enumerate(levels, start=1)]
+
+
+def correct_text(question):
+    return question["options"][question["correctAnswer"]]
+
+
+@pytest.mark.parametrize("num_questions, expected", [
+    (1, {"easy": 1, "medium": 0, "hard": 0}),
+    (3, {"easy": 1, "medium": 1, "hard": 1}),
+    (5, {"easy": 2, "medium": 2, "hard": 1}),
+    (7, {"easy": 3, "medium": 3, "hard": 1}),
+    (10, {"easy": 4, "medium": 4, "hard": 2}),
+])
+def test_difficulty_quotas(num_questions, expected):
+    assert _difficulty_quotas(num_questions) == expected
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_shuffled_options_keep_the_correct_answer(seed):
+    question = make_question(1, correct=seed % 4)
+    shuffled = _shuffled_options(question, random.Random(seed))
+    assert sorted(shuffled["options"]) == sorted(question["options"])
+    assert correct_text(shuffled) == correct_text(question)
+
+
+@pytest.mark.parametrize("options, pinned", [
+    (["Red", "Blue", "Green", "All of the above"], [3]),
+    (["Red", "Blue", "Both A and B", "None of these"], [2, 3]),
+    (["A and B only", "Red", "Blue", "Green"], [0]),
+])
+def test_positional_options_stay_in_place(options, pinned):
+    for seed in range(20):
+        for correct in range(4):
+            question = make_question(1, options=options, correct=correct)
+            shuffled = _shuffled_options(question, random.Random(seed))
+            assert [shuffled["options"][i] for i in pinned] == [options[i] for i in pinned]
+            assert correct_text(shuffled) == options[correct]
+
+
+def test_assembled_quiz_follows_the_difficulty_mix():
+    questions = assemble_quiz(make_pool(), QuizAssembly(num_questions=10), random.Random(1))
+    levels = [question.difficulty for question in questions]
+    assert {level: levels.count(level) for level in set(levels)} == {"easy": 4, "medium": 4, "hard": 2}
+    assert [question.id for question in questions] == list(range(1, 11))
+    assert len({question.question for question in questions}) == 10
+
+
+def test_assembled_quiz_keeps_every_correct_answer():
+    pool = make_pool()
+    by_text = {question["question"]: correct_text(question) for question in pool}
+    for seed in range(20):
+        for question in assemble_quiz(pool, QuizAssembly(num_questions=10), random.Random(seed)):
+            assert question.options[question.correctAnswer] == by_text[question.question]
+
+
+def test_short_difficulty_is_topped_up_from_the_others():
+    questions = assemble_quiz(make_pool(hard=0), QuizAssembly(num_questions=5), random.Random(3))
+    assert len(questions) == 5
+    assert "hard" not in {question.difficulty for question in questions}
+
+
+def test_untagged_questions_count_as_medium():
+    pool = [make_question(number) for number in range(1, 6)]
+    assert len(assemble_quiz(pool, QuizAssembly(num_questions=5), random.Random(0))) == 5
+
+
+def test_single_difficulty():
+    questions = assemble_quiz(make_pool(), QuizAssembly(num_questions=6, difficulty="Hard"), random.Random(0))
+    # Only four hard questions in the pool: the quiz comes out shorter
+    assert [question.difficulty for question in questions] == ["hard"] * 4
+
+    with pytest.raises(ValueError):
+        assemble_quiz(make_pool(hard=0), QuizAssembly(difficulty="hard"), random.Random(0))
+
+
+def test_options_left_alone_when_not_shuffling():
+    pool = make_pool()
+    by_text = {question["question"]: question["options"] for question in pool}
+    for question in assemble_quiz(pool, QuizAssembly(shuffle_options=False), random.Random(0)):
+        assert question.options == by_text[question.question]
+
+
+@pytest.mark.parametrize("options", [
+    {"num_questions": 0},
+    {"num_questions": 51},
+    {"difficulty": "impossible"},
+])
+def test_invalid_assembly(options):
+    with pytest.raises(ValueError):
+        QuizAssembly(**options)
+
+
+@pytest.fixture
+def bank(tmp_path):
+    return QuestionBank(QuestionBankStore(str(tmp_path / "bank.sqlite3")), memory_pools=1)
+
+
+def test_same_seed_gives_the_same_quiz(bank):
+    pool = make_pool()
+
+    def quiz(source_key, seed):
+        return [q.dict() for q in bank.assemble(source_key, pool, QuizAssembly(num_questions=8, seed=seed))]
+
+    assert quiz("web_url:a", "student-1") == quiz("web_url:a", "student-1")
+    assert quiz("web_url:a", "student-1") != quiz("web_url:a", "student-2")
+    assert quiz("web_url:a", "student-1") != quiz("web_url:b", "student-1")
+
+
+def test_pools_are_stored_and_reloaded(bank, tmp_path):
+    pool = [Question(**question) for question in make_pool()]
+    assert bank.get("web_url:a") is None
+    stored = bank.put("web_url:a", pool)
+    assert bank.get("web_url:a") == stored
+
+    # Evicted from memory (one pool kept), still on disk
+    bank.put("web_url:b", pool[:3])
+    assert bank.get("web_url:a") == stored
+
+    reopened = QuestionBank(QuestionBankStore(str(tmp_path / "bank.sqlite3")))
+    assert reopened.get("web_url:b") == [question.dict() for question in pool[:3]]
+    assert bank.stats()["pools_stored"] == 2
+    assert {key: bank.stats()[key] for key in ("memory_hits", "disk_hits", "misses")} == {
+        "memory_hits": 1, "disk_hits": 1, "misses": 1
+    }
+
+
+def test_expired_pools_are_ignored(tmp_path):
+    bank = QuestionBank(QuestionBankStore(str(tmp_path / "bank.sqlite3")), max_age_seconds=-1)
+    bank.put("web_url:a", [Question(**make_question(1))])
+    assert bank.get("web_url:a") is None
@@ -0,0 +1,47 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from models.verification import VerificationMetadata, VerificationStatus
+from services.quiz_pipeline import ContentRejectedError, QuizPipeline
+from services.result_cache import ResultCache
+from services.verification_service import FAILED_ANALYSIS_METHOD
+
+SOURCE_KEY = "web_url:https://example.com/article"
+
+
+class StubVerifier:
+    def __init__(self, verdict: VerificationMetadata):
+        self.verdict = verdict
+        self.calls = 0
+
+    async def verify_content(self, content, url, metadata):
+        self.calls += 1
+        return self.verdict
+
+
+def rejection(method: str) -> VerificationMetadata:
+    return VerificationMetadata(
+        status=VerificationStatus.REJECTED,
+        confidence_score=0.0,
+        rejection_reason="Low confidence (0.0%).",
+        verification_method=method,
+        verified_at=datetime.now()
+    )
+
+
+@pytest.mark.parametrize("method, cached", [("ai_analysis", True), (FAILED_ANALYSIS_METHOD, False)])
+def test_only_real_rejections_are_cached(method, cached):
+    async def scenario():
+        cache = ResultCache()
+        verifier = StubVerifier(rejection(method))
+        pipeline = QuizPipeline(None, None, None, verifier, cache)
+        for _ in range(2):
+            with pytest.raises(ContentRejectedError):
+                await pipeline._verify("content", None, SOURCE_KEY, None, await cache.get("verification", SOURCE_KEY))
+        return verifier.calls, await cache.get("verification", SOURCE_KEY)
+
+    calls, stored = asyncio.run(scenario())
+    assert (stored is not None) is cached
+    assert calls == (1 if cached else 2)
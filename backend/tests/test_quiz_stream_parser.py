@@ -0,0 +1,87 @@
+import json
+
+import pytest
+
+from services.quiz_stream_parser import IncrementalQuestionParser
+
+QUESTIONS = [
+    {
+        "id": 1,
+        "question": "What does \"photosynthesis\" produce?",
+        "options": ["Glucose and O\u2082", "Only {heat}", "Nitrogen ] gas", "C:\\path\\to\\nothing"],
+        "correctAnswer": 0,
+    },
+    {
+        "id": 2,
+        "question": "Caf\u00e9 au lait \u2014 which is a mixture?",
+        "options": ["[a]", "b\nc", "d\te", "All of the above"],
+        "correctAnswer": 3,
+    },
+    {"id": 3, "question": "Empty nested?", "options": ["{}", "[]", "\"\"", "\\"], "correctAnswer": 1},
+]
+
+# Escapes kept as written (ensure_ascii), so splits land mid-\uXXXX too
+RESPONSE = "```json\n" + json.dumps({"questions": QUESTIONS}, indent=2) + "\n```\nHope this helps!"
+
+
+def feed_all(chunks):
+    parser = IncrementalQuestionParser()
+    questions = []
+    for chunk in chunks:
+        questions.extend(parser.feed(chunk))
+    return questions
+
+
+def test_whole_response_at_once():
+    assert feed_all([RESPONSE]) == QUESTIONS
+
+
+def test_one_character_at_a_time():
+    assert feed_all(list(RESPONSE)) == QUESTIONS
+
+
+def test_split_anywhere():
+    for split in range(1, len(RESPONSE)):
+        assert feed_all([RESPONSE[:split], RESPONSE[split:]]) == QUESTIONS, f"split at {split}"
+
+
+def split_after(marker: str):
+    index = RESPONSE.index(marker) + len(marker)
+    return [RESPONSE[:index], RESPONSE[index:]]
+
+
+@pytest.mark.parametrize("chunks", [
+    split_after('"quest'),               # inside the "questions" key
+    split_after('"questions": '),        # before the array opens
+    split_after('\\"photo'),             # just after an escaped quote
+    split_after('C:\\'),                 # between a backslash and what it escapes
+    split_after('C:\\\\path\\'),         # the same, after an escaped backslash
+    split_after('Caf\\u00'),             # inside a \u escape
+    split_after('Only {'),               # a brace inside a string
+    split_after('Nitrogen ]'),           # a bracket inside a string
+    split_after('"correctAnswer": '),    # between a key and its value
+], ids=lambda chunks: repr(chunks[0][-12:]))
+def test_split_mid_token(chunks):
+    assert feed_all(chunks) == QUESTIONS
+
+
+def test_questions_are_emitted_as_soon_as_they_close():
+    first_end = RESPONSE.index('"correctAnswer": 0') + len('"correctAnswer": 0\n    }')
+    parser = IncrementalQuestionParser()
+    assert parser.feed(RESPONSE[:first_end - 1]) == []
+    assert parser.feed(RESPONSE[first_end - 1:first_end]) == QUESTIONS[:1]
+
+
+def test_malformed_question_is_skipped():
+    response = '{"questions": [{"id": 1, "question": oops}, ' + json.dumps(QUESTIONS[0]) + "]}"
+    assert feed_all([response]) == QUESTIONS[:1]
+
+
+def test_nothing_after_the_array_is_parsed():
+    parser = IncrementalQuestionParser()
+    assert parser.feed('{"questions": []} {"questions": [' + json.dumps(QUESTIONS[0])) == []
+    assert parser.feed("]}") == []
+
+
+def test_text_without_a_questions_array():
+    assert feed_all(["Sorry, ", "I can't help with that."]) == []
@@ -0,0 +1,145 @@
+import asyncio
+import email.utils
+
+import pytest
+
+from services.rate_limiter import ProviderLimiter, RateLimitedError, TokenBucket, parse_retry_after
+from tests.clock import FakeClock
+
+
+def test_token_bucket_starts_full_and_refills_at_its_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)  # one per second
+    assert bucket.wait_time(1, clock()) == 0
+
+    bucket.take(60, clock())
+    assert bucket.wait_time(1, clock()) == pytest.approx(1.0)
+
+    clock.advance(0.25)
+    assert bucket.wait_time(1, clock()) == pytest.approx(0.75)
+
+    clock.advance(3600)
+    assert bucket.wait_time(60, clock()) == 0
+    assert bucket.level == 60  # never refills past capacity
+
+
+@pytest.mark.parametrize("level, amount, cap, expected", [
+    (60, 1, True, 0.0),
+    (0, 1, True, 1.0),
+    (0, 30, True, 30.0),
+    # An oversized call only needs a full bucket...
+    (0, 120, True, 60.0),
+    # ...but a backlog of that size takes the full time to drain
+    (0, 120, False, 120.0),
+    # Under-estimates already taken push the level below zero
+    (-10, 1, True, 11.0),
+])
+def test_token_bucket_wait_time(level, amount, cap, expected):
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.level = level
+    assert bucket.wait_time(amount, clock(), cap=cap) == pytest.approx(expected)
+
+
+@pytest.mark.parametrize("level, expected", [(30, 0.0), (0, 0.0), (-5, -5.0)])
+def test_token_bucket_drain(level, expected):
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock)
+    bucket.level = level
+    bucket.drain(clock())
+    assert bucket.level == expected
+
+
+NOW = 1_700_000_000.0
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("5", 5.0),
+    ("1.5", 1.5),
+    ("-3", 0.0),
+    ("soon", None),
+    (email.utils.formatdate(NOW + 30, usegmt=True), 30.0),
+    (email.utils.formatdate(NOW - 30, usegmt=True), 0.0),
+])
+def test_parse_retry_after(value, expected):
+    result = parse_retry_after(value, now=NOW)
+    if expected is None:
+        assert result is None
+    else:
+        assert result == pytest.approx(expected)
+
+
+def test_waiters_are_served_round_robin_by_client():
+    async def scenario():
+        limiter = ProviderLimiter("test", requests_per_minute=600, clock=FakeClock())
+        granted = []
+
+        async def call(client_id: str, label: str):
+            async with limiter.reserve(client_id=client_id):
+                granted.append(label)
+
+        # All queued before the dispatcher first runs
+        calls = [
+            ("alice", "a1"), ("alice", "a2"), ("alice", "a3"),
+            ("bob", "b1"), ("bob", "b2"),
+            ("carol", "c1"),
+        ]
+        await asyncio.gather(*(call(client_id, label) for client_id, label in calls))
+        return granted
+
+    assert asyncio.run(scenario()) == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_call_is_shed_when_expected_wait_exceeds_the_bound():
+    async def scenario():
+        clock = FakeClock()
+        limiter = ProviderLimiter("test", requests_per_minute=60, max_queue_wait=5, clock=clock)
+        limiter.requests.take(70, clock())  # 10 over: the next request is 11s away
+
+        with pytest.raises(RateLimitedError) as raised:
+            async with limiter.reserve():
+                pass
+        assert raised.value.retry_after == pytest.approx(11.0)
+        assert limiter.shed == 1
+
+        clock.advance(70)
+        async with limiter.reserve():
+            pass
+        assert limiter.shed == 1
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("retry_after, expected_pause", [(20.0, 20.0), (None, 10.0)])
+def test_upstream_429_pauses_the_provider(retry_after, expected_pause):
+    async def scenario():
+        clock = FakeClock()
+        limiter = ProviderLimiter("test", requests_per_minute=600, max_queue_wait=1, clock=clock)
+        async with limiter.reserve() as permit:
+            permit.throttled(retry_after)
+
+        assert limiter.upstream_throttled == 1
+        assert limiter.stats()["blocked_for_seconds"] == expected_pause
+        with pytest.raises(RateLimitedError) as raised:
+            async with limiter.reserve():
+                pass
+        assert raised.value.retry_after == pytest.approx(expected_pause)
+
+        clock.advance(expected_pause)
+        async with limiter.reserve():
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_reported_usage_corrects_the_token_bucket():
+    async def scenario():
+        clock = FakeClock()
+        limiter = ProviderLimiter("test", requests_per_minute=600, tokens_per_minute=6000, clock=clock)
+        async with limiter.reserve(tokens=1000) as permit:
+            permit.record_usage(2500)
+        assert limiter.tokens.level == pytest.approx(6000 - 2500)
+
+    asyncio.run(scenario())
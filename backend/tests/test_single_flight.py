@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+KEY = ("extraction", "web_url:https://example.com/article")
+
+
+class Work:
+    """A controllable unit of work that counts how often it is started"""
+
+    def __init__(self, result="content", error=None):
+        self.result = result
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await self.release.wait()
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_concurrent_callers_share_one_run():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        waiters = [asyncio.create_task(flights.do(KEY, work)) for _ in range(5)]
+        await settle()
+        assert flights.in_flight(KEY)
+        work.release.set()
+        results = await asyncio.gather(*waiters)
+        assert results == ["content"] * 5
+        assert work.calls == 1
+        assert not flights.in_flight(KEY)
+        assert flights.stats()["extraction"] == {"leaders": 1, "followers": 4, "in_flight": 0}
+
+    asyncio.run(scenario())
+
+
+def test_leader_cancelled_while_followers_wait():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        leader = asyncio.create_task(flights.do(KEY, work))
+        await settle()
+        followers = [asyncio.create_task(flights.do(KEY, work)) for _ in range(2)]
+        await settle()
+
+        leader.cancel()
+        await settle()
+        assert leader.cancelled()
+        assert not work.cancelled
+
+        work.release.set()
+        assert await asyncio.gather(*followers) == ["content", "content"]
+        assert work.calls == 1
+
+    asyncio.run(scenario())
+
+
+def test_last_waiter_leaving_cancels_the_run():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        waiters = [asyncio.create_task(flights.do(KEY, work)) for _ in range(3)]
+        await settle()
+
+        for waiter in waiters[:2]:
+            waiter.cancel()
+        await settle()
+        assert not work.cancelled
+
+        waiters[2].cancel()
+        await settle()
+        assert work.cancelled
+        assert not flights.in_flight(KEY)
+
+        # A later caller starts a fresh run
+        fresh = Work("again")
+        fresh.release.set()
+        assert await flights.do(KEY, fresh) == "again"
+
+    asyncio.run(scenario())
+
+
+def test_exception_is_delivered_to_every_waiter():
+    async def scenario():
+        flights, work = SingleFlight(), Work(error=ValueError("too short"))
+        waiters = [asyncio.create_task(flights.do(KEY, work)) for _ in range(3)]
+        await settle()
+        work.release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, ValueError) and str(result) == "too short" for result in results)
+        assert work.calls == 1
+        assert not flights.in_flight(KEY)
+
+    asyncio.run(scenario())
+
+
+def test_different_keys_run_separately():
+    async def scenario():
+        flights, first, second = SingleFlight(), Work("a"), Work("b")
+        tasks = [
+            asyncio.create_task(flights.do(("extraction", "a"), first)),
+            asyncio.create_task(flights.do(("extraction", "b"), second)),
+        ]
+        await settle()
+        first.release.set()
+        second.release.set()
+        assert await asyncio.gather(*tasks) == ["a", "b"]
+        assert (first.calls, second.calls) == (1, 1)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("outcome", ["result", "error", "cancelled"])
+def test_leader_on_done_runs_when_the_run_ends(outcome):
+    async def scenario():
+        flights = SingleFlight()
+        work = Work(error=ValueError("failed") if outcome == "error" else None)
+        done = []
+        leader = asyncio.create_task(flights.do(KEY, work, on_done=lambda: done.append("leader")))
+        await settle()
+        assert done == []
+
+        if outcome == "cancelled":
+            leader.cancel()
+        else:
+            work.release.set()
+        await asyncio.gather(leader, return_exceptions=True)
+        await settle()
+        assert done == ["leader"]
+
+    asyncio.run(scenario())
+
+
+def test_follower_on_done_runs_immediately():
+    async def scenario():
+        flights, work = SingleFlight(), Work()
+        done = []
+        leader = asyncio.create_task(flights.do(KEY, work, on_done=lambda: done.append("leader")))
+        await settle()
+        follower = asyncio.create_task(flights.do(KEY, work, on_done=lambda: done.append("follower")))
+        await settle()
+        assert done == ["follower"]
+
+        work.release.set()
+        await asyncio.gather(leader, follower)
+        await settle()
+        assert done == ["follower", "leader"]
+
+    asyncio.run(scenario())
+
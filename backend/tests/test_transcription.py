@@ -0,0 +1,65 @@
+import pytest
+
+from services.audio_extraction import plan_chunks
+from services.transcription import stitch_transcripts
+
+
+@pytest.mark.parametrize("duration, silences, expected", [
+    # Short enough for one chunk
+    (300, [], [(0, 300)]),
+    (600, [], [(0, 600)]),
+    # Fixed-size chunks, each starting one overlap before the previous cut
+    (1500, [], [(0, 600), (595, 1200), (1195, 1500)]),
+    # The cut moves to the middle of a silence just before the boundary
+    (1500, [(580, 584)], [(0, 582), (577, 1182), (1177, 1500)]),
+    # With several silences in the window, the last one wins
+    (1000, [(575, 577), (590, 592)], [(0, 591), (586, 1000)]),
+    # Silences before the search window are ignored
+    (1000, [(500, 502)], [(0, 600), (595, 1000)]),
+    # A silence centred on the boundary itself is not before it
+    (1000, [(598, 602)], [(0, 600), (595, 1000)]),
+])
+def test_plan_chunks(duration, silences, expected):
+    assert plan_chunks(duration, silences, chunk_seconds=600, overlap_seconds=5, silence_search_seconds=30) == expected
+
+
+@pytest.mark.parametrize("duration", [1, 599, 601, 1799, 3600, 7205.5])
+def test_plan_chunks_covers_the_track_with_overlap(duration):
+    silences = [(t, t + 1.5) for t in range(40, int(duration), 97)]
+    chunks = plan_chunks(duration, silences, chunk_seconds=600, overlap_seconds=5, silence_search_seconds=30)
+
+    assert chunks[0][0] == 0
+    assert chunks[-1][1] == duration
+    for (_, previous_end), (start, end) in zip(chunks, chunks[1:]):
+        assert start == pytest.approx(max(0, previous_end - 5))
+        assert end - start <= 600 + 5
+
+
+@pytest.mark.parametrize("transcripts, expected", [
+    (["just one chunk"], "just one chunk"),
+    (["", "first words", "   "], "first words"),
+    # Three or more matching words anywhere near the seam are the overlap
+    (
+        ["the quick brown fox jumps over", "fox jumps over the lazy dog"],
+        "the quick brown fox jumps over the lazy dog",
+    ),
+    # Case and punctuation differ between chunks; two words count on the seam
+    (["He said it Works.", "it works, really"], "He said it Works. really"),
+    # Two matching words away from the seam are a coincidence
+    (["a b c d x", "c d y"], "a b c d x c d y"),
+    # No overlap at all
+    (["first part", "second part"], "first part second part"),
+    (
+        ["one two three four five", "three four five six", "five six seven"],
+        "one two three four five six seven",
+    ),
+])
+def test_stitch_transcripts(transcripts, expected):
+    assert stitch_transcripts(transcripts) == expected
+
+
+def test_stitch_only_looks_for_overlap_near_the_seam():
+    earlier = "alpha beta gamma " + " ".join(f"w{i}" for i in range(100))
+    later = "alpha beta gamma delta"
+    # The match is more than max_overlap_words back, so it is not overlap
+    assert stitch_transcripts([earlier, later], max_overlap_words=60) == f"{earlier} {later}"
@@ -0,0 +1,90 @@
+import pytest
+
+from services.whitelist_index import AhoCorasick, DomainTrie, WhitelistIndex
+
+PLATFORMS = {
+    "mit.edu": {"name": "MIT"},
+    "ocw.mit.edu": {"name": "MIT OpenCourseWare"},
+    "linkedin.com/learning": {"name": "LinkedIn Learning"},
+    "example.com": {"name": "Example"},
+    "example.com/courses/advanced": {"name": "Example Advanced"},
+    "example.com/courses": {"name": "Example Courses"},
+}
+
+
+@pytest.fixture(scope="module")
+def index():
+    return WhitelistIndex(PLATFORMS, [r"youtube\.com/c/mitocw"], ["Khan Academy", "CrashCourse"])
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://mit.edu/about", "MIT"),
+    ("https://web.mit.edu/physics", "MIT"),
+    ("https://a.b.c.mit.edu", "MIT"),
+    # The deepest domain wins
+    ("https://ocw.mit.edu/courses/8-01", "MIT OpenCourseWare"),
+    ("https://videos.ocw.mit.edu", "MIT OpenCourseWare"),
+    # Only whole labels match
+    ("https://notmit.edu", None),
+    ("https://mit.edu.evil.com/login", None),
+    ("https://edu", None),
+    # Case, trailing dots, ports and missing schemes don't matter
+    ("https://MIT.EDU./Page", "MIT"),
+    ("http://mit.edu:8080/x", "MIT"),
+    ("mit.edu/page", "MIT"),
+    # Path prefixes match whole segments
+    ("https://www.linkedin.com/learning/python-essentials", "LinkedIn Learning"),
+    ("https://linkedin.com/learning/", "LinkedIn Learning"),
+    ("https://linkedin.com/Learning", "LinkedIn Learning"),
+    ("https://linkedin.com/learningx", None),
+    ("https://linkedin.com/feed", None),
+    # The longest path prefix wins, then the bare domain
+    ("https://example.com/courses/advanced/unit-1", "Example Advanced"),
+    ("https://example.com/courses/intro", "Example Courses"),
+    ("https://example.com/blog", "Example"),
+    ("https://example.com", "Example"),
+    # Unparseable
+    ("http://[broken", None),
+    ("", None),
+])
+def test_match_platform(index, url, expected):
+    match = index.match_platform(url)
+    assert (match["name"] if match else None) == expected
+
+
+def test_domain_trie_without_entries():
+    assert DomainTrie().match("mit.edu", "/") is None
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.youtube.com/c/MITOCW/videos", True),
+    ("https://www.youtube.com/c/other", False),
+])
+def test_match_url_pattern(index, url, expected):
+    assert index.match_url_pattern(url) is expected
+
+
+@pytest.mark.parametrize("words, text, expected", [
+    (["Khan Academy"], "Calculus 1 | KHAN ACADEMY", "Khan Academy"),
+    (["Khan Academy"], "Khan Acad", None),
+    (["Khan Academy"], "", None),
+    ([], "anything", None),
+    (["", "ted"], "a TED talk", "ted"),
+    # Overlapping words: the first match by end position is reported
+    (["he", "she", "his", "hers"], "ushers", "she"),
+    (["he", "she", "his", "hers"], "ahis", "his"),
+    (["he", "she", "his", "hers"], "the", "he"),
+    # Found through a failure link when the longer word doesn't complete
+    (["abcd", "bc"], "xabce", "bc"),
+    (["abcd", "bcx"], "abcx", "bcx"),
+    # Repeated prefixes
+    (["aab"], "aaab", "aab"),
+    (["crash course", "crashcourse"], "Presented by CrashCourse", "crashcourse"),
+])
+def test_aho_corasick(words, text, expected):
+    assert AhoCorasick(words).search(text) == expected
+
+
+def test_match_channel(index):
+    assert index.match_channel("World History #1 - CrashCourse") == "CrashCourse"
+    assert index.match_channel(None) is None